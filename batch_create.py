@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Concurrent, rate-limit-aware Swiss creation.
+
+``batch_create()`` POSTs many ``/api/swiss/new/{team}`` payloads through a
+bounded worker pool.  A 429 pauses *every* worker until the ``Retry-After``
+deadline has passed (the limit is per token, not per request), transient
+errors are retried with exponential back-off, and ``print_summary()`` renders
+a table of created, failed and retried entries at the end.  A timeout or
+5xx may still have created the tournament, so before re-sending one the
+team's list is checked for it; only a request that never reached the server
+(connection refused) is re-sent blindly.
+
+``missing_jobs()`` makes a run idempotent: it streams each team's Swiss list
+once and drops every job whose (startsAt, clock, name) slot already exists,
+so a retried or doubled workflow run does not create duplicates.
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import requests
+from urllib3.exceptions import NewConnectionError
+
+import lichess_client as lc
+import metrics
+
+DEFAULT_CONCURRENCY = 4
+MAX_ATTEMPTS = 4
+
+
+@dataclass(frozen=True)
+class CreateJob:
+    """One tournament to create on one team."""
+    team: str
+    payload: Dict = field(compare=False)
+
+    @property
+    def label(self) -> str:
+        p = self.payload
+        clock = f"{p['clock.limit'] // 60}+{p['clock.increment']}"
+        return f"{p['name']} {clock} @ {p['startsAt']}"
+
+
+@dataclass
+class CreateOutcome:
+    job: CreateJob
+    result: lc.Result
+    attempts: int = 1
+    url: str = ""
+    swiss_id: str = ""
+
+    @property
+    def retried(self) -> bool:
+        return self.attempts > 1
+
+
+class _Backoff:
+    """Shared pause gate: one 429 holds back every worker using the token."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._resume_at = 0.0
+
+    def pause(self, seconds: float):
+        with self._lock:
+            self._resume_at = max(self._resume_at, time.monotonic() + seconds)
+
+    def wait(self):
+        while True:
+            with self._lock:
+                delay = self._resume_at - time.monotonic()
+            if delay <= 0:
+                return
+            time.sleep(delay)
+
+
+def _not_sent(e: requests.RequestException) -> bool:
+    """True if the request surely never reached the server."""
+    if isinstance(e, requests.ConnectTimeout):
+        return True
+    reason = getattr(e.args[0], "reason", None) if e.args else None
+    return isinstance(e, requests.ConnectionError) and isinstance(reason, NewConnectionError)
+
+
+def _find_created(token: str, job: CreateJob) -> Optional[lc.Swiss]:
+    """The team's upcoming Swiss in the job's slot, if an earlier attempt created it."""
+    key = job_key(job)
+    for s in lc.iter_team_swiss(job.team, token, status="created", until_finished=True):
+        if swiss_key(job.team, s) == key:
+            return s
+    return None
+
+
+def _create_one(token: str, job: CreateJob, gate: _Backoff,
+                max_attempts: int) -> CreateOutcome:
+    label = job.payload["name"]
+    result = lc.Result(label, lc.ERROR)
+    unsure = False  # the last attempt may have created it
+    for attempt in range(1, max_attempts + 1):
+        if attempt > 1:
+            metrics.RETRIES.inc(endpoint="swiss/new")
+        gate.wait()
+        if unsure:
+            try:
+                found = _find_created(token, job)
+            except requests.RequestException as e:
+                logging.warning("cannot check %s after a failed attempt: %s", job.label, e)
+                break  # re-sending blind could create it twice
+            if found is not None:
+                return CreateOutcome(job, lc.Result(label, lc.OK, 200), attempt - 1,
+                                     f"{lc.SITE_ROOT}/swiss/{found.id}", found.id)
+        try:
+            # 429s are handled below, once for all workers, not again in the client
+            r = lc.request("POST", f"swiss/new/{job.team}", token, data=job.payload, retry_429=0)
+        except requests.RequestException as e:
+            result = lc.Result(label, lc.ERROR, 0, str(e))
+            unsure = not _not_sent(e)
+            if attempt < max_attempts:
+                time.sleep(2 ** attempt)
+            continue
+
+        unsure = r.status_code >= 500
+        if r.status_code == 200:
+            data = r.json()
+            return CreateOutcome(job, lc.Result(label, lc.OK, 200),
+                                 attempt, data.get("url", ""), data.get("id", ""))
+        result = lc.Result(label, lc.FAILED, r.status_code, r.text.strip()[:120])
+        if r.status_code == 429:
+            wait = lc.retry_after(r)
+            logging.warning("429 on %s — pausing all workers %.0fs", job.label, wait)
+            gate.pause(wait)
+        elif r.status_code >= 500 and attempt < max_attempts:
+            time.sleep(2 ** attempt)
+        else:
+            break  # 4xx other than 429 will not get better by retrying
+    return CreateOutcome(job, result, attempt)
+
+
+def job_key(job: CreateJob) -> Tuple:
+    p = job.payload
+    return (job.team, p["startsAt"], int(p["clock.limit"]), int(p["clock.increment"]), p["name"])
+
+
+def swiss_key(team: str, swiss: lc.Swiss) -> Tuple:
+    return (team, swiss.starts_at, swiss.clock_limit, swiss.clock_increment, swiss.name)
+
+
+def existing_index(token: str, teams: Iterable[str]) -> Set[Tuple]:
+    """Stream each team's Swiss list once and index it by slot key."""
+    index = set()
+    for team in set(teams):
+        index.update(swiss_key(team, s)
+                     for s in lc.iter_team_swiss(team, token, status="created", until_finished=True))
+    return index
+
+
+def missing_jobs(token: str, jobs: List[CreateJob],
+                 known: Iterable[Tuple] = ()) -> Tuple[List[CreateJob], List[CreateJob]]:
+    """Split jobs into (to create, already on the team); duplicate jobs collapse.
+
+    ``known`` holds job keys recorded as created by earlier runs; teams whose
+    jobs are all known are not streamed at all.
+    """
+    index = set(known)
+    unknown_teams = {j.team for j in jobs if job_key(j) not in index}
+    index |= existing_index(token, unknown_teams)
+    todo, skipped = [], []
+    for job in jobs:
+        key = job_key(job)
+        if key in index:
+            skipped.append(job)
+        else:
+            index.add(key)
+            todo.append(job)
+    return todo, skipped
+
+
+def batch_create(token: str, jobs: List[CreateJob],
+                 concurrency: int = DEFAULT_CONCURRENCY,
+                 max_attempts: int = MAX_ATTEMPTS) -> List[CreateOutcome]:
+    """Create every job, at most ``concurrency`` in flight; results keep job order."""
+    gate = _Backoff()
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        futures = [pool.submit(_create_one, token, job, gate, max_attempts) for job in jobs]
+        return [f.result() for f in futures]
+
+
+def print_summary(outcomes: List[CreateOutcome], skipped: Iterable[CreateJob] = ()):
+    """Print one row per job, then created / failed / retried / skipped totals."""
+    skipped = list(skipped)
+    for job in skipped:
+        print(f"⏭️ {job.team:<28} {job.label:<55} already exists")
+    for o in outcomes:
+        mark = "✅" if o.result.outcome == lc.OK else "❌"
+        retry = f" (×{o.attempts})" if o.retried else ""
+        detail = o.url or f"({o.result.status_code}) {o.result.text}"
+        print(f"{mark} {o.job.team:<28} {o.job.label:<55} {detail}{retry}")
+
+    created = sum(o.result.outcome == lc.OK for o in outcomes)
+    retried = sum(o.retried for o in outcomes)
+    print(f"\ncreated: {created}   failed: {len(outcomes) - created}   "
+          f"retried: {retried}   skipped: {len(skipped)}")
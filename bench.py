@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Benchmark create / join / withdraw against the local mock server.
+
+    python bench.py                       # 1, 10, 100 accounts, in-process mock
+    python bench.py --accounts 10 --latency-ms 80 --rate 20/1
+    python bench.py --url http://127.0.0.1:8765   # an already running mock_lichess.py
+
+Every HTTP call made through lichess_client is timed; the report gives
+throughput and p50 / p99 latency per operation and account count, so any
+concurrency change can be compared on the same traffic.
+"""
+
+import argparse
+import contextlib
+import datetime as dt
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+import lichess_client as lc
+from batch_create import CreateJob, batch_create
+from fanout import fan_out
+from mock_lichess import MockLichess
+
+TEAM = "bench-team"
+
+
+class Recorder:
+    """Collects (latency, status) for every lichess_client.request call."""
+
+    def __init__(self):
+        self.samples: List[float] = []
+        self.statuses: Dict[int, int] = {}
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def measure(self):
+        original = lc.request
+
+        def timed(*args, **kwargs):
+            t0 = time.perf_counter()
+            status = 0
+            try:
+                resp = original(*args, **kwargs)
+                status = resp.status_code
+                return resp
+            finally:
+                with self._lock:
+                    self.samples.append(time.perf_counter() - t0)
+                    self.statuses[status] = self.statuses.get(status, 0) + 1
+
+        lc.request = timed
+        try:
+            yield self
+        finally:
+            lc.request = original
+
+
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+def _jobs(n: int, offset: int) -> List[CreateJob]:
+    start = dt.datetime.now(dt.timezone.utc) + dt.timedelta(days=30)
+    return [CreateJob(TEAM, {
+        "name": "Bench Qualifier", "clock.limit": 180, "clock.increment": 2,
+        "startsAt": (start + dt.timedelta(minutes=offset + i)).strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "nbRounds": 7,
+    }) for i in range(n)]
+
+
+def run_op(op: str, tokens: List[str], ids: List[str], per_account: int, workers: int):
+    if op == "create":
+        with ThreadPoolExecutor(max_workers=min(len(tokens), workers)) as pool:
+            list(pool.map(lambda it: batch_create(it[1], _jobs(per_account, it[0] * per_account),
+                                                  concurrency=4),
+                          enumerate(tokens)))
+    elif op == "join":
+        fan_out(tokens, ids, lc.join, workers=workers)
+    elif op == "withdraw":
+        fan_out(tokens, ids, lc.withdraw, workers=workers)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark create/join/withdraw on the mock API.")
+    ap.add_argument("--accounts", type=int, nargs="+", default=[1, 10, 100])
+    ap.add_argument("--per-account", type=int, default=24, help="tournaments per account")
+    ap.add_argument("--workers", type=int, default=16)
+    ap.add_argument("--url", help="use an already running mock instead of an in-process one")
+    ap.add_argument("--latency-ms", type=float, default=20.0)
+    ap.add_argument("--jitter-ms", type=float, default=5.0)
+    ap.add_argument("--error-rate", type=float, default=0.0)
+    ap.add_argument("--rate", default="0/1", help="per-token budget N/SECONDS for the mock")
+    ap.add_argument("--governor", action="store_true",
+                    help="keep the client-side rate governor on (off by default)")
+    args = ap.parse_args()
+
+    if args.governor:
+        os.environ["LICHESS_RATE_STATE"] = os.path.join(tempfile.mkdtemp(), "rate.json")
+    else:
+        os.environ["LICHESS_RATE_DISABLE"] = "1"
+
+    srv = None
+    if args.url:
+        lc.set_base_url(args.url)
+    else:
+        limit, window = args.rate.split("/")
+        srv = MockLichess(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+                          error_rate=args.error_rate, rate_limit=int(limit),
+                          rate_window=float(window)).start()
+        lc.set_base_url(srv.url)
+
+    print(f"{'op':<9}{'accts':>6}{'reqs':>7}{'wall s':>9}{'req/s':>9}"
+          f"{'p50 ms':>9}{'p99 ms':>9}{'non-2xx':>9}{'429':>6}")
+    try:
+        for n in args.accounts:
+            tokens = [f"bench-token-{i:06d}" for i in range(n)]
+            ids = [s.id for s in lc.get_upcoming_swiss(TEAM)][:args.per_account]
+            for op in ("create", "join", "withdraw"):
+                rec = Recorder()
+                with rec.measure():
+                    t0 = time.perf_counter()
+                    run_op(op, tokens, ids, args.per_account, args.workers)
+                    wall = time.perf_counter() - t0
+                reqs = len(rec.samples)
+                bad = sum(c for s, c in rec.statuses.items() if not 200 <= s < 300)
+                print(f"{op:<9}{n:>6}{reqs:>7}{wall:>9.2f}{reqs / wall:>9.1f}"
+                      f"{percentile(rec.samples, .5) * 1000:>9.1f}"
+                      f"{percentile(rec.samples, .99) * 1000:>9.1f}"
+                      f"{bad:>9}{rec.statuses.get(429, 0):>6}")
+    finally:
+        if srv is not None:
+            srv.stop()
+
+
+if __name__ == "__main__":
+    main()
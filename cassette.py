@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+"""
+Record / replay every HTTP exchange of a run ("cassettes").
+
+Set two variables and run any script unchanged:
+
+    LICHESS_CASSETTE=incident.jsonl.gz LICHESS_CASSETTE_MODE=record python cli.py join
+    LICHESS_CASSETTE=incident.jsonl.gz LICHESS_CASSETTE_MODE=replay python cli.py join
+
+``lichess_client.session()`` mounts a transport adapter here when
+``LICHESS_CASSETTE`` is set.  Recording stores one gzip'd JSON line per
+exchange: wall time, method, URL, request body, the account (hash of the
+token — never the token), status, headers, body and the time to headers.
+Streamed bodies are captured as the caller reads them, so an NDJSON stream
+closed early is recorded only up to that point.
+
+Tokens never reach the file: the bearer token and the ones posted to
+``/api/token/test`` are replaced by their hash in both bodies, as is anything
+else that looks like a Lichess token (``lip_…`` / ``lio_…``).  Replay hashes
+the live request the same way to match it, and puts the caller's own tokens
+back into the recorded response.
+
+Replay answers from the cassette without network access.  Exchanges are
+matched on method + URL + account + body, then method + URL + account, then
+method + URL alone, in recorded order; the last match repeats once a queue
+runs dry (pollers), and an unknown request raises ``ConnectionError``.
+Recorded latencies are reproduced, scaled by ``LICHESS_CASSETTE_SPEED``
+(default 1, 0 = no delay), and ``Date`` headers keep their recorded offset
+from the local clock, so clock_sync measures the same skew as in the
+original run.
+
+    python cassette.py summary incident.jsonl.gz     # per-endpoint latency table
+"""
+
+import atexit
+import base64
+import collections
+import gzip
+import io
+import json
+import os
+import re
+import sys
+import threading
+import time
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+from state_store import account_key
+
+RECORD = "record"
+REPLAY = "replay"
+# headers that describe the wire encoding, not the (decoded) body we store
+_DROP_HEADERS = {"content-encoding", "content-length", "transfer-encoding", "connection",
+                 "set-cookie", "authorization", "www-authenticate"}
+_TOKEN_LIKE = re.compile(r"\bli[a-z]_[A-Za-z0-9]{8,}")
+
+
+def _hashed(token: str) -> str:
+    return f"sha256:{account_key(token)}"
+
+
+def _secrets(request: requests.PreparedRequest) -> List[str]:
+    """Tokens carried by the request: its bearer token and any posted to token/test."""
+    auth = request.headers.get("Authorization", "")
+    found = [auth[7:]] if auth.startswith("Bearer ") else []
+    if urlsplit(request.url).path.endswith("/token/test"):
+        found += [t for t in _raw_body(request).split(",") if t]
+    return sorted(set(found), key=len, reverse=True)  # longest first: no partial replaces
+
+
+def _redact(text: str, secrets: List[str]) -> str:
+    for token in secrets:
+        text = text.replace(token, _hashed(token))
+    return _TOKEN_LIKE.sub(lambda m: _hashed(m.group(0)), text)
+
+
+def _restore(text: str, secrets: List[str]) -> str:
+    for token in secrets:
+        text = text.replace(_hashed(token), token)
+    return text
+
+
+def _account(request: requests.PreparedRequest) -> str:
+    auth = request.headers.get("Authorization", "")
+    return account_key(auth[7:]) if auth.startswith("Bearer ") else ""
+
+
+def _raw_body(request: requests.PreparedRequest) -> str:
+    body = request.body or ""
+    return body.decode("utf-8", "replace") if isinstance(body, bytes) else str(body)
+
+
+def _body(request: requests.PreparedRequest) -> str:
+    """The request body as recorded and matched: with every token hashed."""
+    return _redact(_raw_body(request), _secrets(request))
+
+
+def _encode(data: bytes, secrets: List[str]) -> Dict:
+    try:
+        return {"body": _redact(data.decode("utf-8"), secrets)}
+    except UnicodeDecodeError:
+        return {"body64": base64.b64encode(data).decode()}
+
+
+class Cassette:
+    """One cassette file, opened for appending (record) or fully loaded (replay)."""
+
+    def __init__(self, path: str, mode: str):
+        self.path, self.mode = path, mode
+        self._lock = threading.Lock()
+        self._out = None
+        self._queues: Dict[Tuple, collections.deque] = {}
+        self._last: Dict[Tuple, Dict] = {}
+        self._used = set()
+        if mode == RECORD:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self._out = gzip.open(path, "at", encoding="utf-8")
+            atexit.register(self.close)
+        else:
+            for entry in sorted(load(path), key=lambda e: e["at"]):
+                for key in self._keys(entry["method"], entry["url"], entry["account"],
+                                      entry["request_body"]):
+                    self._queues.setdefault(key, collections.deque()).append(entry)
+
+    @staticmethod
+    def _keys(method, url, account, body) -> List[Tuple]:
+        return [(method, url, account, body), (method, url, account), (method, url)]
+
+    def write(self, entry: Dict):
+        with self._lock:
+            if self._out is not None:
+                self._out.write(json.dumps(entry, separators=(",", ":")) + "\n")
+
+    def take(self, request: requests.PreparedRequest) -> Optional[Dict]:
+        keys = self._keys(request.method, request.url, _account(request), _body(request))
+        with self._lock:
+            for key in keys:
+                q = self._queues.get(key)
+                while q and id(q[0]) in self._used:  # served through another key
+                    q.popleft()
+                if q:
+                    entry = q.popleft()
+                    self._used.add(id(entry))
+                    self._last[key] = entry
+                    return entry
+            for key in keys:
+                if key in self._last:
+                    return self._last[key]
+        return None
+
+    def close(self):
+        with self._lock:
+            if self._out is not None:
+                self._out.close()
+                self._out = None
+
+
+def load(path: str) -> List[Dict]:
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+# ───────────────────────── record ───────────────────────── #
+
+class _Tee:
+    """Wraps ``response.raw`` and hands every byte the caller reads to ``done``."""
+
+    def __init__(self, raw, done):
+        self._raw, self._done, self._chunks = raw, done, []
+
+    def stream(self, amt=2 ** 16, decode_content=None):
+        for chunk in self._raw.stream(amt, decode_content=True):
+            self._chunks.append(chunk)
+            yield chunk
+        self._finish()
+
+    def read(self, amt=None, decode_content=None, **kwargs):
+        data = self._raw.read(amt, decode_content=True, **kwargs)
+        self._chunks.append(data)
+        if not data or amt is None:
+            self._finish()
+        return data
+
+    def _finish(self):
+        if self._done is not None:
+            done, self._done = self._done, None
+            done(b"".join(self._chunks))
+
+    def close(self):
+        self._finish()
+        self._raw.close()
+
+    def release_conn(self):
+        self._finish()
+        self._raw.release_conn()
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+
+class RecordingAdapter(HTTPAdapter):
+    def __init__(self, cassette: Cassette, **kwargs):
+        super().__init__(**kwargs)
+        self.cassette = cassette
+
+    def send(self, request, stream=False, **kwargs):
+        wall, t0 = time.time(), time.perf_counter()
+        resp = super().send(request, stream=True, **kwargs)
+        secrets = _secrets(request)
+        entry = {
+            "at": round(wall, 3), "latency": round(time.perf_counter() - t0, 4),
+            "method": request.method, "url": request.url, "account": _account(request),
+            "request_body": _body(request), "status": resp.status_code,
+            "headers": {k: _redact(v, secrets) for k, v in resp.headers.items()
+                        if k.lower() not in _DROP_HEADERS},
+        }
+
+        def done(data: bytes):
+            self.cassette.write({**entry, **_encode(data, secrets)})
+
+        resp.raw = _Tee(resp.raw, done)
+        if not stream:
+            resp.content  # read now, exactly like a non-streamed request
+        return resp
+
+
+# ───────────────────────── replay ───────────────────────── #
+
+class ReplayAdapter(BaseAdapter):
+    def __init__(self, cassette: Cassette, speed: float = 1.0):
+        super().__init__()
+        self.cassette, self.speed = cassette, speed
+
+    def send(self, request, stream=False, **kwargs):
+        entry = self.cassette.take(request)
+        if entry is None:
+            raise requests.ConnectionError(f"no recorded response for {request.method} "
+                                           f"{request.url}", request=request)
+        if self.speed > 0:
+            time.sleep(entry["latency"] * self.speed)
+        data = (base64.b64decode(entry["body64"]) if "body64" in entry
+                else _restore(entry.get("body", ""), _secrets(request)).encode("utf-8"))
+        headers = CaseInsensitiveDict(entry["headers"])
+        if "Date" in headers:
+            try:
+                offset = parsedate_to_datetime(headers["Date"]).timestamp() - entry["at"]
+                headers["Date"] = formatdate(time.time() + offset, usegmt=True)
+            except (TypeError, ValueError):
+                pass
+
+        resp = requests.Response()
+        resp.status_code = entry["status"]
+        resp.headers = headers
+        resp.raw = io.BytesIO(data)
+        resp.url = request.url
+        resp.request = request
+        resp.reason = "REPLAY"
+        resp.encoding = get_encoding_from_headers(headers)
+        if not stream:
+            resp.content
+        return resp
+
+    def close(self):
+        pass
+
+
+def install(session: requests.Session, path: str, mode: str, speed: float = 1.0,
+            **adapter_kwargs) -> Cassette:
+    """Mount the record or replay adapter for http:// and https:// on ``session``."""
+    if mode not in (RECORD, REPLAY):
+        raise ValueError(f"LICHESS_CASSETTE_MODE must be {RECORD!r} or {REPLAY!r}, not {mode!r}")
+    cassette = Cassette(path, mode)
+    adapter = (RecordingAdapter(cassette, **adapter_kwargs) if mode == RECORD
+               else ReplayAdapter(cassette, speed))
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return cassette
+
+
+def install_from_env(session: requests.Session, **adapter_kwargs) -> Optional[Cassette]:
+    path = os.environ.get("LICHESS_CASSETTE")
+    if not path:
+        return None
+    return install(session, path, os.environ.get("LICHESS_CASSETTE_MODE", REPLAY),
+                   float(os.environ.get("LICHESS_CASSETTE_SPEED", "1")), **adapter_kwargs)
+
+
+def summary(path: str) -> str:
+    import lichess_client as lc
+    from bench import percentile
+
+    rows = collections.defaultdict(list)
+    codes = collections.defaultdict(collections.Counter)
+    entries = load(path)
+    for e in entries:
+        name = f"{e['method']} {lc.endpoint_name(urlsplit(e['url']).path)}"
+        rows[name].append(e["latency"])
+        codes[name][e["status"]] += 1
+    lines = [f"{len(entries)} exchanges over "
+             f"{(entries[-1]['at'] - entries[0]['at']) if entries else 0:.1f} s",
+             f"{'endpoint':<32}{'n':>6}{'p50 ms':>9}{'p99 ms':>9}  status"]
+    for name, lat in sorted(rows.items()):
+        lat.sort()
+        status = " ".join(f"{c}×{n}" for c, n in sorted(codes[name].items()))
+        lines.append(f"{name:<32}{len(lat):>6}{percentile(lat, 0.5) * 1000:>9.0f}"
+                     f"{percentile(lat, 0.99) * 1000:>9.0f}  {status}")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3 or sys.argv[1] != "summary":
+        sys.exit("usage: python cassette.py summary FILE")
+    print(summary(sys.argv[2]))
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Single entry point for every job in this repo.
+
+    python cli.py create [--plan schedule.toml] [--days N] …
+    python cli.py join                          # every TOKEN# account, all upcoming Swisses
+    python cli.py join-qualifiers [--daemon]    # LICHESS_KEY, "Cash Tournament Qualifier" only
+    python cli.py join-withdraw                 # LICHESS_KEY, TEAM_ID
+    python cli.py withdraw-watch --team chess-blasters-2
+    python cli.py kick <team_id> [--file kick.txt] …
+    python cli.py team-msg [--team testingsboy] [--message "Hi guys"]
+    python cli.py arena-join [--tournament ID] [--team SLUG]
+    python cli.py arena-join --discover --name "Team Battle" --within 48
+    python cli.py leaderboard build <team_id> [--top 20]
+    python cli.py export-games <team_id> [--days 7]
+    python cli.py roster sync|check|count <team_id> …
+
+Only this file and the standard library are loaded until a subcommand is
+chosen and its environment and config files have been checked, so a missing
+secret fails in milliseconds without importing ``requests`` or touching the
+network.  The time to reach the command is printed to stderr
+(``LICHESS_CLI_QUIET=1`` hides it).
+"""
+
+import argparse
+import importlib
+import os
+import sys
+import time
+from collections import namedtuple
+
+_T0 = time.perf_counter()
+
+# env: each entry is a group of alternatives ("X*" matches a prefix,
+# "TOKEN#" the name alone or followed by digits);
+# every group needs one non-empty variable.
+Command = namedtuple("Command", "module func env help forward")
+
+COMMANDS = {
+    "create": Command("create_tournament", "main", [("LICHESS_KEY",)],
+                      "create the Swisses of a plan file", True),
+    "join": Command("join_swiss", "main", [("TOKEN#",)],
+                    "join every upcoming team Swiss with all TOKEN# accounts", False),
+    "join-qualifiers": Command("ja", "main", [("LICHESS_KEY",)],
+                               "join upcoming qualifiers (optionally as a daemon)", True),
+    "join-withdraw": Command("jw", "main", [("LICHESS_KEY",)],
+                             "join upcoming Swisses now, withdraw 3 min before each start",
+                             False),
+    "withdraw-watch": Command("withdraw_watch", "main",
+                              [("LICHESS_KEY", "LICHESS_KEYS", "T", "L")],
+                              "always-on auto-withdraw bot", False),
+    "kick": Command("kick", "main", [("BR",)], "bulk-kick listed users from a team", True),
+    "team-msg": Command("send_team_msg", "main", [("LICHESS_KEY",)],
+                        "message every member of a team", False),
+    "arena-join": Command("join_tournament", "main", [("TOR#",)],
+                          "join an arena / team battle, or --discover the team's", True),
+    "leaderboard": Command("leaderboard", "main", [],
+                           "qualifier leaderboard from finished Swiss results", True),
+    "export-games": Command("pgn_export", "main", [],
+                            "stream finished Swiss games to a compact TSV", True),
+    "roster": Command("team_roster", "main", [],
+                      "sync / query the local team roster index", True),
+}
+
+
+def _present(name: str) -> bool:
+    if name.endswith("*"):
+        return any(k.startswith(name[:-1]) and v.strip() for k, v in os.environ.items())
+    if name.endswith("#"):
+        base = name[:-1]
+        return any(k.startswith(base) and (k == base or k[len(base):].isdigit()) and v.strip()
+                   for k, v in os.environ.items())
+    return bool(os.environ.get(name, "").strip())
+
+
+def missing_env(cmd: Command) -> list:
+    return [" or ".join(group) for group in cmd.env if not any(map(_present, group))]
+
+
+def _option(argv, flag, default=None):
+    for i, arg in enumerate(argv):
+        if arg == flag and i + 1 < len(argv):
+            return argv[i + 1]
+        if arg.startswith(flag + "="):
+            return arg.split("=", 1)[1]
+    return default
+
+
+def missing_files(name: str, argv: list) -> list:
+    """Config files the command will read, checked before anything is imported."""
+    here = os.path.dirname(os.path.abspath(__file__))
+    if name == "create":
+        paths = [_option(argv, "--plan", os.environ.get("CREATE_PLAN")
+                         or os.path.join(here, "schedule.toml"))]
+    elif name == "kick":
+        paths = [_option(argv, "--file", "kick.txt")]
+    else:
+        paths = []
+    return [p for p in paths if not os.path.exists(p)]
+
+
+def build_parser() -> argparse.ArgumentParser:
+    ap = argparse.ArgumentParser(prog="cli.py", description=__doc__.split("\n\n")[0].strip())
+    sub = ap.add_subparsers(dest="command", required=True, metavar="command")
+    for name, cmd in COMMANDS.items():
+        # forwarding commands have their own argparse and get the rest of argv
+        sub.add_parser(name, help=cmd.help, add_help=not cmd.forward)
+    sub.choices["withdraw-watch"].add_argument(
+        "--team", dest="default_team", default=os.environ.get("TEAM_ID", "chess-blasters-2"))
+    sub.choices["team-msg"].add_argument("--team", dest="team_id")
+    sub.choices["team-msg"].add_argument("--message")
+    return ap
+
+
+def main(argv=None) -> int:
+    parser = build_parser()
+    args, forwarded = parser.parse_known_args(argv)
+    cmd = COMMANDS[args.command]
+    if forwarded and not cmd.forward:
+        parser.error(f"unrecognized arguments: {' '.join(forwarded)}")
+    wants_help = any(a in ("-h", "--help") for a in forwarded)
+
+    if not wants_help:
+        problems = [f"missing environment variable {m}" for m in missing_env(cmd)]
+        problems += [f"file not found: {p}" for p in missing_files(args.command, forwarded)]
+        if problems:
+            for p in problems:
+                print(f"❌ {args.command}: {p}", file=sys.stderr)
+            return 2
+
+    t_import = time.perf_counter()
+    func = getattr(importlib.import_module(cmd.module), cmd.func)
+    ready = time.perf_counter()
+    if os.environ.get("LICHESS_CLI_QUIET") != "1" and not wants_help:
+        print(f"⏱ {args.command} ready in {(ready - _T0) * 1000:.0f} ms "
+              f"(imports {(ready - t_import) * 1000:.0f} ms, "
+              f"process CPU {time.process_time() * 1000:.0f} ms)", file=sys.stderr)
+
+    if cmd.forward:
+        func(forwarded)
+    else:
+        func(**{k: v for k, v in vars(args).items() if k != "command" and v is not None})
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Estimate the offset between the local clock and lichess.org.
+
+Each response ``Date`` header (1 s resolution) brackets the server time: if
+the request left at local ``t0`` and the answer arrived at ``t1``, then
+
+    D - t1  <=  offset  <=  D + 1 - t0
+
+Intersecting these brackets over several samples taken at different
+sub-second phases narrows the estimate well below the header's resolution.
+``ServerClock.now()`` is a drop-in replacement for ``time.time()`` that
+returns the estimated server time, so the deadline scheduler can fire on the
+server's idea of "3 minutes before start" even when the runner's clock is off.
+"""
+
+import logging
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Optional
+
+import requests
+
+import lichess_client as lc
+import rate_governor
+
+DEFAULT_SAMPLES = 8
+SAMPLE_GAP_SEC = 0.13  # co-prime with 1 s so samples land on different phases
+
+
+class ServerClock:
+    """Local clock corrected by the estimated server offset (seconds)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._lo = float("-inf")
+        self._hi = float("inf")
+        self.offset = 0.0
+        self.rtt: Optional[float] = None
+        self.samples = 0
+
+    def now(self) -> float:
+        return time.time() + self.offset
+
+    @property
+    def uncertainty(self) -> float:
+        """Half-width of the current offset bracket (s); inf before any sample."""
+        return (self._hi - self._lo) / 2
+
+    def observe(self, resp: requests.Response, t0: float, t1: float):
+        """Fold one response's ``Date`` header into the estimate."""
+        date = resp.headers.get("Date")
+        if not date:
+            return
+        try:
+            server = parsedate_to_datetime(date).timestamp()
+        except (TypeError, ValueError):
+            return
+        lo, hi = server - t1, server + 1 - t0
+        with self._lock:
+            new_lo, new_hi = max(self._lo, lo), min(self._hi, hi)
+            if new_lo > new_hi:
+                # brackets disagree: the local clock was stepped — start over
+                new_lo, new_hi = lo, hi
+            self._lo, self._hi = new_lo, new_hi
+            self.offset = (new_lo + new_hi) / 2
+            self.rtt = t1 - t0 if self.rtt is None else min(self.rtt, t1 - t0)
+            self.samples += 1
+
+    def sync(self, samples: int = DEFAULT_SAMPLES, url: Optional[str] = None) -> float:
+        """Take a fresh set of samples and return the new offset."""
+        url = url or lc.SITE_ROOT
+        with self._lock:
+            self._lo, self._hi = float("-inf"), float("inf")
+        gov = rate_governor.governor()
+        for i in range(samples):
+            if gov is not None:
+                gov.acquire(None)  # before t0: a wait for a slot is not network time
+            t0 = time.time()
+            try:
+                resp = lc.request("HEAD", url, timeout=5, retry_429=0, governed=False)
+            except requests.RequestException as e:
+                logging.warning("clock sync sample failed: %s", e)
+                continue
+            t1 = time.time()
+            self.observe(resp, t0, t1)
+            if i + 1 < samples:
+                time.sleep(SAMPLE_GAP_SEC)
+        logging.info("Server clock offset %+.3f s (±%.3f s, rtt %s ms)",
+                     self.offset, self.uncertainty,
+                     "?" if self.rtt is None else f"{self.rtt * 1000:.0f}")
+        return self.offset
@@ -1,86 +1,53 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
+"""
+Create the Swisses listed in the plan file (schedule.toml by default).
 
-import os
-import datetime as dt
-import pathlib
-import requests
-from zoneinfo import ZoneInfo
-
-TOKEN = os.environ["LICHESS_KEY"].strip('"')
-TEAM = "online-world-chess-lovers"
-ROUNDS = 7
-IST = ZoneInfo("Asia/Kolkata")
-DELAY_DAYS = 4
-
-headers = {"Authorization": f"Bearer {TOKEN}"}
-URL = f"https://lichess.org/api/swiss/new/{TEAM}"
-
-DESC_FILE = pathlib.Path(__file__).with_name("description.txt")
-try:
-    LONG_DESC = DESC_FILE.read_text(encoding="utf-8").strip()
-except FileNotFoundError:
-    raise SystemExit("❌ description.txt not found!")
+The plan is compiled once (schedule_plan.py), slots that already exist on
+the team or in the state store are dropped, and the rest go to the batch
+creator.  ``--team`` / ``--days`` override the plan for a one-off run.
+"""
 
-SCHEDULE = [
-    ("00:20", "Cash Tournament Qualifier", 10, 0),
-    ("01:20", "Cash Tournament Qualifier", 3, 2),
-    ("02:20", "Cash Tournament Qualifier", 5, 0),
-    ("03:20", "Cash Tournament Qualifier", 7, 2),
-    ("04:20", "Cash Tournament Qualifier", 3, 0),
-    ("05:20", "Cash Tournament Qualifier", 5, 2),
-    ("06:20", "Cash Tournament Qualifier", 10, 0),
-    ("07:20", "Cash Tournament Qualifier", 5, 2),
-    ("08:20", "Cash Tournament Qualifier", 3, 0),
-    ("09:20", "Cash Tournament Qualifier", 10, 0),
-    ("10:20", "Cash Tournament Qualifier", 3, 2),
-    ("11:20", "Cash Tournament Qualifier", 5, 0),
-    ("12:20", "Cash Tournament Qualifier", 7, 2),
-    ("13:20", "Cash Tournament Qualifier", 3, 0),
-    ("14:20", "Cash Tournament Qualifier", 5, 2),
-    ("15:20", "Cash Tournament Qualifier", 10, 5),
-    ("16:20", "Cash Tournament Qualifier", 5, 0),
-    ("17:20", "Cash Tournament Qualifier", 3, 0),
-    ("18:20", "Cash Tournament Qualifier", 5, 2),
-    ("19:20", "Cash Tournament Qualifier", 10, 0),
-    ("20:20", "Cash Tournament Qualifier", 7, 2),
-    ("21:20", "Cash Tournament Qualifier", 3, 2),
-    ("22:20", "Cash Tournament Qualifier", 5, 0),
-    ("23:20", "Cash Tournament Qualifier", 3, 0),
-]
-
-def scheduled_time_utc(time_str: str) -> dt.datetime:
-    hh, mm = map(int, time_str.split(":"))
-    now_ist = dt.datetime.now(IST)
-    target_date = (now_ist + dt.timedelta(days=DELAY_DAYS)).date()
-    start_ist = dt.datetime.combine(
-        target_date,
-        dt.time(hh, mm),
-        tzinfo=IST
-    )
-    return start_ist.astimezone(dt.timezone.utc)
-
-def create_tmt(name: str, minutes: int, inc: int, start_utc: dt.datetime) -> None:
-    payload = {
-        "name": name[:30],
-        "clock.limit": minutes * 60,
-        "clock.increment": inc,
-        "startsAt": start_utc.strftime("%Y-%m-%dT%H:%M:%SZ"),
-        "nbRounds": ROUNDS,
-        "variant": "standard",
-        "rated": "true",
-        "description": LONG_DESC,
-        "conditions.playYourGames": "true",
-    }
-
-    r = requests.post(URL, headers=headers, data=payload, timeout=15)
+import os
+import sys
+import argparse
+
+import lichess_client as lc
+import metrics
+from batch_create import DEFAULT_CONCURRENCY, batch_create, job_key, missing_jobs, print_summary
+from schedule_plan import DEFAULT_PLAN, PlanError, compile_file
+from state_store import open_store
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Create the Swisses of a plan file.")
+    ap.add_argument("--plan", default=os.environ.get("CREATE_PLAN", str(DEFAULT_PLAN)),
+                    help="TOML or JSON plan (default: schedule.toml)")
+    ap.add_argument("--team", action="append", dest="teams",
+                    help="create for this team instead of the plan's (repeatable)")
+    ap.add_argument("--days", type=int,
+                    help="number of consecutive days to create, overriding the plan")
+    ap.add_argument("--concurrency", type=int,
+                    default=int(os.environ.get("CREATE_CONCURRENCY", DEFAULT_CONCURRENCY)))
+    args = ap.parse_args(argv)
+
+    token = lc.clean_token(os.environ.get("LICHESS_KEY"))
+    if not token:
+        sys.exit("❌ LICHESS_KEY is not set")
+    try:
+        planned = compile_file(args.plan, teams=args.teams, days=args.days)
+    except (PlanError, OSError, ValueError) as e:
+        sys.exit(f"❌ {e}")
+    metrics.setup()
+
+    with open_store() as store:
+        jobs, skipped = missing_jobs(token, planned, store.created_keys())
+        outcomes = batch_create(token, jobs, args.concurrency)
+        for o in outcomes:
+            if o.result.outcome == lc.OK:
+                store.record_created(job_key(o.job), o.swiss_id, o.url)
+    print_summary(outcomes, skipped)
 
-    if r.status_code == 200:
-        print(f"✅ {name:<25} → {r.json().get('url')}")
-    else:
-        print(f"❌ {name:<25} ({r.status_code}) {r.text[:120]}")
 
 if __name__ == "__main__":
-    for time_str, title, mins, inc in SCHEDULE:
-        start = scheduled_time_utc(time_str)
-        create_tmt(title, mins, inc, start)
+    main()
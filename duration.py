@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+How long a Swiss runs, and how to fit the most of them into a day.
+
+``DurationModel`` estimates a tournament's length from its clock and number
+of rounds::
+
+    round  = usage · 2 · (limit + 40 · increment) + gap
+    total  = rounds · round + slack
+
+``usage`` (share of the nominal game time actually played) and ``gap``
+(pairing pause between rounds) start from conservative defaults and can be
+calibrated from finished tournaments: their real end is the last
+``lastMoveAt`` of ``/api/swiss/{id}/games``, and a least-squares fit of
+seconds-per-round against nominal game time gives both parameters.  ``slack``
+is the 90th-percentile under-estimate seen during the fit.
+
+``pack_day()`` then builds an overlap-free daily schedule: every requested
+clock appears at least ``min`` times, the remaining room goes to the shortest
+events (which maximises the count), same-clock events are spread apart and
+starts are aligned to a grid.  The result is a ``slots`` list for schedule.toml.
+
+    python duration.py calibrate chess-blasters-2 --count 20
+    python duration.py pack 3+0 5+0 10+0 --rounds 7 --first 00:20 --grid 5
+"""
+
+import argparse
+import json
+import math
+import os
+import pathlib
+import sys
+from collections import Counter
+from dataclasses import asdict, dataclass, replace
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import lichess_client as lc
+
+DEFAULT_PATH = os.environ.get("DURATION_MODEL", ".state/duration-model.json")
+EXPECTED_MOVES = 40
+DAY_SEC = 86400
+
+
+def nominal_game_sec(limit: int, increment: int) -> float:
+    """Both players' clocks for an ``EXPECTED_MOVES``-move game, in seconds."""
+    return 2 * (limit + EXPECTED_MOVES * increment)
+
+
+@dataclass(frozen=True)
+class DurationModel:
+    usage: float = 0.8      # fraction of the nominal game time a round takes
+    gap: float = 60.0       # seconds between the end of a round and the next pairing
+    slack: float = 300.0    # safety margin per tournament
+    samples: int = 0        # tournaments the model was calibrated on
+
+    def round_sec(self, limit: int, increment: int) -> float:
+        return self.usage * nominal_game_sec(limit, increment) + self.gap
+
+    def estimate(self, limit: int, increment: int, rounds: int) -> float:
+        """Expected seconds from start to the end of the last round."""
+        return rounds * self.round_sec(limit, increment)
+
+    def budget(self, limit: int, increment: int, rounds: int) -> float:
+        """Seconds to reserve in a schedule: the estimate plus the slack."""
+        return self.estimate(limit, increment, rounds) + self.slack
+
+    def calibrate(self, observations: Iterable[Tuple[int, int, int, float]]) -> "DurationModel":
+        """Refit from ``(limit, increment, rounds, seconds)`` of finished events."""
+        obs = [(nominal_game_sec(l, i), r, s) for l, i, r, s in observations if r > 0 and s > 0]
+        if not obs:
+            return self
+        xs = [x for x, _, _ in obs]
+        ys = [s / r for _, r, s in obs]
+        n, mx, my = len(obs), sum(xs) / len(xs), sum(ys) / len(ys)
+        sxx = sum((x - mx) ** 2 for x in xs)
+        if sxx > 0:
+            usage = sum((x - mx) * (y - my) for x, y in zip(xs, ys)) / sxx
+            gap = my - usage * mx
+        else:  # a single clock: keep the gap, fit the usage only
+            usage, gap = (my - self.gap) / mx, self.gap
+        usage, gap = max(0.05, usage), max(0.0, gap)
+        fitted = replace(self, usage=usage, gap=gap, samples=n)
+        under = sorted(s - fitted.estimate_from_nominal(x, r) for x, r, s in obs)
+        slack = max(0.0, under[min(n - 1, math.ceil(0.9 * n) - 1)])
+        return replace(fitted, slack=slack)
+
+    def estimate_from_nominal(self, nominal: float, rounds: int) -> float:
+        return rounds * (self.usage * nominal + self.gap)
+
+    # ───────── persistence ───────── #
+
+    @classmethod
+    def load(cls, path: str = DEFAULT_PATH) -> "DurationModel":
+        try:
+            return cls(**json.loads(pathlib.Path(path).read_text(encoding="utf-8")))
+        except (OSError, ValueError, TypeError):
+            return cls()
+
+    def save(self, path: str = DEFAULT_PATH):
+        p = pathlib.Path(path)
+        p.parent.mkdir(parents=True, exist_ok=True)
+        tmp = p.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(asdict(self)), encoding="utf-8")
+        os.replace(tmp, p)
+
+
+# ───────────────────────── calibration ───────────────────────── #
+
+def observed_seconds(swiss: lc.Swiss, token: Optional[str] = None) -> Optional[float]:
+    """Start to last move of a finished Swiss, from its games export."""
+    last = 0
+    with lc.request("GET", f"swiss/{swiss.id}/games", token, accept="application/x-ndjson",
+                    params={"moves": "false", "pgnInJson": "false"}, stream=True,
+                    timeout=60) as res:
+        res.raise_for_status()
+        for game in lc.iter_ndjson(res):
+            last = max(last, int(game.get("lastMoveAt") or 0))
+    return (last - swiss.starts_ms) / 1000 if last > swiss.starts_ms else None
+
+
+def calibrate_from_team(team_id: str, token: Optional[str] = None, count: int = 20,
+                        model: Optional[DurationModel] = None) -> DurationModel:
+    model = model or DurationModel()
+    obs = []
+    for s in lc.iter_team_swiss(team_id, token, status="finished", max=count):
+        secs = observed_seconds(s, token)
+        if secs is not None:
+            obs.append((s.clock_limit, s.clock_increment, s.nb_rounds, secs))
+    return model.calibrate(obs)
+
+
+# ───────────────────────── packing ───────────────────────── #
+
+def parse_clock(spec: str) -> Tuple[int, int]:
+    """``"5+3"`` → (300, 3); minutes may be fractional (``"0.5+0"``)."""
+    minutes, inc = spec.split("+")
+    return round(float(minutes) * 60), int(inc)
+
+
+def clock_label(limit: int, increment: int) -> str:
+    return f"{limit / 60:g}+{increment}"
+
+
+def _spread(counts: Dict[Tuple[int, int], int]) -> List[Tuple[int, int]]:
+    """Order events so equal clocks are as far apart as possible."""
+    keyed = []
+    for clock, n in counts.items():
+        keyed += [((k + 0.5) / n, clock) for k in range(n)]
+    keyed.sort()
+    return [clock for _, clock in keyed]
+
+
+def pack_day(clocks: Sequence[Tuple[int, int]], rounds: int, model: DurationModel,
+             first_start: int = 0, grid: int = 300, minimum: int = 1,
+             maximum: Optional[int] = None) -> List[Tuple[int, int, int]]:
+    """Overlap-free daily plan as ``(start_sec_of_day, limit, increment)``.
+
+    Each event occupies its budget rounded up to ``grid``; the schedule must
+    repeat daily, so the last event ends before ``first_start`` on the next day.
+    """
+    if not clocks:
+        return []
+    slots = {c: math.ceil(model.budget(*c, rounds) / grid) for c in clocks}
+    room = DAY_SEC // grid
+    counts = Counter({c: minimum for c in clocks})
+    used = sum(slots[c] * minimum for c in clocks)
+    if used > room:
+        raise ValueError(f"{minimum} of each clock need {used * grid / 3600:.1f} h — "
+                         "more than a day")
+    # most events ⇔ always add the shortest one that still fits
+    for c in sorted(clocks, key=lambda c: slots[c]):
+        while used + slots[c] <= room and (maximum is None or counts[c] < maximum):
+            counts[c] += 1
+            used += slots[c]
+
+    plan, t = [], first_start
+    for c in _spread(counts):
+        plan.append((t % DAY_SEC, *c))
+        t += slots[c] * grid
+    return plan
+
+
+def find_overlaps(jobs, model: DurationModel) -> List[Tuple[object, object]]:
+    """Pairs of same-team CreateJobs whose budgeted runs overlap."""
+    spans = sorted(
+        (job.team, lc.iso_to_epoch_ms(job.payload["startsAt"]) / 1000,
+         model.budget(job.payload["clock.limit"], job.payload["clock.increment"],
+                      job.payload["nbRounds"]), i, job)
+        for i, job in enumerate(jobs))
+    found = []
+    for a, b in zip(spans, spans[1:]):
+        if a[0] == b[0] and a[1] + a[2] > b[1]:
+            found.append((a[4], b[4]))
+    return found
+
+
+def to_slots(plan: Iterable[Tuple[int, int, int]]) -> List[Dict[str, str]]:
+    return [{"time": f"{start // 3600:02d}:{start % 3600 // 60:02d}",
+             "clock": clock_label(limit, inc)} for start, limit, inc in plan]
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Swiss duration model and daily slot packing.")
+    ap.add_argument("--model", default=DEFAULT_PATH)
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    cal = sub.add_parser("calibrate", help="fit the model on a team's finished Swisses")
+    cal.add_argument("team")
+    cal.add_argument("--count", type=int, default=20)
+    pk = sub.add_parser("pack", help="print an overlap-free slots list for schedule.toml")
+    pk.add_argument("clocks", nargs="+", help="clocks like 3+0 5+2 10+0")
+    pk.add_argument("--rounds", type=int, default=7)
+    pk.add_argument("--first", default="00:20", help="first start, HH:MM")
+    pk.add_argument("--grid", type=int, default=5, help="start granularity in minutes")
+    pk.add_argument("--min", type=int, default=1, help="events per clock at least")
+    pk.add_argument("--max", type=int, help="events per clock at most")
+    args = ap.parse_args()
+
+    model = DurationModel.load(args.model)
+    if args.cmd == "calibrate":
+        token = lc.clean_token(os.environ.get("LICHESS_KEY")) or None
+        model = calibrate_from_team(args.team, token, args.count, model)
+        model.save(args.model)
+        print(f"usage={model.usage:.3f} gap={model.gap:.0f}s slack={model.slack:.0f}s "
+              f"({model.samples} tournaments)")
+        return
+
+    clocks = [parse_clock(c) for c in args.clocks]
+    hh, mm = map(int, args.first.split(":"))
+    try:
+        plan = pack_day(clocks, args.rounds, model, hh * 3600 + mm * 60, args.grid * 60,
+                        args.min, args.max)
+    except ValueError as e:
+        sys.exit(f"❌ {e}")
+    print("slots = [")
+    for slot in to_slots(plan):
+        print(f'    {{ time = "{slot["time"]}", clock = "{slot["clock"]}" }},')
+    print("]")
+    per_clock = Counter(clock_label(l, i) for _, l, i in plan)
+    print(f"# {len(plan)} events/day: " + ", ".join(f"{n}× {c}" for c, n in per_clock.items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Token × target fan-out executor.
+
+``fan_out()`` runs ``fn(token, target)`` for every pair on one shared worker
+pool.  Each token gets its own ordered queue drained by at most
+``per_token`` lanes, so requests for one account go out in the given order
+and never exceed that account's concurrency cap, while different accounts
+proceed in parallel.  Duplicate pairs are dropped before anything is sent.
+"""
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import lichess_client as lc
+from state_store import account_key
+
+DEFAULT_WORKERS = 16
+DEFAULT_PER_TOKEN = 2
+
+
+@dataclass
+class FanOutReport:
+    results: Dict[Tuple[str, str], lc.Result]
+    wall_time: float
+
+    def counts(self) -> Dict[str, int]:
+        out: Dict[str, int] = {}
+        for r in self.results.values():
+            out[r.outcome] = out.get(r.outcome, 0) + 1
+        return out
+
+
+def fan_out(tokens: Iterable[str], targets: Iterable[str],
+            fn: Callable[[str, str], lc.Result],
+            workers: int = DEFAULT_WORKERS,
+            per_token: int = DEFAULT_PER_TOKEN,
+            skip: Optional[Callable[[str, str], bool]] = None) -> FanOutReport:
+    """Apply ``fn`` to every distinct (token, target) pair, concurrently.
+
+    Pairs for which ``skip(token, target)`` is true are not sent at all.
+    """
+    tokens = list(dict.fromkeys(tokens))
+    targets = list(dict.fromkeys(targets))
+    queues = {t: deque(x for x in targets if not (skip and skip(t, x))) for t in tokens}
+    locks = {t: threading.Lock() for t in tokens}
+    results: Dict[Tuple[str, str], lc.Result] = {}
+    results_lock = threading.Lock()
+
+    def lane(token: str):
+        while True:
+            with locks[token]:
+                if not queues[token]:
+                    return
+                target = queues[token].popleft()
+            res = fn(token, target)
+            with results_lock:
+                results[(token, target)] = res
+
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        # interleave lanes across tokens so no account waits behind another
+        futures = [pool.submit(lane, t) for i in range(max(1, per_token))
+                   for t in tokens if i < len(queues[t])]
+        wait(futures)
+        for f in futures:
+            f.result()
+    return FanOutReport(results, time.monotonic() - started)
+
+
+def print_matrix(report: FanOutReport, tokens: List[str], targets: List[str],
+                 names: Optional[Dict[str, str]] = None):
+    """Print a token × target grid of outcomes followed by totals and wall time."""
+    symbol = {lc.OK: "✔", lc.ALREADY: "•", lc.FAILED: "✖", lc.ERROR: "!"}
+    # "-" marks pairs that were skipped and never sent
+    names = names or {}
+    labels = [names.get(t) or account_key(t)[:8] for t in tokens]  # never a token prefix
+    width = max([len(x) for x in targets] + [8])
+    print(f"{'':<{width}} " + " ".join(f"{l:^10}" for l in labels))
+    for target in targets:
+        cells = (symbol.get(report.results[(t, target)].outcome, "?")
+                 if (t, target) in report.results else "-" for t in tokens)
+        print(f"{target:<{width}} " + " ".join(f"{c:^10}" for c in cells))
+    counts = ", ".join(f"{k}: {v}" for k, v in sorted(report.counts().items()))
+    print(f"\n{len(report.results)} requests ({counts}) in {report.wall_time:.2f}s")
@@ -5,105 +5,163 @@ created by the Chess-Blasters-2 team.
 Uses a single Lichess token stored in the LICHESS_KEY environment variable.
 Handles tokens that may include quotes.
 Joins tournaments in ascending order of start time.
+
+With ``--daemon`` it keeps running and polls the team list adaptively: every
+``--min-interval`` s around known creation times (``JA_CREATE_AT``, UTC
+``HH:MM`` list matching the create workflow's cron) and shortly before any
+start, otherwise backing off exponentially up to ``--max-interval`` s while
+the list is unchanged.  Polls are conditional (ETag), and only tournament
+ids not seen before are acted on.
 """
 
+import argparse
 import os
-import time
-import json
 import logging
+import time
+from typing import Iterable, List, Optional
+
 import requests
-from datetime import datetime, timezone
-from typing import List, Dict
+
+import lichess_client as lc
+import metrics
+from state_store import open_store
 
 TEAM_ID = "chess-blasters-2"
-API_ROOT = "https://lichess.org/api"
-HEADERS_NDJSON = {"Accept": "application/x-ndjson"}
+QUALIFIER = "Cash Tournament Qualifier"
+CREATE_AT = [t for t in os.environ.get("JA_CREATE_AT", "09:10").split(",") if t]
+HOT_WINDOW_SEC = 600
 
 
 # ───────────────────────── helpers ───────────────────────── #
 
-def iso_to_epoch_ms(iso_str: str) -> int:
-    """Convert '2025-11-07T18:30:00Z' → int milliseconds since epoch."""
-    dt = datetime.strptime(iso_str, "%Y-%m-%dT%H:%M:%SZ")
-    return int(dt.replace(tzinfo=timezone.utc).timestamp() * 1000)
-
-
-def get_upcoming_swiss(token: str) -> List[Dict]:
-    """Return Swiss events whose start time is still in the future."""
-    url = f"{API_ROOT}/team/{TEAM_ID}/swiss"
-    headers = dict(HEADERS_NDJSON)
-    headers["Authorization"] = f"Bearer {token}"
-
-    res = requests.get(url, headers=headers, timeout=15)
-    res.raise_for_status()
-
-    now_ms = int(time.time() * 1000)
-    upcoming = []
-
-    for line in res.iter_lines(decode_unicode=True):
-        if not line:
-            continue
-        obj = json.loads(line)
-        iso_start = obj.get("startsAt")
-        if not iso_start:
-            continue
-        try:
-            starts_ms = iso_to_epoch_ms(iso_start)
-        except ValueError:
-            logging.warning("Unparsable startsAt: %s", iso_start)
-            continue
-
-        if starts_ms > now_ms:
-            obj["_startsMs"] = starts_ms  # cache parsed value for later
-            upcoming.append(obj)
-
-    # Sort by start time ascending
-    upcoming.sort(key=lambda x: x["_startsMs"])
-    return upcoming
-
-
-def join(token: str, swiss_id: str):
-    url = f"{API_ROOT}/swiss/{swiss_id}/join"
-    res = requests.post(url,
-                        headers={"Authorization": f"Bearer {token}"},
-                        timeout=15)
-    if res.status_code == 200:
+def join(token: str, swiss_id: str) -> lc.Result:
+    res = lc.join(token, swiss_id)
+    if res.outcome == lc.OK:
         logging.info("✔ Joined %s", swiss_id)
-    elif res.status_code == 400 and "already" in res.text:
+    elif res.outcome == lc.ALREADY:
         logging.info("• Already joined %s", swiss_id)
     else:
         logging.warning("✖ %s → %d %s",
-                        swiss_id, res.status_code, res.text.strip()[:120])
+                        swiss_id, res.status_code, res.text[:120])
+    return res
+
+
+def join_qualifiers(store, token: str, swiss_events: Iterable[lc.Swiss]) -> List[lc.Result]:
+    joined = store.done(token, "join")
+    results = []
+    for t in swiss_events:
+        # Only join if tournament name matches exactly
+        if t.name != QUALIFIER:
+            logging.info("Skipping %s | %s", t.id, t.name)
+        elif t.id in joined:
+            logging.info("= Already joined %s (state store)", t.id)
+        else:
+            logging.info("→ %s | %s | Starts: %s", t.id, t.name, t.starts_at)
+            res = join(token, t.id)
+            store.record_action(token, "join", res)
+            results.append(res)
+    return results
+
+
+def transient(res: lc.Result) -> bool:
+    """Worth retrying on the next poll: no answer, 429 or a 5xx."""
+    return res.outcome == lc.ERROR or res.status_code == 429 or res.status_code >= 500
+
+
+# ───────────────────────── daemon ───────────────────────── #
+
+class AdaptivePoller:
+    """Poll interval that is short around hot moments and doubles while idle."""
+
+    def __init__(self, min_sec: float = 5.0, max_sec: float = 300.0,
+                 hot_window: float = HOT_WINDOW_SEC, create_at: Iterable[str] = CREATE_AT):
+        self.min_sec = min_sec
+        self.max_sec = max_sec
+        self.hot_window = hot_window
+        self.create_at = [int(h) * 3600 + int(m) * 60
+                          for h, m in (t.strip().split(":") for t in create_at)]
+        self.interval = min_sec
+
+    def _hot_starts(self, now: float, starts: List[float]) -> List[float]:
+        """Beginnings of the hot windows around ``now`` (creation and start times)."""
+        day = now - now % 86400
+        moments = [day + k * 86400 + c for c in self.create_at for k in (-1, 0, 1)]
+        moments += [s - self.hot_window for s in starts]
+        return moments
+
+    def next_delay(self, changed: bool, starts_ms: Iterable[int] = (),
+                   now: Optional[float] = None) -> float:
+        now = time.time() if now is None else now
+        moments = self._hot_starts(now, [ms / 1000 for ms in starts_ms])
+        if changed or any(0 <= now - m < self.hot_window for m in moments):
+            self.interval = self.min_sec
+        else:
+            self.interval = min(self.max_sec, self.interval * 2)
+        # wake up in time for the next hot window even after a long back-off
+        upcoming = [m - now for m in moments if m > now]
+        return max(self.min_sec, min([self.interval] + upcoming))
+
+
+def daemon(token: str, min_sec: float, max_sec: float):
+    cache = lc.SwissListCache(TEAM_ID, token, ttl=0)
+    poller = AdaptivePoller(min_sec, max_sec)
+    rejected = set()  # refused for good (4xx): not retried while this process runs
+    with open_store() as store:
+        first = True
+        while True:
+            changed, swiss_events = False, []
+            try:
+                swiss_events = cache.get(force=True)
+                new = store.save_snapshot(TEAM_ID, swiss_events)
+                joined = store.done(token, "join")
+                # new events, plus qualifiers whose earlier join failed transiently
+                todo = [t for t in swiss_events
+                        if first or t.id in new
+                        or (t.name == QUALIFIER and t.id not in joined and t.id not in rejected)]
+                if new:
+                    logging.info("%d new tournament(s): %s", len(new), ", ".join(sorted(new)))
+                for res in join_qualifiers(store, token, todo):
+                    if not res.ok and not transient(res):
+                        rejected.add(res.target)
+                changed, first = bool(new), False
+            except requests.RequestException as e:
+                logging.warning("Swiss list fetch failed: %s", e)
+            delay = poller.next_delay(changed, (t.starts_ms for t in swiss_events))
+            logging.debug("next poll in %.0f s (%d fetches, %d not modified)",
+                          delay, cache.fetches, cache.not_modified)
+            time.sleep(delay)
 
 
 # ───────────────────────── main ───────────────────────── #
 
-def main():
+def main(argv=None):
     logging.basicConfig(level=logging.INFO, format="%(message)s")
-
-    token = os.environ.get("LICHESS_KEY")
+    ap = argparse.ArgumentParser(description=f"Join upcoming '{QUALIFIER}' Swisses of {TEAM_ID}.")
+    ap.add_argument("--daemon", action="store_true",
+                    help="keep running and poll the team list adaptively")
+    ap.add_argument("--min-interval", type=float, default=5.0)
+    ap.add_argument("--max-interval", type=float, default=300.0)
+    args = ap.parse_args(argv)
+    metrics.setup()
+
+    token = lc.clean_token(os.environ.get("LICHESS_KEY"))
     if not token:
         logging.error("No LICHESS_KEY found — nothing to do.")
         return
 
-    token = token.strip('"')  # automatically remove surrounding quotes
+    if args.daemon:
+        daemon(token, args.min_interval, args.max_interval)
+        return
 
-    swiss_events = get_upcoming_swiss(token)
+    swiss_events = lc.get_upcoming_swiss(TEAM_ID, token)
     if not swiss_events:
         logging.info("No upcoming Swiss tournaments to join.")
         return
 
-    for t in swiss_events:
-        swiss_id = t["id"]
-        name = t.get("name", "Unnamed")
-        start_iso = t["startsAt"]
-
-        # Only join if tournament name matches exactly
-        if name == "Cash Tournament Qualifier":
-            logging.info("→ %s | %s | Starts: %s", swiss_id, name, start_iso)
-            join(token, swiss_id)
-        else:
-            logging.info("Skipping %s | %s", swiss_id, name)
+    with open_store() as store:
+        new = store.save_snapshot(TEAM_ID, swiss_events)
+        logging.info("%d upcoming, %d new since last run.", len(swiss_events), len(new))
+        join_qualifiers(store, token, swiss_events)
 
 
 if __name__ == "__main__":
@@ -1,33 +1,283 @@
 #!/usr/bin/env python3
 """
-Join a Lichess arena (team-battle) tournament.
+Join Lichess arena (team-battle) tournaments.
+
+Single event (the default, as run by the workflow):
+
+    python join_tournament.py --tournament doF1DMaz --team royalracer-fans
+
+Batch: discover the team's upcoming arenas from ``/api/team/{id}/arena``,
+keep those matching ``--name`` (a case-insensitive regex) and starting within
+``--within`` hours, and join them with every configured token at once.  The
+``team`` field is sent only for team battles, and a battle our team is not
+part of is reported instead of being posted.
+
+    python join_tournament.py --discover --team royalracer-fans --name "Team Battle" --within 48
+
+Every run writes its per-event, per-account outcomes to ``--results`` (JSON,
+accounts as token hashes), merged with what earlier runs left there.
+``--retry`` re-sends only the pairs that failed according to that file;
+successful joins are also kept in the state store, so a plain rerun skips
+them as well.
 
 Env-vars expected
 -----------------
-TOR          – your personal Lichess OAuth token (with *tournament:write* scope)
+TOR, TOR1 …  – Lichess OAuth token(s) with *tournament:write* scope
 TMT_ID       – the 8-character tournament ID, e.g. "doF1DMaz"
 TEAM_ID      – the team slug, e.g. "royalracer-fans"
 """
 
+import argparse
+import json
+import logging
 import os
+import re
 import sys
-import requests
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import lichess_client as lc
+import metrics
+from fanout import fan_out, print_matrix
+from state_store import account_key, open_store
+from token_pool import TokenPool, load_tokens
 
-TOKEN   = os.environ["TOR"].strip('"')
 TMT_ID  = os.getenv("TMT_ID", "doF1DMaz")
 TEAM_ID = os.getenv("TEAM_ID", "royalracer-fans")
+TOKEN_SOURCES = ("TOR#",)  # TOR, TOR1, TOR2 … — never TORCH_HOME & co.
+RESULTS = os.environ.get("ARENA_RESULTS", ".state/arena-join.json")
+WORKERS = int(os.environ.get("JOIN_WORKERS", "16"))
+PER_TOKEN = int(os.environ.get("JOIN_PER_TOKEN", "2"))
+
+# arena "status" codes in the API
+CREATED, STARTED, FINISHED = 10, 20, 30
+
+
+@dataclass(frozen=True)
+class Arena:
+    """One line of the team arena NDJSON stream."""
+    id: str
+    name: str
+    starts_ms: int
+    status: int = CREATED
+    teams: Tuple[str, ...] = ()      # non-empty only for team battles
+    raw: Dict = field(default_factory=dict, repr=False, compare=False)
+
+    @property
+    def team_battle(self) -> bool:
+        return bool(self.teams) or "teamBattle" in self.raw
+
+    @property
+    def starts_at(self) -> str:
+        return lc.epoch_ms_to_iso(self.starts_ms)
+
+    @classmethod
+    def from_json(cls, obj: Dict) -> Optional["Arena"]:
+        starts_ms = lc.parse_starts_at(obj.get("startsAt"))
+        if starts_ms is None or "id" not in obj:
+            return None
+        teams = (obj.get("teamBattle") or {}).get("teams") or ()
+        if isinstance(teams, dict):  # {id: name} in some payloads
+            teams = teams.keys()
+        teams = tuple(t if isinstance(t, str) else t[0] for t in teams)
+        return cls(id=obj["id"], name=obj.get("fullName") or obj.get("name", "Unnamed"),
+                   starts_ms=starts_ms, status=int(obj.get("status", CREATED)),
+                   teams=teams, raw=obj)
+
+
+def iter_team_arenas(team_id: str, token: Optional[str] = None, *,
+                     max: Optional[int] = None,
+                     status: Optional[str] = None) -> Iterator[Arena]:
+    """Stream the team's arenas as ``Arena`` records, newest first."""
+    params = {}
+    if max is not None:
+        params["max"] = max
+    if status:
+        params["status"] = status
+    with lc.request("GET", f"team/{team_id}/arena", token, params=params,
+                    accept="application/x-ndjson", stream=True) as res:
+        res.raise_for_status()
+        for obj in lc.iter_ndjson(res):
+            arena = Arena.from_json(obj)
+            if arena is not None:
+                yield arena
+
+
+def discover(team_id: str, token: Optional[str] = None, name: Optional[str] = None,
+             within_hours: Optional[float] = None, started: bool = False,
+             now_ms: Optional[int] = None) -> List[Arena]:
+    """Upcoming (optionally also running) arenas of the team that pass the filters,
+    soonest first."""
+    now_ms = int(time.time() * 1000) if now_ms is None else now_ms
+    until = now_ms + within_hours * 3_600_000 if within_hours is not None else None
+    pattern = re.compile(name, re.IGNORECASE) if name else None
+    found = []
+    for status in ("created", "started") if started else ("created",):
+        for a in iter_team_arenas(team_id, token, status=status):
+            if a.status >= FINISHED or (a.status == CREATED and a.starts_ms <= now_ms):
+                continue
+            if until is not None and a.starts_ms > until:
+                continue
+            if pattern is None or pattern.search(a.name):
+                found.append(a)
+    found = list({a.id: a for a in found}.values())
+    found.sort(key=lambda a: a.starts_ms)
+    return found
+
+
+def join_arena(token, tmt_id=TMT_ID, team_id=TEAM_ID, arena: Optional[Arena] = None) -> lc.Result:
+    """Join one arena.  With ``arena`` known, ``team`` is sent only for team
+    battles, and a battle without ``team_id`` fails locally; without it the
+    team is always sent (harmless for plain arenas)."""
+    if arena is not None and not arena.team_battle:
+        return lc.join_arena(token, tmt_id)
+    if arena is not None and arena.teams and team_id not in arena.teams:
+        return lc.Result(tmt_id, lc.FAILED, 0,
+                         f"{team_id} is not in this battle ({', '.join(arena.teams)})")
+    return lc.join_arena(token, tmt_id, team_id)
+
+
+# ───────────────────────── results file ───────────────────────── #
+
+def to_json(team_id: str, arenas: List[Arena], results: Dict[Tuple[str, str], lc.Result],
+            previous: Optional[Dict] = None) -> Dict:
+    """Merge ``results`` into the per-event structure of the results file."""
+    doc = previous or {"team": team_id, "events": {}}
+    doc["updated"] = lc.epoch_ms_to_iso(int(time.time() * 1000))
+    by_id = {a.id: a for a in arenas}
+    for (tok, tmt_id), res in results.items():
+        ev = doc["events"].setdefault(tmt_id, {"accounts": {}})
+        a = by_id.get(tmt_id)
+        if a is not None:
+            ev.update(name=a.name, starts_at=a.starts_at, team_battle=a.team_battle)
+        ev["accounts"][account_key(tok)] = {"outcome": res.outcome, "status": res.status_code,
+                                            "text": res.text[:200]}
+    for ev in doc["events"].values():
+        ev["ok"] = all(r["outcome"] in (lc.OK, lc.ALREADY) for r in ev["accounts"].values())
+    return doc
+
+
+def failed_pairs(doc: Dict, tokens: List[str]) -> List[Tuple[str, str]]:
+    """(token, event) pairs that did not succeed in a results file, for the tokens at hand."""
+    by_key = {account_key(t): t for t in tokens}
+    pairs = []
+    for tmt_id, ev in doc.get("events", {}).items():
+        for key, r in ev["accounts"].items():
+            if r["outcome"] not in (lc.OK, lc.ALREADY) and key in by_key:
+                pairs.append((by_key[key], tmt_id))
+    return pairs
+
+
+def _from_results(tmt_id: str, ev: Dict) -> Arena:
+    """Stand-in for an event no longer listed (e.g. started since the first run)."""
+    return Arena(tmt_id, ev.get("name", tmt_id), 0,
+                 raw={"teamBattle": {}} if ev.get("team_battle", True) else {})
+
+
+def save(path: str, doc: Dict):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(doc, f, indent=1, sort_keys=True)
+    os.replace(tmp, path)
+
+
+# ───────────────────────── batch ───────────────────────── #
+
+def join_all(tokens: List[str], arenas: List[Arena], team_id: str,
+             pairs: Optional[List[Tuple[str, str]]] = None,
+             workers: int = WORKERS, per_token: int = PER_TOKEN) -> Dict[Tuple[str, str], lc.Result]:
+    """Join every arena with every token (or only ``pairs``), concurrently.
+
+    Pairs the state store already records as joined are skipped.
+    """
+    by_id = {a.id: a for a in arenas}
+    wanted = set(pairs) if pairs is not None else None
+    with open_store() as store:
+        done = {tok: store.done(tok, "arena-join") for tok in tokens}
+
+        def skip(tok, tmt_id):
+            return tmt_id in done[tok] or (wanted is not None and (tok, tmt_id) not in wanted)
+
+        report = fan_out(tokens, list(by_id), lambda tok, i: join_arena(tok, i, team_id, by_id[i]),
+                         workers=workers, per_token=per_token, skip=skip)
+        for (tok, _), res in report.results.items():
+            store.record_action(tok, "arena-join", res)
+    print_matrix(report, tokens, list(by_id))
+    return report.results
+
+
+def load(path: str) -> Optional[Dict]:
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def batch(args, tokens: List[str]) -> int:
+    previous = load(args.results)
+    if args.retry:
+        if previous is None:
+            sys.exit(f"❌  no results file at {args.results}")
+        pairs = failed_pairs(previous, tokens)
+        ids = list(dict.fromkeys(i for _, i in pairs))
+        # battle membership is re-read so the team field is right on retry
+        known = {a.id: a for a in discover(args.team, tokens[0], started=True)}
+        arenas = [known.get(i) or _from_results(i, previous["events"][i]) for i in ids]
+        logging.info("↻ retrying %d pair(s) over %d event(s) from %s", len(pairs), len(ids),
+                     args.results)
+    else:
+        pool = TokenPool(tokens)
+        arenas = pool.read(lambda tok: discover(args.team, tok, args.name, args.within,
+                                                args.started))
+        pairs = None
+        for a in arenas:
+            logging.info("→ %s | %s | %s%s", a.id, a.starts_at, a.name,
+                         " | team battle" if a.team_battle else "")
+    if not arenas:
+        logging.info("No matching arenas.")
+        return 0
+
+    results = join_all(tokens, arenas, args.team, pairs, args.workers, args.per_token)
+    save(args.results, to_json(args.team, arenas, results, previous))
+    bad = sum(not r.ok for r in results.values())
+    print(f"📝 results → {args.results}" + (f" ({bad} failed; rerun with --retry)" if bad else ""))
+    return 1 if bad else 0
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Join one arena, or discover and join a team's.")
+    ap.add_argument("--tournament", default=TMT_ID, help="single arena id (default $TMT_ID)")
+    ap.add_argument("--team", default=TEAM_ID)
+    ap.add_argument("--discover", action="store_true", help="batch-join the team's arenas")
+    ap.add_argument("--name", help="regex the arena name must match")
+    ap.add_argument("--within", type=float, help="only arenas starting in the next N hours")
+    ap.add_argument("--started", action="store_true", help="include arenas already running")
+    ap.add_argument("--retry", action="store_true", help="re-send the failed pairs of --results")
+    ap.add_argument("--results", default=RESULTS, help="per-event outcomes, merged across runs")
+    ap.add_argument("--workers", type=int, default=WORKERS)
+    ap.add_argument("--per-token", type=int, default=PER_TOKEN)
+    args = ap.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    metrics.setup()
+    tokens = load_tokens(*TOKEN_SOURCES)
+    if not tokens:
+        sys.exit("❌  TOR is missing!")
 
-URL = f"https://lichess.org/api/tournament/{TMT_ID}/join"   # arena & team-battle endpoint
+    if args.discover or args.retry:
+        sys.exit(batch(args, tokens))
 
-resp = requests.post(
-    URL,
-    headers={"Authorization": f"Bearer {TOKEN}"},
-    data={"team": TEAM_ID},          # required for team battles
-    timeout=15,
-)
+    results = {}
+    for tok in tokens:
+        res = results[(tok, args.tournament)] = join_arena(tok, args.tournament, args.team)
+        print("HTTP", res.status_code)
+        print(res.text)
+    save(args.results, to_json(args.team, [], results, load(args.results)))
+    if not all(r.ok for r in results.values()):
+        sys.exit("❌  join failed")
 
-print("HTTP", resp.status_code)
-print(resp.text)
 
-if resp.status_code != 200:
-    sys.exit("❌  join failed")
+if __name__ == "__main__":
+    main()
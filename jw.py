@@ -1,135 +1,149 @@
 #!/usr/bin/env python3
 import os
 import time
-import json
 import logging
-import requests
-from datetime import datetime, timezone
+import threading
+
+import lichess_client as lc
+import metrics
+from scheduler import DeadlineScheduler, lateness_report
 
 # ────────────────── Configuration ────────────────── #
 TEAM_ID = os.environ.get("TEAM_ID", "chess-blasters-2")
-TOKEN = os.environ.get("LICHESS_KEY")
-if not TOKEN:
-    raise ValueError("Environment variable LICHESS_KEY is not set!")
-TOKEN = TOKEN.strip('"')
-
-API_ROOT = "https://lichess.org/api"
-HEADERS = {
-    "Accept": "application/x-ndjson",
-    "Authorization": f"Bearer {TOKEN}"
-}
-
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s | %(levelname)s | %(message)s"
-)
+TOKEN = lc.clean_token(os.environ.get("LICHESS_KEY"))
+
+WITHDRAW_BEFORE_SEC = 3 * 60
+PREFETCH_SEC = 10
+WORKERS = int(os.environ.get("JW_WORKERS", "8"))
 
 # ────────────────── Helpers ────────────────── #
 def get_upcoming_swiss(team_id):
     """Fetch upcoming Swiss tournaments for the team."""
-    url = f"{API_ROOT}/team/{team_id}/swiss"
     logging.info(f"Fetching upcoming Swiss tournaments for team: {team_id}")
-    res = requests.get(url, headers=HEADERS, timeout=15)
-    res.raise_for_status()
-
-    swisses = []
-    now_ms = int(time.time() * 1000)
-
-    for line in res.iter_lines(decode_unicode=True):
-        if not line:
-            continue
-        try:
-            obj = json.loads(line)
-        except json.JSONDecodeError:
-            continue
-
-        starts_ms = obj.get("startsAt")
-        if not starts_ms:
-            continue
-        if isinstance(starts_ms, int):
-            start_epoch = starts_ms
-        else:
-            try:
-                start_epoch = int(
-                    datetime.strptime(starts_ms, "%Y-%m-%dT%H:%M:%SZ")
-                    .replace(tzinfo=timezone.utc).timestamp() * 1000
-                )
-            except ValueError:
-                continue
-
-        if start_epoch > now_ms:
-            obj["_startsMs"] = start_epoch
-            swisses.append(obj)
+    swisses = lc.get_upcoming_swiss(team_id, TOKEN)
 
     logging.info(f"Found {len(swisses)} upcoming Swiss tournaments.")
     for s in swisses:
-        logging.info(f"- {s['id']} starts at {datetime.utcfromtimestamp(s['_startsMs']/1000).strftime('%Y-%m-%d %H:%M:%S UTC')}")
+        logging.info(f"- {s.id} starts at {s.starts_at}")
 
-    return sorted(swisses, key=lambda s: s["_startsMs"])
+    return swisses
 
 
 def join(swiss_id):
     """Join a Swiss tournament."""
-    try:
-        res = requests.post(f"{API_ROOT}/swiss/{swiss_id}/join", headers=HEADERS, timeout=15)
-        if res.status_code == 200:
-            logging.info(f"✅ Joined Swiss: {swiss_id}")
-        elif res.status_code == 400 and "already" in res.text:
-            logging.info(f"ℹ️ Already joined Swiss: {swiss_id}")
-        else:
-            logging.warning(f"⚠️ Failed to join {swiss_id} | Status {res.status_code} | {res.text.strip()[:100]}")
-    except requests.RequestException as e:
-        logging.error(f"Join request failed for {swiss_id}: {e}")
+    res = lc.join(TOKEN, swiss_id)
+    if res.outcome == lc.OK:
+        logging.info(f"✅ Joined Swiss: {swiss_id}")
+    elif res.outcome == lc.ALREADY:
+        logging.info(f"ℹ️ Already joined Swiss: {swiss_id}")
+    elif res.outcome == lc.ERROR:
+        logging.error(f"Join request failed for {swiss_id}: {res.text}")
+    else:
+        logging.warning(f"⚠️ Failed to join {swiss_id} | Status {res.status_code} | {res.text[:100]}")
 
 
 def withdraw(swiss_id):
     """Withdraw from a Swiss tournament."""
-    try:
-        res = requests.post(f"{API_ROOT}/swiss/{swiss_id}/withdraw", headers=HEADERS, timeout=15)
-        if res.status_code == 200:
-            logging.info(f"🟡 Withdrawn from Swiss: {swiss_id}")
-        elif res.status_code == 400 and "not joined" in res.text:
-            logging.info(f"ℹ️ Already withdrawn or not joined: {swiss_id}")
-        else:
-            logging.warning(f"⚠️ Failed to withdraw {swiss_id} | Status {res.status_code} | {res.text.strip()[:100]}")
-    except requests.RequestException as e:
-        logging.error(f"Withdraw request failed for {swiss_id}: {e}")
+    res = lc.withdraw(TOKEN, swiss_id)
+    if res.outcome == lc.OK:
+        logging.info(f"🟡 Withdrawn from Swiss: {swiss_id}")
+    elif res.outcome == lc.ALREADY:
+        logging.info(f"ℹ️ Already withdrawn or not joined: {swiss_id}")
+    elif res.outcome == lc.ERROR:
+        logging.error(f"Withdraw request failed for {swiss_id}: {res.text}")
+    else:
+        logging.warning(f"⚠️ Failed to withdraw {swiss_id} | Status {res.status_code} | {res.text[:100]}")
+
+
+class LiveList:
+    """Short-lived snapshot of the upcoming list, shared by all guards."""
+
+    def __init__(self, team_id, max_age=15.0):
+        self.team_id = team_id
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._at = 0.0
+        self._by_id = {}
+
+    def refresh(self):
+        swisses = lc.get_upcoming_swiss(self.team_id, TOKEN)
+        with self._lock:
+            self._by_id = {s.id: s for s in swisses}
+            self._at = time.time()
+
+    def get(self, swiss_id):
+        with self._lock:
+            stale = time.time() - self._at > self.max_age
+        if stale:
+            try:
+                self.refresh()
+            except Exception as e:
+                logging.warning(f"Could not re-check Swiss list ({e}); using last snapshot.")
+        with self._lock:
+            return self._by_id.get(swiss_id)
+
+
+def schedule_withdraw(sched, live, s):
+    """Arm a withdrawal WITHDRAW_BEFORE_SEC before start, re-checked against the live list."""
+    deadline = s.starts_ms / 1000 - WITHDRAW_BEFORE_SEC
+
+    def guard():
+        current = live.get(s.id)
+        if current is None:
+            logging.info(f"Skipping withdrawal for {s.id}: no longer upcoming.")
+            return False
+        if current.starts_ms != s.starts_ms:
+            logging.info(f"{s.id} moved to {current.starts_at}; rescheduling withdrawal.")
+            schedule_withdraw(sched, live, current)
+            return False
+        return True
+
+    # warm the shared snapshot just before the deadline so the guard is instant
+    sched.schedule(deadline - PREFETCH_SEC, f"refresh:{s.id}", live.refresh)
+    sched.schedule(deadline, f"withdraw:{s.id}", lambda: withdraw(s.id), guard)
+    logging.info(f"Scheduled withdrawal for {s.id} at {lc.epoch_ms_to_iso(int(deadline * 1000))} "
+                 f"(in {int(max(deadline - time.time(), 0))} seconds).")
 
 
 # ────────────────── Main ────────────────── #
 def main():
+    if not TOKEN:
+        raise SystemExit("Environment variable LICHESS_KEY is not set!")
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s | %(levelname)s | %(message)s"
+    )
+    metrics.setup()
     logging.info("Starting Swiss join-withdraw automation...")
     swisses = get_upcoming_swiss(TEAM_ID)
-    now_ms = int(time.time() * 1000)
 
     if not swisses:
         logging.info("No upcoming Swiss tournaments found. Exiting.")
         return
 
-    # Step 1: Join all upcoming Swiss immediately
-    for s in swisses:
-        swiss_id = s["id"]
-        logging.info(f"Attempting to join Swiss {swiss_id}...")
-        join(swiss_id)
-        time.sleep(2)  # small delay to avoid API spam
-
-    # Step 2: Withdraw 3 minutes before each Swiss
-    for s in swisses:
-        swiss_id = s["id"]
-        start_ms = s["_startsMs"]
-        withdraw_time = datetime.utcfromtimestamp((start_ms - 3 * 60 * 1000) / 1000)
-        sleep_sec = max((start_ms - now_ms) / 1000 - 3 * 60, 0)
+    sched = DeadlineScheduler(workers=WORKERS)
+    live = LiveList(TEAM_ID)
+    live.refresh()
+    now = time.time()
 
-        logging.info(f"Scheduled withdrawal for {swiss_id} at {withdraw_time.strftime('%Y-%m-%d %H:%M:%S UTC')} "
-                     f"(in {int(sleep_sec)} seconds).")
+    # Join every upcoming Swiss now (the rate governor paces the requests); each
+    # withdrawal is armed only once its join has returned, so it cannot overtake it
+    def join_then_arm(s):
+        join(s.id)
+        schedule_withdraw(sched, live, s)
 
-        if sleep_sec > 0:
-            time.sleep(sleep_sec)
-
-        withdraw(swiss_id)
-        now_ms = int(time.time() * 1000)
-
-    logging.info("Automation completed successfully.")
+    for s in swisses:
+        if s.starts_ms / 1000 - WITHDRAW_BEFORE_SEC <= now:
+            logging.info(f"Skipping {s.id}: it starts in under {WITHDRAW_BEFORE_SEC} seconds.")
+            continue
+        sched.schedule(now, f"join:{s.id}", lambda s=s: join_then_arm(s))
+
+    sched.join()
+    sched.shutdown()
+    for f in sched.firings:
+        if f.name.startswith("withdraw:") and not f.skipped:
+            logging.info(f"{f.name} fired {f.lateness * 1000:.0f} ms after its deadline")
+    logging.info(f"Automation completed successfully: {lateness_report(sched.firings)}.")
 
 
 if __name__ == "__main__":
@@ -1,4 +1,8 @@
-import requests, os, time, json
+import os, time
+
+import requests
+
+import lichess_client as lc
 
 TEAM_ID = "chess-blasters-2"
 L_TOKEN = os.getenv("L_TOKEN")
@@ -10,32 +14,21 @@ T_USERNAME = "unrealboy9000"
 
 def get_swiss_list():
     """Fetch all Swiss tournaments of the team (NDJSON format)."""
-    url = f"https://lichess.org/api/team/{TEAM_ID}/swiss"
-    r = requests.get(url)
-    if not r.ok:
-        print("Error fetching Swiss list:", r.status_code)
+    try:
+        # one filtered query per status: a short event that already finished
+        # can sit before a longer one still running, so no early stop here
+        return [s.id for status in ("created", "started")
+                for s in lc.iter_team_swiss(TEAM_ID, status=status)]
+    except requests.HTTPError as e:
+        print("Error fetching Swiss list:", e.response.status_code)
         return []
 
-    swisses = []
-    for line in r.text.splitlines():
-        try:
-            obj = json.loads(line)
-            if obj.get("status") in ["created", "started"]:
-                swisses.append(obj["id"])
-        except Exception:
-            continue  # skip malformed lines
-    return swisses
-
 def get_players_text(swiss_id, token):
-    url = f"https://lichess.org/api/swiss/{swiss_id}/players"
-    headers = {"Authorization": f"Bearer {token}"}
-    r = requests.get(url, headers=headers)
+    r = lc.request("GET", f"swiss/{swiss_id}/players", token)
     return r.text.lower() if r.ok else ""
 
 def join_swiss(swiss_id, token):
-    url = f"https://lichess.org/api/swiss/{swiss_id}/join"
-    headers = {"Authorization": f"Bearer {token}"}
-    r = requests.post(url, headers=headers)
+    r = lc.join(token, swiss_id)
     print(f"[{time.strftime('%H:%M:%S')}] Tried to join {swiss_id}: {r.status_code}")
 
 def loop_check():
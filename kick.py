@@ -1,44 +1,211 @@
-import requests
+#!/usr/bin/env python3
+"""
+Kick every username listed in kick.txt from a team.
+
+The list is streamed, kicks run concurrently (paced by the shared rate
+governor), and each finished username is appended to a journal so a rerun
+after a crash resumes where it stopped.  Before kicking, the local roster
+index (team_roster.py) is brought up to date and names that are not members
+are skipped without a request; kicked members are removed from it.
+
+The journal belongs to one team (``.state/kick.<team_id>.journal`` by
+default, next to the roster so the workflow cache keeps both, and its first
+line names the team), so a list reused for another team starts fresh.
+Failed kicks are journaled too but retried on the next run.
+
+Usage: python kick.py <team_id> [--file kick.txt] [--journal .state/kick.<team_id>.journal]
+"""
+
+import argparse
 import os
 import sys
-import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator, Optional, Set
+
+import lichess_client as lc
+import metrics
+from team_roster import Roster, open_roster
+
+KICKED = "kicked"
+NOT_MEMBER = "not-member"
+FORBIDDEN = "forbidden"
+FAILED = "failed"
+JOURNAL = os.environ.get("KICK_JOURNAL", ".state/kick.{team}.journal")
+
+_print_lock = threading.Lock()
+
+
+def say(message: str):
+    """print() from worker threads without lines running into each other."""
+    with _print_lock:
+        print(message, flush=True)
+
 
 def kick_member(token, team_id, username):
-    url = f"https://lichess.org/api/team/{team_id}/kick/{username}"
-    headers = {
-        "Authorization": f"Bearer {token}",
-        "Accept": "application/json"
-    }
-    response = requests.post(url, headers=headers)
+    response = lc.request("POST", f"team/{team_id}/kick/{username}", token,
+                          accept="application/json")
 
     if response.status_code == 200:
-        print(f"✅ Kicked {username} from {team_id}")
+        say(f"✅ Kicked {username} from {team_id}")
+        return KICKED
     elif response.status_code == 403:
-        print(f"🚫 Token not authorized to manage {team_id}")
+        say(f"🚫 Token not authorized to manage {team_id}")
+        return FORBIDDEN
     elif response.status_code == 404:
-        print(f"⚠️ User {username} not found in team {team_id}")
+        say(f"⚠️ User {username} not found in team {team_id}")
+        return NOT_MEMBER
     else:
-        print(f"❌ Failed to kick {username}: {response.status_code}\n{response.text}")
+        say(f"❌ Failed to kick {username}: {response.status_code}\n{response.text}")
+        return None
 
-if __name__ == "__main__":
-    token = os.getenv("BR")
+
+def iter_usernames(path: str) -> Iterator[str]:
+    """Yield non-empty lines lazily, so huge lists never sit in memory."""
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            name = line.strip()
+            if name:
+                yield name
+
+
+class Journal:
+    """Append-only record of usernames (``name<TAB>outcome`` per line) for one team.
+
+    ``done`` holds the names whose latest outcome is final (kicked or not a
+    member); failures are kept for the record and tried again.
+    """
+
+    def __init__(self, path: str, team_id: str):
+        self.path = path
+        self.done: Set[str] = set()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        exists = os.path.exists(path) and os.path.getsize(path) > 0
+        if exists:
+            with open(path, "r", encoding="utf-8") as f:
+                header = f.readline().rstrip("\n").split("\t")
+                if header[:1] != ["#team"] or header[1:2] != [team_id]:
+                    raise ValueError(f"{path} is not a journal for team {team_id} "
+                                     f"(header {header!r})")
+                for line in f:
+                    name, _, outcome = line.rstrip("\n").partition("\t")
+                    if not name:
+                        continue
+                    (self.done.add if outcome in (KICKED, NOT_MEMBER)
+                     else self.done.discard)(name.lower())
+        self._lock = threading.Lock()
+        self._file = open(path, "a", encoding="utf-8")
+        if not exists:
+            self._file.write(f"#team\t{team_id}\n")
+
+    def record(self, username: str, outcome: str):
+        with self._lock:
+            self._file.write(f"{username}\t{outcome}\n")
+            self._file.flush()
+            if outcome in (KICKED, NOT_MEMBER):
+                self.done.add(username.lower())
+
+    def close(self):
+        self._file.close()
+
+
+def bulk_kick(token: str, team_id: str, names: Iterator[str], journal: Journal,
+              roster: Optional[Roster] = None, workers: int = 4) -> dict:
+    """Kick ``names`` concurrently with at most ``2 * workers`` in flight."""
+    counts = {KICKED: 0, NOT_MEMBER: 0, "resumed": 0, "skipped": 0, FAILED: 0}
+    slots = threading.BoundedSemaphore(workers * 2)
+    stop = threading.Event()
+    lock = threading.Lock()
+
+    def work(username):
+        try:
+            try:
+                outcome = kick_member(token, team_id, username)
+            except Exception as e:  # a lost future would hide it
+                say(f"❌ Failed to kick {username}: {e!r}")
+                outcome = FAILED
+            if outcome == FORBIDDEN:
+                stop.set()
+            elif outcome in (KICKED, NOT_MEMBER):
+                if roster is not None:
+                    roster.discard(username)
+            else:
+                outcome = FAILED
+            if outcome != FORBIDDEN:
+                journal.record(username, outcome)
+            with lock:
+                counts[outcome if outcome != FORBIDDEN else FAILED] += 1
+        finally:
+            slots.release()
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for username in names:
+            if stop.is_set():
+                break
+            key = username.lower()
+            if key in journal.done:
+                counts["resumed"] += 1
+                continue
+            if roster is not None and key not in roster:
+                journal.record(username, NOT_MEMBER)
+                counts["skipped"] += 1
+                continue
+            slots.acquire()
+            pool.submit(work, username)
+    return counts
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Bulk-kick users listed in a file from a team.")
+    ap.add_argument("team_id")
+    ap.add_argument("--file", default="kick.txt")
+    ap.add_argument("--journal", help=f"default: {JOURNAL.format(team='<team_id>')}")
+    ap.add_argument("--workers", type=int, default=4)
+    ap.add_argument("--no-prefilter", action="store_true",
+                    help="do not stream the roster; try every name")
+    args = ap.parse_args(argv)
+
+    token = lc.clean_token(os.getenv("BR"))
     if not token:
         print("Error: Missing BR token environment variable.")
         sys.exit(1)
+    metrics.setup()
 
-    if len(sys.argv) < 2:
-        print("Usage: python kick.py <team_id>")
+    if not os.path.exists(args.file):
+        print(f"{args.file} not found.")
         sys.exit(1)
 
-    team_id = sys.argv[1]
-
+    path = args.journal or JOURNAL.format(team=args.team_id)
+    legacy = f"kick.{args.team_id}.journal"  # where earlier versions kept it
+    if not args.journal and os.path.exists(legacy) and not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(legacy, path)
     try:
-        with open("kick.txt", "r", encoding="utf-8") as f:
-            members = [line.strip() for line in f if line.strip()]
-    except FileNotFoundError:
-        print("kick.txt not found.")
+        journal = Journal(path, args.team_id)
+    except ValueError as e:
+        print(f"❌ {e}")
         sys.exit(1)
 
-    for username in members:
-        kick_member(token, team_id, username)
-        time.sleep(1)
+    roster = None
+    if not args.no_prefilter:
+        roster = open_roster(args.team_id)
+        try:
+            stats = roster.sync(token)
+            print(f"👥 {len(roster)} members in {args.team_id} ({stats})")
+        except Exception as e:
+            print(f"⚠️ Could not sync roster ({e}); kicking without prefilter.")
+            roster.close()
+            roster = None
+
+    try:
+        counts = bulk_kick(token, args.team_id, iter_usernames(args.file), journal,
+                           roster, args.workers)
+    finally:
+        journal.close()
+        if roster is not None:
+            roster.close()
+    print("\n" + "   ".join(f"{k}: {v}" for k, v in counts.items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+"""
+Qualifier leaderboard across every finished "Cash Tournament Qualifier".
+
+Each finished qualifier's ``/api/swiss/{id}/results`` NDJSON is streamed
+(several events concurrently, paced by the rate governor) into a columnar
+store: one row per player per event, held as NumPy arrays
+
+    event · player · rank · points · tiebreak · rating · performance
+
+with usernames and event ids interned to integer indexes.  The leaderboard —
+total points, total tiebreak, events played, wins, best rank and average
+performance — is then a handful of ``bincount`` / ``minimum.at`` passes over
+those arrays, so thousands of events × hundreds of players aggregate in well
+under a second.  The store is saved as a compressed ``.npz``.
+
+Refreshes are incremental.  The per-player totals are stored next to the
+rows and each newly ingested event's rows are merged into them as deltas.
+The set of ingested event ids plus the latest ingested start time form a
+watermark: ``refresh`` reads the team's finished list newest first and stops
+``LOOKBACK_SEC`` before that start time (long events finish out of order),
+so a daily run downloads only the ~24 events that finished since the last
+one, however long the history grows.
+
+    python leaderboard.py build chess-blasters-2 --max 500 --top 25   # first run
+    python leaderboard.py refresh chess-blasters-2                    # afterwards
+
+Needs ``numpy`` (``pip install numpy``).
+"""
+
+import argparse
+import os
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+import lichess_client as lc
+
+QUALIFIER = "Cash Tournament Qualifier"
+DEFAULT_PATH = os.environ.get("LEADERBOARD_STORE", ".state/qualifiers.npz")
+WORKERS = int(os.environ.get("LEADERBOARD_WORKERS", "8"))
+LOOKBACK_SEC = 6 * 3600  # longest qualifier we expect, start to finish
+
+# per-player running totals, merged with each new event's deltas
+TOTALS = {
+    "points": np.float64,
+    "tiebreak": np.float64,
+    "events": np.int64,
+    "wins": np.int64,
+    "best": np.int32,
+    "perf_sum": np.float64,
+    "perf_n": np.int64,
+}
+_NO_RANK = np.iinfo(np.int32).max
+
+# column name → dtype of the per-row arrays
+COLUMNS = {
+    "event": np.int32,
+    "player": np.int32,
+    "rank": np.int32,
+    "points": np.float32,
+    "tiebreak": np.float32,
+    "rating": np.int16,
+    "performance": np.int16,   # 0 = not reported
+}
+
+
+def iter_results(swiss_id: str, token: Optional[str] = None) -> Iterable[Dict]:
+    """Stream one Swiss's final standings, one dict per player."""
+    with lc.request("GET", f"swiss/{swiss_id}/results", token,
+                    accept="application/x-ndjson", stream=True, timeout=60) as res:
+        res.raise_for_status()
+        yield from lc.iter_ndjson(res)
+
+
+def finished_qualifiers(team_id: str, token: Optional[str] = None,
+                        max: Optional[int] = None, name: str = QUALIFIER,
+                        since_ms: Optional[int] = None) -> List[lc.Swiss]:
+    """Finished events called ``name``, newest first.
+
+    With ``since_ms`` the stream is closed at the first event that started
+    before it, so only the head of the history is downloaded.
+    """
+    found = []
+    for s in lc.iter_team_swiss(team_id, token, status="finished", max=max):
+        if since_ms is not None and s.starts_ms < since_ms:
+            break
+        if s.name == name:
+            found.append(s)
+    return found
+
+
+@dataclass
+class Leaderboard:
+    """Per-player aggregates, sorted best first."""
+    players: np.ndarray
+    points: np.ndarray
+    tiebreak: np.ndarray
+    events: np.ndarray
+    wins: np.ndarray
+    best_rank: np.ndarray
+    performance: np.ndarray  # mean of reported performances, NaN if none
+
+    def __len__(self) -> int:
+        return len(self.players)
+
+    def format(self, top: int = 20) -> str:
+        lines = [f"{'#':>4}  {'player':<24}{'points':>8}{'tiebreak':>10}{'events':>8}"
+                 f"{'wins':>6}{'best':>6}{'perf':>7}"]
+        for i in range(min(top, len(self))):
+            perf = "" if np.isnan(self.performance[i]) else f"{self.performance[i]:.0f}"
+            lines.append(f"{i + 1:>4}  {self.players[i]:<24}{self.points[i]:>8.1f}"
+                         f"{self.tiebreak[i]:>10.2f}{self.events[i]:>8d}{self.wins[i]:>6d}"
+                         f"{self.best_rank[i]:>6d}{perf:>7}")
+        return "\n".join(lines)
+
+
+class ResultsStore:
+    """Array-backed table of (event, player) result rows."""
+
+    def __init__(self):
+        self.players: List[str] = []
+        self.events: List[str] = []
+        self.event_starts: List[int] = []
+        self._player_idx: Dict[str, int] = {}
+        self._event_idx: Dict[str, int] = {}
+        self.columns = {name: np.empty(0, dtype) for name, dtype in COLUMNS.items()}
+        self.totals = {name: np.empty(0, dtype) for name, dtype in TOTALS.items()}
+        self._pending: List[Dict[str, np.ndarray]] = []
+
+    # ───────── ingestion ───────── #
+
+    def _player(self, username: str) -> int:
+        key = username.lower()
+        idx = self._player_idx.get(key)
+        if idx is None:
+            idx = self._player_idx[key] = len(self.players)
+            self.players.append(username)
+        return idx
+
+    def has_event(self, swiss_id: str) -> bool:
+        return swiss_id in self._event_idx
+
+    @property
+    def watermark_ms(self) -> Optional[int]:
+        """Start time of the newest ingested event (None while empty)."""
+        return max(self.event_starts) if self.event_starts else None
+
+    def add_event(self, swiss: lc.Swiss, rows: Iterable[Dict]):
+        """Append one event's standings (ignored if the event is already stored)."""
+        if self.has_event(swiss.id):
+            return
+        cols: Dict[str, list] = {name: [] for name in COLUMNS}
+        for r in rows:
+            if "username" not in r:
+                continue
+            cols["player"].append(self._player(r["username"]))
+            cols["rank"].append(r.get("rank", 0))
+            cols["points"].append(r.get("points", 0.0))
+            cols["tiebreak"].append(r.get("tieBreak", 0.0))
+            cols["rating"].append(r.get("rating", 0))
+            cols["performance"].append(r.get("performance") or 0)
+        event = self._event_idx[swiss.id] = len(self.events)
+        self.events.append(swiss.id)
+        self.event_starts.append(swiss.starts_ms)
+        cols["event"] = [event] * len(cols["player"])
+        self._pending.append({name: np.asarray(cols[name], COLUMNS[name]) for name in COLUMNS})
+
+    def _compact(self):
+        """Fold pending per-event arrays into the columns and the totals."""
+        if self._pending:
+            delta = {name: np.concatenate([p[name] for p in self._pending]) for name in COLUMNS}
+            self.columns = {name: np.concatenate([self.columns[name], delta[name]])
+                            for name in COLUMNS}
+            self._merge(delta)
+            self._pending = []
+
+    def _merge(self, rows: Dict[str, np.ndarray]):
+        """Add the aggregates of ``rows`` to the per-player totals."""
+        n, t = len(self.players), self.totals
+        grow = n - len(t["points"])
+        if grow > 0:  # players seen for the first time
+            for name, dtype in TOTALS.items():
+                fill = _NO_RANK if name == "best" else 0
+                t[name] = np.concatenate([t[name], np.full(grow, fill, dtype)])
+        player = rows["player"]
+        t["points"] += np.bincount(player, weights=rows["points"], minlength=n)
+        t["tiebreak"] += np.bincount(player, weights=rows["tiebreak"], minlength=n)
+        t["events"] += np.bincount(player, minlength=n)
+        t["wins"] += np.bincount(player[rows["rank"] == 1], minlength=n)
+        np.minimum.at(t["best"], player, rows["rank"])
+        has_perf = rows["performance"] > 0
+        t["perf_sum"] += np.bincount(player[has_perf], weights=rows["performance"][has_perf],
+                                     minlength=n)
+        t["perf_n"] += np.bincount(player[has_perf], minlength=n)
+
+    def ingest(self, events: Iterable[lc.Swiss], token: Optional[str] = None,
+               workers: int = WORKERS) -> int:
+        """Download and store every event not stored yet; return how many were added."""
+        todo = [s for s in events if not self.has_event(s.id)]
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            fetched = pool.map(lambda s: (s, list(iter_results(s.id, token))), todo)
+            for swiss, rows in fetched:
+                self.add_event(swiss, rows)
+        self._compact()
+        return len(todo)
+
+    @property
+    def rows(self) -> int:
+        self._compact()
+        return len(self.columns["player"])
+
+    # ───────── aggregation ───────── #
+
+    def rebuild_totals(self):
+        """Recompute the totals from every stored row (a full aggregation)."""
+        self._compact()
+        self.totals = {name: np.empty(0, dtype) for name, dtype in TOTALS.items()}
+        self._merge(self.columns)
+
+    def leaderboard(self) -> Leaderboard:
+        self._compact()
+        t = self.totals
+        points, tiebreak, events = t["points"], t["tiebreak"], t["events"]
+        wins, best, perf_n = t["wins"], t["best"], t["perf_n"]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            performance = np.where(perf_n > 0, t["perf_sum"] / np.maximum(perf_n, 1), np.nan)
+
+        order = np.lexsort((-tiebreak, -points))  # points first, then tiebreak
+        order = order[events[order] > 0]
+        names = np.asarray(self.players, dtype=object)
+        return Leaderboard(names[order], points[order], tiebreak[order], events[order],
+                           wins[order], best[order], performance[order])
+
+    # ───────── persistence ───────── #
+
+    def save(self, path: str = DEFAULT_PATH):
+        self._compact()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp.npz"
+        np.savez_compressed(tmp, players=np.asarray(self.players, dtype=str),
+                            events=np.asarray(self.events, dtype=str),
+                            event_starts=np.asarray(self.event_starts, np.int64),
+                            **self.columns,
+                            **{f"total_{name}": v for name, v in self.totals.items()})
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str = DEFAULT_PATH) -> "ResultsStore":
+        store = cls()
+        if not os.path.exists(path):
+            return store
+        with np.load(path) as data:
+            store.players = data["players"].tolist()
+            store.events = data["events"].tolist()
+            store.event_starts = data["event_starts"].tolist()
+            store.columns = {name: data[name].astype(dtype) for name, dtype in COLUMNS.items()}
+            if all(f"total_{name}" in data for name in TOTALS):
+                store.totals = {name: data[f"total_{name}"].astype(dtype)
+                                for name, dtype in TOTALS.items()}
+        store._player_idx = {p.lower(): i for i, p in enumerate(store.players)}
+        store._event_idx = {e: i for i, e in enumerate(store.events)}
+        if len(store.totals["points"]) != len(store.players):
+            store.rebuild_totals()  # store written before totals were kept
+        return store
+
+
+def refresh(store: ResultsStore, team_id: str, token: Optional[str] = None,
+            name: str = QUALIFIER, max: Optional[int] = None,
+            lookback: float = LOOKBACK_SEC) -> int:
+    """Ingest events finished since the watermark; return how many were added."""
+    mark = store.watermark_ms
+    since = None if mark is None else mark - int(lookback * 1000)
+    return store.ingest(finished_qualifiers(team_id, token, max, name, since), token)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Qualifier leaderboard from Swiss results.")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    b = sub.add_parser("build", help="ingest finished qualifiers and print the leaderboard")
+    b.add_argument("team")
+    b.add_argument("--max", type=int, default=500, help="finished events to look at")
+    b.add_argument("--name", default=QUALIFIER, help="tournament name to rank")
+    b.add_argument("--top", type=int, default=20)
+    b.add_argument("--store", default=DEFAULT_PATH)
+    r = sub.add_parser("refresh", help="ingest only events finished since the last run")
+    r.add_argument("team")
+    r.add_argument("--max", type=int, default=None, help="cap on events looked at")
+    r.add_argument("--name", default=QUALIFIER)
+    r.add_argument("--top", type=int, default=20)
+    r.add_argument("--store", default=DEFAULT_PATH)
+    r.add_argument("--lookback", type=float, default=LOOKBACK_SEC / 3600,
+                   help="hours before the watermark to re-check (default 6)")
+    args = ap.parse_args(argv)
+
+    token = lc.clean_token(os.environ.get("LICHESS_KEY")) or None
+    store = ResultsStore.load(args.store)
+    if args.cmd == "refresh":
+        added = refresh(store, args.team, token, args.name, args.max, args.lookback * 3600)
+    else:
+        added = store.ingest(finished_qualifiers(args.team, token, args.max, args.name), token)
+    store.save(args.store)
+    print(f"📥 {added} new event(s); {len(store.events)} events, {store.rows} result rows, "
+          f"{len(store.players)} players\n")
+    print(store.leaderboard().format(args.top))
+
+
+if __name__ == "__main__":
+    main()
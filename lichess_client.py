@@ -0,0 +1,410 @@
+#!/usr/bin/env python3
+"""
+Shared Lichess API client used by every script in this repo.
+
+One keep-alive ``requests.Session`` (with a sized connection pool) is reused
+for all calls, so the long-running bots pay the TLS handshake once instead of
+on every request.  Authorization headers are cached per token, and the team
+Swiss list is parsed into typed ``Swiss`` records by a single NDJSON reader.
+"""
+
+import calendar
+import json
+import logging
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Dict, Iterator, List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import metrics
+import rate_governor
+
+SITE_ROOT = os.environ.get("LICHESS_URL", "https://lichess.org").rstrip("/")
+API_ROOT = f"{SITE_ROOT}/api"
+POOL_SIZE = 32
+DEFAULT_TIMEOUT = 15
+
+# outcomes returned by join()/withdraw()
+OK = "ok"
+ALREADY = "already"
+FAILED = "failed"
+ERROR = "error"
+
+# path templates used as the metrics "endpoint" label (ids would explode cardinality)
+_ENDPOINTS = [(re.compile(p), name) for p, name in [
+    (r"/api/team/[^/]+/kick/[^/]+", "team/kick"),
+    (r"/api/team/[^/]+/(\w+)", "team/{}"),
+    (r"/api/swiss/new/[^/]+", "swiss/new"),
+    (r"/api/swiss/[^/]+/(\w+)", "swiss/{}"),
+    (r"/api/tournament/[^/]+/(\w+)", "tournament/{}"),
+    (r"/api/(account|token/test)", "{}"),
+    (r"/team/[^/]+/pm-all", "team/pm-all"),
+    (r"/inbox/[^/]+", "inbox"),
+    (r"/", "/"),
+]]
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+
+
+# ───────────────────────── session ───────────────────────── #
+
+def session() -> requests.Session:
+    """Return the process-wide pooled session, creating it on first use."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                s = requests.Session()
+                adapter = HTTPAdapter(pool_connections=4, pool_maxsize=POOL_SIZE)
+                s.mount("https://", adapter)
+                s.mount("http://", adapter)
+                if os.environ.get("LICHESS_CASSETTE"):  # record / replay, see cassette.py
+                    import cassette
+                    cassette.install_from_env(s, pool_connections=4, pool_maxsize=POOL_SIZE)
+                _session = s
+    return _session
+
+
+@lru_cache(maxsize=None)
+def auth_headers(token: Optional[str], accept: Optional[str] = None) -> Dict[str, str]:
+    """Build (once) the headers for a token / Accept pair.
+
+    The returned dict is shared — callers must copy it before mutating.
+    """
+    headers = {}
+    if token:
+        headers["Authorization"] = f"Bearer {token}"
+    if accept:
+        headers["Accept"] = accept
+    return headers
+
+
+def set_base_url(url: str):
+    """Point every call at another server (e.g. mock_lichess.py)."""
+    global SITE_ROOT, API_ROOT
+    SITE_ROOT = url.rstrip("/")
+    API_ROOT = f"{SITE_ROOT}/api"
+
+
+def clean_token(raw: Optional[str]) -> str:
+    """Strip whitespace and the quotes secrets are sometimes stored with."""
+    return (raw or "").strip().strip('"').strip("'")
+
+
+def request(method: str, url: str, token: Optional[str] = None, *,
+            accept: Optional[str] = None, timeout: float = DEFAULT_TIMEOUT,
+            retry_429: int = 1, governed: bool = True, **kwargs) -> requests.Response:
+    """Send a request through the pooled session and the shared rate governor.
+
+    ``url`` may be absolute or a path relative to ``API_ROOT``.  A 429 is
+    reported to the governor (which blocks the token for ``Retry-After``) and
+    the request is re-sent up to ``retry_429`` times.  With ``governed=False``
+    the caller has already acquired the first slot itself (to time the request
+    without the wait); only re-sends acquire one here.
+    """
+    if not url.startswith("http"):
+        url = f"{API_ROOT}/{url.lstrip('/')}"
+    headers = auth_headers(token, accept)
+    if "headers" in kwargs:
+        headers = {**headers, **kwargs.pop("headers")}
+    endpoint = endpoint_name(url)
+    gov = rate_governor.governor()
+    for attempt in range(retry_429 + 1):
+        if gov is not None and (governed or attempt > 0):
+            gov.acquire(token)
+        t0 = time.perf_counter()
+        try:
+            resp = session().request(method, url, headers=headers, timeout=timeout, **kwargs)
+        except requests.RequestException:
+            metrics.observe_request(method, endpoint, time.perf_counter() - t0, None)
+            raise
+        metrics.observe_request(method, endpoint, time.perf_counter() - t0, resp.status_code)
+        if resp.status_code != 429:
+            if gov is not None:
+                gov.feedback(token, resp.status_code)
+            return resp
+        wait = retry_after(resp)
+        if gov is not None:
+            gov.feedback(token, 429, wait)
+        if attempt < retry_429:
+            resp.close()
+            metrics.RETRIES.inc(endpoint=endpoint)
+            if gov is None:
+                time.sleep(wait)
+    return resp
+
+
+def endpoint_name(url: str) -> str:
+    """Map a concrete URL to a low-cardinality template such as ``swiss/join``."""
+    path = url[len(SITE_ROOT):] if url.startswith(SITE_ROOT) else url
+    path = path.split("?", 1)[0].rstrip("/") or "/"
+    for pattern, name in _ENDPOINTS:
+        m = pattern.fullmatch(path)
+        if m:
+            return name.format(*m.groups())
+    return "other"
+
+
+def retry_after(resp: requests.Response, default: float = 60.0) -> float:
+    """Seconds to wait after a 429, from ``Retry-After`` (Lichess asks for 60 s)."""
+    value = resp.headers.get("Retry-After", "")
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        return default
+
+
+# ───────────────────────── records ───────────────────────── #
+
+_ISO_UTC = re.compile(r"(\d{4})-(\d\d)-(\d\d)T(\d\d):(\d\d):(\d\d)(?:\.(\d{1,3})\d*)?Z$")
+
+
+def iso_to_epoch_ms(iso_str: str) -> int:
+    """Convert '2025-11-07T18:30:00Z' → int milliseconds since epoch.
+
+    A precompiled regex plus ``calendar.timegm`` is several times faster than
+    ``datetime.strptime`` for this fixed format; fractional seconds are kept.
+    """
+    m = _ISO_UTC.match(iso_str)
+    if m is None:
+        raise ValueError(f"not a UTC ISO-8601 timestamp: {iso_str!r}")
+    y, mo, d, h, mi, sec, frac = m.groups()
+    ms = int(frac.ljust(3, "0")) if frac else 0
+    return calendar.timegm((int(y), int(mo), int(d), int(h), int(mi), int(sec))) * 1000 + ms
+
+
+def epoch_ms_to_iso(ms: int) -> str:
+    """Inverse of iso_to_epoch_ms()."""
+    return datetime.fromtimestamp(ms / 1000, tz=timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def parse_starts_at(value) -> Optional[int]:
+    """Accept an ISO string or epoch-ms number and return epoch ms (None if unusable)."""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return int(value)
+    if not value or not isinstance(value, str):
+        return None
+    if value.isdigit():
+        return int(value)
+    try:
+        return iso_to_epoch_ms(value)
+    except ValueError:
+        logging.warning("Unparsable startsAt: %s", value)
+        return None
+
+
+@dataclass(frozen=True)
+class Swiss:
+    """One line of the team Swiss NDJSON stream."""
+    id: str
+    name: str
+    starts_ms: int
+    status: str = "created"
+    clock_limit: int = 0
+    clock_increment: int = 0
+    nb_rounds: int = 0
+    raw: Dict = field(default_factory=dict, repr=False, compare=False)
+
+    @property
+    def starts_at(self) -> str:
+        return epoch_ms_to_iso(self.starts_ms)
+
+    @classmethod
+    def from_json(cls, obj: Dict) -> Optional["Swiss"]:
+        starts_ms = parse_starts_at(obj.get("startsAt"))
+        if starts_ms is None or "id" not in obj:
+            return None
+        clock = obj.get("clock") or {}
+        return cls(
+            id=obj["id"],
+            name=obj.get("name", "Unnamed"),
+            starts_ms=starts_ms,
+            status=obj.get("status", "created"),
+            clock_limit=int(clock.get("limit", 0)),
+            clock_increment=int(clock.get("increment", 0)),
+            nb_rounds=int(obj.get("nbRounds", 0)),
+            raw=obj,
+        )
+
+
+@dataclass(frozen=True)
+class Result:
+    """Outcome of a single write call (join / withdraw / create …)."""
+    target: str
+    outcome: str
+    status_code: int = 0
+    text: str = ""
+
+    @property
+    def ok(self) -> bool:
+        return self.outcome in (OK, ALREADY)
+
+
+# ───────────────────────── readers ───────────────────────── #
+
+def iter_ndjson(resp: requests.Response) -> Iterator[Dict]:
+    """Yield one decoded object per non-empty NDJSON line, skipping junk."""
+    for line in resp.iter_lines(decode_unicode=True):
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError:
+            logging.debug("Skipping malformed NDJSON line: %.80s", line)
+
+
+def iter_team_swiss(team_id: str, token: Optional[str] = None, *,
+                    max: Optional[int] = None, status: Optional[str] = None,
+                    until_finished: bool = False) -> Iterator[Swiss]:
+    """Stream the team's Swiss tournaments as ``Swiss`` records, newest first.
+
+    ``max`` and ``status`` are passed to the server so it sends less.  With
+    ``until_finished`` the stream is closed at the first finished event: the
+    list is ordered by start time, so everything after it is history too.
+    """
+    params = {}
+    if max is not None:
+        params["max"] = max
+    if status:
+        params["status"] = status
+    with request("GET", f"team/{team_id}/swiss", token, params=params,
+                 accept="application/x-ndjson", stream=True) as res:
+        res.raise_for_status()
+        yield from _swiss_records(res, until_finished)
+
+
+def _swiss_records(res: requests.Response, until_finished: bool) -> Iterator[Swiss]:
+    for obj in iter_ndjson(res):
+        if until_finished and obj.get("status") == "finished":
+            return
+        swiss = Swiss.from_json(obj)
+        if swiss is not None:
+            yield swiss
+
+
+def get_upcoming_swiss(team_id: str, token: Optional[str] = None,
+                       now_ms: Optional[int] = None) -> List[Swiss]:
+    """Return Swiss events whose start time is still in the future, soonest first."""
+    if now_ms is None:
+        now_ms = int(datetime.now(timezone.utc).timestamp() * 1000)
+    upcoming = [s for s in iter_team_swiss(team_id, token, status="created", until_finished=True)
+                if s.starts_ms > now_ms]
+    upcoming.sort(key=lambda s: s.starts_ms)
+    return upcoming
+
+
+class SwissListCache:
+    """Upcoming-Swiss list shared by many accounts, refreshed at most every ``ttl`` s.
+
+    Refreshes are conditional (``If-None-Match`` / ``If-Modified-Since``) when
+    the server supplied validators, so an unchanged list costs a 304.  With a
+    ``pool`` (see token_pool.py) each refresh goes through the token with the
+    most rate budget left instead of always through ``token``.
+    """
+
+    def __init__(self, team_id: str, token: Optional[str] = None, ttl: float = 10.0,
+                 pool=None):
+        self.team_id = team_id
+        self.token = token
+        self.ttl = ttl
+        self.pool = pool
+        self.fetches = 0
+        self.not_modified = 0
+        self._lock = threading.Lock()
+        self._swisses: List[Swiss] = []
+        self._fetched_at = float("-inf")
+        self._validators: Dict[str, str] = {}
+
+    def get(self, force: bool = False) -> List[Swiss]:
+        """Return upcoming events (soonest first), refetching only when stale."""
+        with self._lock:
+            now = time.monotonic()
+            if force or now - self._fetched_at >= self.ttl:
+                self._refresh()
+                self._fetched_at = now
+            now_ms = int(time.time() * 1000)
+            return [s for s in self._swisses if s.starts_ms > now_ms]
+
+    def peek(self, swiss_id: str) -> Optional[Swiss]:
+        """Look an event up in the last snapshot without touching the network."""
+        with self._lock:
+            return next((s for s in self._swisses if s.id == swiss_id), None)
+
+    def _refresh(self):
+        if self.pool is not None and len(self.pool):
+            self.pool.read(self._fetch)
+        else:
+            self._fetch(self.token)
+
+    def _fetch(self, token: Optional[str]):
+        self.fetches += 1
+        params = {"status": "created"}
+        with request("GET", f"team/{self.team_id}/swiss", token, params=params,
+                     accept="application/x-ndjson", headers=self._validators,
+                     stream=True) as res:
+            if res.status_code == 304:
+                self.not_modified += 1
+                return
+            res.raise_for_status()
+            swisses = list(_swiss_records(res, until_finished=True))
+            validators = {}
+            if res.headers.get("ETag"):
+                validators["If-None-Match"] = res.headers["ETag"]
+            if res.headers.get("Last-Modified"):
+                validators["If-Modified-Since"] = res.headers["Last-Modified"]
+        swisses.sort(key=lambda s: s.starts_ms)
+        self._swisses = swisses
+        self._validators = validators
+
+
+# ───────────────────────── writers ───────────────────────── #
+
+def _write(path: str, token: str, target: str, already_marker: str, **kwargs) -> Result:
+    try:
+        res = request("POST", path, token, **kwargs)
+    except requests.RequestException as e:
+        return Result(target, ERROR, 0, str(e))
+    text = res.text.strip()
+    if res.status_code == 200:
+        return Result(target, OK, 200, text)
+    if already_marker and already_marker in text.lower():
+        return Result(target, ALREADY, res.status_code, text)
+    return Result(target, FAILED, res.status_code, text)
+
+
+def join(token: str, swiss_id: str) -> Result:
+    """Join a Swiss tournament; an "already joined" 400 counts as ALREADY."""
+    return _write(f"swiss/{swiss_id}/join", token, swiss_id, "already")
+
+
+def withdraw(token: str, swiss_id: str) -> Result:
+    """Withdraw from a Swiss tournament; "not joined" counts as ALREADY."""
+    return _write(f"swiss/{swiss_id}/withdraw", token, swiss_id, "not joined")
+
+
+def join_arena(token: str, arena_id: str, team: Optional[str] = None) -> Result:
+    """Join an arena; ``team`` is required (and only sent) for team battles."""
+    return _write(f"tournament/{arena_id}/join", token, arena_id, "already",
+                  data={"team": team} if team else None)
+
+
+def get_username(token: str) -> Optional[str]:
+    """Return the account name behind a token, or None (with a log line)."""
+    from state_store import account_key  # state_store imports this module
+    try:
+        r = request("GET", "account", token, timeout=10)
+        if r.status_code == 200:
+            return r.json().get("username")
+        logging.warning("[%s] account fetch failed (%d): %s", account_key(token)[:8],
+                        r.status_code, r.text)
+    except requests.RequestException as e:
+        logging.warning("[%s] account fetch error: %s", account_key(token)[:8], e)
+    return None
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Minimal Prometheus instrumentation for the Lichess scripts (no dependencies).
+
+``lichess_client.request`` records every call here: a latency histogram and
+a status-code counter per endpoint, plus retry counts reported by callers
+that retry.  Output is Prometheus text exposition format:
+
+* daemons export ``METRICS_PORT=9108`` and scrape ``/metrics``;
+* one-shot Actions jobs export ``METRICS_TEXTFILE=/path/lichess.prom`` and the
+  file is written atomically at exit for node_exporter's textfile collector.
+
+Both are enabled by calling ``metrics.setup()`` at the start of ``main()``.
+"""
+
+import atexit
+import os
+import threading
+import time
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Sequence, Tuple
+
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _fmt_labels(labels: Labels, extra: str = "") -> str:
+    parts = [f'{k}="{v}"' for k, v in labels]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Counter:
+    def __init__(self, name: str, help: str):
+        self.name, self.help = name, help
+        self._values: Dict[Labels, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(tuple(sorted(labels.items())), 0.0)
+
+    def expose(self) -> str:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labels, v in sorted(self._values.items()):
+                lines.append(f"{self.name}{_fmt_labels(labels)} {v:.15g}")
+        return "\n".join(lines)
+
+
+class Gauge(Counter):
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[tuple(sorted(labels.items()))] = value
+
+    def expose(self) -> str:
+        return super().expose().replace(f"# TYPE {self.name} counter", f"# TYPE {self.name} gauge")
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name, self.help, self.buckets = name, help, tuple(buckets)
+        self._data: Dict[Labels, list] = {}  # labels → [bucket counts…, sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            data = self._data.setdefault(key, [0] * len(self.buckets) + [0.0, 0])
+            i = bisect_left(self.buckets, value)
+            if i < len(self.buckets):
+                data[i] += 1
+            data[-2] += value
+            data[-1] += 1
+
+    def expose(self) -> str:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for labels, data in sorted(self._data.items()):
+                cumulative = 0
+                for bound, n in zip(self.buckets, data):
+                    cumulative += n
+                    le = _fmt_labels(labels, 'le="%g"' % bound)
+                    lines.append(f"{self.name}_bucket{le} {cumulative}")
+                le = _fmt_labels(labels, 'le="+Inf"')
+                lines.append(f"{self.name}_bucket{le} {data[-1]}")
+                lines.append(f"{self.name}_sum{_fmt_labels(labels)} {data[-2]:.6f}")
+                lines.append(f"{self.name}_count{_fmt_labels(labels)} {data[-1]}")
+        return "\n".join(lines)
+
+
+LATENCY = Histogram("lichess_request_duration_seconds",
+                    "Time until response headers, per endpoint.")
+RESPONSES = Counter("lichess_responses_total", "Responses by endpoint and HTTP status.")
+ERRORS = Counter("lichess_request_errors_total", "Requests that failed without a response.")
+RETRIES = Counter("lichess_retries_total",
+                  "Requests re-sent by the client after a 429, and Swiss creations retried "
+                  "by batch_create (429, 5xx or network error).")
+RUN_STARTED = Gauge("lichess_run_started_seconds", "Unix time this process started.")
+RUN_DURATION = Gauge("lichess_run_duration_seconds", "Seconds since this process started.")
+_ALL = (LATENCY, RESPONSES, ERRORS, RETRIES, RUN_STARTED, RUN_DURATION)
+
+_START = time.time()
+RUN_STARTED.set(_START)
+
+
+def observe_request(method: str, endpoint: str, seconds: float, status: Optional[int]):
+    """Record one HTTP call; ``status`` is None when no response arrived."""
+    LATENCY.observe(seconds, method=method, endpoint=endpoint)
+    if status is None:
+        ERRORS.inc(method=method, endpoint=endpoint)
+    else:
+        RESPONSES.inc(method=method, endpoint=endpoint, code=str(status))
+
+
+def expose() -> str:
+    """Whole registry in Prometheus text format."""
+    RUN_DURATION.set(time.time() - _START)
+    return "\n".join(m.expose() for m in _ALL) + "\n"
+
+
+def write_textfile(path: str):
+    """Write atomically so the textfile collector never reads a partial file."""
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(expose())
+    os.replace(tmp, path)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        body = expose().encode()
+        self.send_response(200 if self.path.startswith("/metrics") else 404)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def serve(port: int, addr: str = "0.0.0.0") -> ThreadingHTTPServer:
+    srv = ThreadingHTTPServer((addr, port), _MetricsHandler)
+    threading.Thread(target=srv.serve_forever, name="metrics", daemon=True).start()
+    return srv
+
+
+def setup():
+    """Enable the exporters requested through METRICS_PORT / METRICS_TEXTFILE."""
+    port = os.environ.get("METRICS_PORT")
+    if port:
+        serve(int(port))
+    path = os.environ.get("METRICS_TEXTFILE")
+    if path:
+        atexit.register(write_textfile, path)
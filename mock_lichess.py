@@ -0,0 +1,469 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the parts of lichess.org these scripts use.
+
+Endpoints
+---------
+GET  /api/account                       username derived from the bearer token
+GET  /api/team/{team}/swiss             NDJSON, newest first; honours max/status, ETag
+GET  /api/team/{team}/arena             NDJSON arenas, newest first, some are team battles
+GET  /api/swiss/{id}/games              games of a finished Swiss (synthetic), PGN or NDJSON
+GET  /api/swiss/{id}/results            NDJSON final standings of a finished Swiss (synthetic)
+POST /api/swiss/new/{team}              creates a Swiss, returns {"id", "url"}
+POST /api/swiss/{id}/join               400 "already joined" on repeats
+POST /api/swiss/{id}/withdraw           400 "not joined" if not in
+POST /api/team/{team}/kick/{user}       404 if not a member
+POST /api/tournament/{id}/join          400 unless a team battle gets one of its teams
+POST /api/token/test                    comma-separated tokens → scopes / userId
+POST /team/{team}/pm-all                team-wide message (site route, not /api)
+HEAD /                                  carries a Date header (clock sync)
+
+Latency, 5xx error rate and a per-token request budget (429 + Retry-After)
+are configurable, so benchmarks see realistic back-pressure:
+
+    python mock_lichess.py --port 8765 --latency-ms 40 --error-rate 0.01 --rate 20/1
+    LICHESS_URL=http://127.0.0.1:8765 python ja.py
+"""
+
+import argparse
+import json
+import random
+import re
+import sys
+import threading
+import time
+from collections import defaultdict, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+import lichess_client as lc
+
+
+class MockState:
+    """In-memory teams, Swisses, joins and members, guarded by one lock."""
+
+    def __init__(self, upcoming: int = 24, finished: int = 200, members: int = 500):
+        self.lock = threading.Lock()
+        self.swiss: Dict[str, List[Dict]] = defaultdict(list)  # team → newest first
+        self.by_id: Dict[str, Dict] = {}
+        self.joined: set = set()  # (username, swiss_id)
+        self.members: Dict[str, Dict[str, int]] = defaultdict(dict)  # team → user → joinedAt
+        self.arenas: Dict[str, List[Dict]] = defaultdict(list)  # team → newest first
+        self.arena_by_id: Dict[str, Dict] = {}
+        self.version = 0
+        self._seq = 0
+        self._seed_upcoming, self._seed_finished, self._seed_members = upcoming, finished, members
+
+    def _seed(self, team: str):
+        """Populate a team on first sight with upcoming + finished events and members."""
+        if team in self.swiss or team in self.members:
+            return
+        now = int(time.time() * 1000)
+        for i in range(self._seed_upcoming, 0, -1):
+            self._add(team, "Cash Tournament Qualifier", now + i * 3_600_000, 180, 2, "created")
+        for i in range(1, self._seed_finished + 1):
+            self._add(team, "Cash Tournament Qualifier", now - i * 3_600_000, 180, 2, "finished")
+        for i in range(self._seed_members):
+            self.members[team][f"member-{i}"] = now - i * 60_000
+        for i in range(-2, 8):  # two finished, then one every 6 h; every other is a battle
+            self._seq += 1
+            battle = i % 2 == 0
+            obj = {"id": f"ar{self._seq:06d}", "startsAt": now + i * 6 * 3_600_000 + 60_000,
+                   "fullName": "Team Battle" if battle else "Hourly Blitz Arena",
+                   "status": 30 if i < 0 else 10, "clock": {"limit": 180, "increment": 0},
+                   "minutes": 90, "createdBy": "mock"}
+            if battle:
+                obj["teamBattle"] = {"teams": [team, "rival-team"], "nbLeaders": 5}
+            self.arenas[team].insert(0, obj)
+            self.arena_by_id[obj["id"]] = obj
+
+    def _add(self, team, name, starts_ms, limit, inc, status, rounds=7) -> Dict:
+        self._seq += 1
+        obj = {"id": f"mk{self._seq:06d}", "name": name, "startsAt": lc.epoch_ms_to_iso(starts_ms),
+               "clock": {"limit": limit, "increment": inc}, "nbRounds": rounds,
+               "status": status, "createdBy": "mock"}
+        self.swiss[team].append(obj)
+        self.swiss[team].sort(key=lambda o: o["startsAt"], reverse=True)
+        self.by_id[obj["id"]] = obj
+        self.version += 1
+        return obj
+
+
+class RateLimiter:
+    """Sliding-window budget per token: ``limit`` requests per ``window`` seconds."""
+
+    def __init__(self, limit: int = 0, window: float = 1.0, retry_after: int = 1):
+        self.limit, self.window, self.retry_after = limit, window, retry_after
+        self._hits: Dict[str, deque] = defaultdict(deque)
+        self._lock = threading.Lock()
+
+    def allow(self, key: str) -> bool:
+        if self.limit <= 0:
+            return True
+        now = time.monotonic()
+        with self._lock:
+            q = self._hits[key]
+            while q and now - q[0] > self.window:
+                q.popleft()
+            if len(q) >= self.limit:
+                return False
+            q.append(now)
+            return True
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: "MockLichess"
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args):
+        pass
+
+    # ───────── plumbing ───────── #
+
+    def _token(self) -> Optional[str]:
+        auth = self.headers.get("Authorization", "")
+        return auth[7:] if auth.startswith("Bearer ") else None
+
+    def _send(self, code: int, body=b"", ctype="application/json", headers=None):
+        if isinstance(body, (dict, list)):
+            body = json.dumps(body).encode()
+        elif isinstance(body, str):
+            body = body.encode()
+        self.send_response(code)  # adds the Date header clock_sync reads
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(len(body)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    def _gate(self) -> bool:
+        """Apply latency, rate limit and random errors; False if already answered."""
+        srv = self.server
+        if srv.latency_ms:
+            time.sleep(max(0.0, random.gauss(srv.latency_ms, srv.jitter_ms)) / 1000)
+        if not srv.limiter.allow(self._token() or self.client_address[0]):
+            self._send(429, {"error": "Too many requests"},
+                       headers={"Retry-After": str(srv.limiter.retry_after)})
+            return False
+        if srv.error_rate and random.random() < srv.error_rate:
+            self._send(503, {"error": "mock failure"})
+            return False
+        return True
+
+    def _route(self, routes) -> Optional[Tuple]:
+        url = urlsplit(self.path)
+        self.query = parse_qs(url.query)
+        for pattern, fn in routes:
+            m = pattern.fullmatch(url.path)
+            if m:
+                return fn, m.groups()
+        return None
+
+    def _dispatch(self, routes):
+        length = int(self.headers.get("Content-Length") or 0)
+        self.body = self.rfile.read(length).decode() if length else ""
+        self.form = parse_qs(self.body)
+        found = self._route(routes)
+        if found is None:
+            self._send(404, {"error": "Not found"})
+            return
+        if not self._gate():
+            return
+        fn, args = found
+        fn(self, *args)
+
+    def do_GET(self):
+        self._dispatch(_GET)
+
+    def do_POST(self):
+        self._dispatch(_POST)
+
+    def do_HEAD(self):
+        self._send(200, b"", "text/html")
+
+    # ───────── endpoints ───────── #
+
+    def account(self):
+        token = self._token()
+        if not token:
+            self._send(401, {"error": "No such token"})
+            return
+        self._send(200, {"id": _user(token), "username": _user(token)})
+
+    def team_swiss(self, team):
+        st = self.server.state
+        with st.lock:
+            st._seed(team)
+            etag = f'"{st.version}"'
+            if self.headers.get("If-None-Match") == etag:
+                self._send(304, headers={"ETag": etag})
+                return
+            rows = list(st.swiss[team])
+        status = self.query.get("status", [None])[0]
+        if status:
+            rows = [r for r in rows if r["status"] == status]
+        limit = int(self.query.get("max", ["100"])[0])
+        body = "".join(json.dumps(r) + "\n" for r in rows[:limit])
+        self._send(200, body, "application/x-ndjson", {"ETag": etag})
+
+    def team_arena(self, team):
+        st = self.server.state
+        with st.lock:
+            st._seed(team)
+            rows = list(st.arenas[team])
+        status = {"created": 10, "started": 20, "finished": 30}.get(
+            self.query.get("status", [""])[0])
+        if status:
+            rows = [r for r in rows if r["status"] == status]
+        limit = int(self.query.get("max", ["100"])[0])
+        self._send(200, "".join(json.dumps(r) + "\n" for r in rows[:limit]),
+                   "application/x-ndjson")
+
+    def team_users(self, team):
+        st = self.server.state
+        with st.lock:
+            st._seed(team)
+            rows = sorted(st.members[team].items(), key=lambda kv: kv[1], reverse=True)
+        body = "".join(json.dumps({"id": u, "name": u, "joinedTeamAt": at}) + "\n"
+                       for u, at in rows)
+        self._send(200, body, "application/x-ndjson")
+
+    def swiss_games(self, swiss_id):
+        with self.server.state.lock:
+            obj = self.server.state.by_id.get(swiss_id)
+        if obj is None:
+            self._send(404, {"error": "Not found"})
+            return
+        games = _synthetic_games(obj)
+        if "ndjson" in self.headers.get("Accept", ""):
+            self._send(200, "".join(json.dumps(g) + "\n" for g in games), "application/x-ndjson")
+        else:
+            self._send(200, "".join(map(_pgn, games)), "application/x-chess-pgn")
+
+    def swiss_results(self, swiss_id):
+        with self.server.state.lock:
+            obj = self.server.state.by_id.get(swiss_id)
+        if obj is None:
+            self._send(404, {"error": "Not found"})
+            return
+        body = "".join(json.dumps(r) + "\n" for r in _synthetic_results(obj))
+        self._send(200, body, "application/x-ndjson")
+
+    def swiss_new(self, team):
+        f = {k: v[0] for k, v in self.form.items()}
+        try:
+            starts_ms = lc.parse_starts_at(f["startsAt"])
+            limit, inc = int(f["clock.limit"]), int(f["clock.increment"])
+        except (KeyError, ValueError):
+            self._send(400, {"error": "invalid form"})
+            return
+        st = self.server.state
+        with st.lock:
+            st._seed(team)
+            obj = st._add(team, f.get("name", "Swiss"), starts_ms, limit, inc, "created",
+                          int(f.get("nbRounds", 7)))
+        self._send(200, {**obj, "url": f"{lc.SITE_ROOT}/swiss/{obj['id']}"})
+
+    def swiss_join(self, swiss_id):
+        self._toggle(swiss_id, join=True)
+
+    def swiss_withdraw(self, swiss_id):
+        self._toggle(swiss_id, join=False)
+
+    def _toggle(self, swiss_id, join):
+        token = self._token()
+        if not token:
+            self._send(401, {"error": "Login required"})
+            return
+        st, key = self.server.state, (_user(token), swiss_id)
+        with st.lock:
+            if swiss_id not in st.by_id:
+                self._send(404, {"error": "Not found"})
+                return
+            present = key in st.joined
+            if join and present:
+                self._send(400, {"error": "You have already joined"})
+                return
+            if not join and not present:
+                self._send(400, {"error": "You have not joined"})
+                return
+            (st.joined.add if join else st.joined.discard)(key)
+        self._send(200, {"ok": True})
+
+    def team_kick(self, team, user):
+        st = self.server.state
+        with st.lock:
+            st._seed(team)
+            if st.members[team].pop(user.lower(), None) is None:
+                self._send(404, {"error": "Not found"})
+                return
+        self._send(200, {"ok": True})
+
+    def token_test(self):
+        scopes = "tournament:write,team:write,team:lead"
+        self._send(200, {t: {"userId": _user(t), "scopes": scopes, "expires": None}
+                         for t in self.body.split(",") if t})
+
+    def team_pm_all(self, team):
+        self._send(200 if self._token() else 401, {"ok": bool(self._token())})
+
+    def tournament_join(self, tmt_id):
+        token = self._token()
+        if not token:
+            self._send(401, {"error": "Login required"})
+            return
+        st = self.server.state
+        with st.lock:
+            obj = st.arena_by_id.get(tmt_id)
+            if obj is None:
+                self._send(404, {"error": "Not found"})
+                return
+            teams = (obj.get("teamBattle") or {}).get("teams")
+            if teams is not None and self.form.get("team", [None])[0] not in teams:
+                self._send(400, {"error": "You need to join one of the battle teams"})
+                return
+            st.joined.add((_user(token), tmt_id))
+        self._send(200, {"ok": True})
+
+
+def _user(token: str) -> str:
+    return f"user-{token[-6:]}"
+
+
+def _synthetic_games(swiss: Dict, players: int = 16) -> List[Dict]:
+    """Deterministic games for a finished Swiss: rounds take ~60 % of the
+    nominal clock time plus a 30 s pairing gap, with some noise."""
+    if swiss["status"] != "finished":
+        return []
+    rng = random.Random(swiss["id"])
+    limit, inc = swiss["clock"]["limit"], swiss["clock"]["increment"]
+    nominal = 2 * (limit + 40 * inc)
+    t = lc.parse_starts_at(swiss["startsAt"])
+    games = []
+    for rnd in range(swiss["nbRounds"]):
+        lengths = [nominal * rng.uniform(0.2, 0.6) for _ in range(players // 2)]
+        for k, secs in enumerate(lengths):
+            games.append({
+                "id": f"{swiss['id'][-4:]}{rnd:02d}{k:02d}", "rated": True,
+                "variant": "standard", "speed": "blitz",
+                "createdAt": t, "lastMoveAt": t + int(secs * 1000),
+                "status": rng.choice(["mate", "resign", "outoftime", "draw"]),
+                "players": {"white": {"user": {"name": f"member-{2 * k}"}},
+                            "black": {"user": {"name": f"member-{2 * k + 1}"}}},
+                "clock": {"initial": limit, "increment": inc},
+            })
+        t += int((max(lengths) + 30) * 1000)
+    return games
+
+
+_GET = [
+    (re.compile(r"/api/account"), _Handler.account),
+    (re.compile(r"/api/team/([^/]+)/swiss"), _Handler.team_swiss),
+    (re.compile(r"/api/team/([^/]+)/arena"), _Handler.team_arena),
+    (re.compile(r"/api/team/([^/]+)/users"), _Handler.team_users),
+    (re.compile(r"/api/swiss/([^/]+)/games"), _Handler.swiss_games),
+    (re.compile(r"/api/swiss/([^/]+)/results"), _Handler.swiss_results),
+]
+_POST = [
+    (re.compile(r"/api/swiss/new/([^/]+)"), _Handler.swiss_new),
+    (re.compile(r"/api/swiss/([^/]+)/join"), _Handler.swiss_join),
+    (re.compile(r"/api/swiss/([^/]+)/withdraw"), _Handler.swiss_withdraw),
+    (re.compile(r"/api/team/([^/]+)/kick/([^/]+)"), _Handler.team_kick),
+    (re.compile(r"/api/tournament/([^/]+)/join"), _Handler.tournament_join),
+    (re.compile(r"/api/token/test"), _Handler.token_test),
+    (re.compile(r"/team/([^/]+)/pm-all"), _Handler.team_pm_all),
+]
+
+
+def _pgn(game: Dict) -> str:
+    """Lichess-style PGN for a synthetic game (moves are placeholders)."""
+    rng = random.Random(game["id"])
+    result = {"draw": "1/2-1/2"}.get(game["status"], rng.choice(["1-0", "0-1"]))
+    termination = "Time forfeit" if game["status"] == "outoftime" else "Normal"
+    c = game["clock"]
+    tags = [("Event", "Cash Tournament Qualifier"), ("Site", f"{lc.SITE_ROOT}/{game['id']}"),
+            ("White", game["players"]["white"]["user"]["name"]),
+            ("Black", game["players"]["black"]["user"]["name"]), ("Result", result),
+            ("WhiteElo", str(rng.randint(1200, 2400))), ("BlackElo", str(rng.randint(1200, 2400))),
+            ("ECO", f"{rng.choice('ABCDE')}{rng.randint(0, 99):02d}"),
+            ("TimeControl", f"{c['initial']}+{c['increment']}"), ("Termination", termination)]
+    plies = rng.randint(20, 140)
+    moves = " ".join(f"{i // 2 + 1}. e4" if i % 2 == 0 else "e5" for i in range(plies))
+    return "".join(f'[{k} "{v}"]\n' for k, v in tags) + f"\n{moves} {result}\n\n\n"
+
+
+def _synthetic_results(swiss: Dict, pool: int = 60, players: int = 16) -> List[Dict]:
+    """Deterministic standings drawn from a pool of ``member-i`` accounts."""
+    if swiss["status"] != "finished":
+        return []
+    rng = random.Random(swiss["id"] + "/results")
+    rounds = swiss["nbRounds"]
+    rows = [{"username": f"member-{i}", "rating": 1500 + 10 * (pool - i),
+             "points": rng.randint(0, 2 * rounds) / 2, "tieBreak": round(rng.uniform(0, 40), 2),
+             "performance": 1400 + rng.randint(0, 800)}
+            for i in rng.sample(range(pool), players)]
+    rows.sort(key=lambda r: (-r["points"], -r["tieBreak"]))
+    return [{"rank": k + 1, **r} for k, r in enumerate(rows)]
+
+
+class MockLichess(ThreadingHTTPServer):
+    """Threaded mock server; use ``start()`` for in-process tests and benchmarks."""
+
+    daemon_threads = True
+    request_queue_size = 256
+
+    def __init__(self, port: int = 0, latency_ms: float = 0.0, jitter_ms: float = 0.0,
+                 error_rate: float = 0.0, rate_limit: int = 0, rate_window: float = 1.0,
+                 retry_after: int = 1, state: Optional[MockState] = None):
+        super().__init__(("127.0.0.1", port), _Handler)
+        self.latency_ms, self.jitter_ms, self.error_rate = latency_ms, jitter_ms, error_rate
+        self.limiter = RateLimiter(rate_limit, rate_window, retry_after)
+        self.state = state or MockState()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_port}"
+
+    def handle_error(self, request, client_address):
+        # clients legitimately hang up mid-stream (early-terminated NDJSON reads)
+        if not isinstance(sys.exc_info()[1], (ConnectionResetError, BrokenPipeError)):
+            super().handle_error(request, client_address)
+
+    def start(self) -> "MockLichess":
+        self._thread = threading.Thread(target=self.serve_forever, name="mock-lichess",
+                                        daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Run a local mock of the Lichess API.")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--latency-ms", type=float, default=0.0)
+    ap.add_argument("--jitter-ms", type=float, default=0.0)
+    ap.add_argument("--error-rate", type=float, default=0.0, help="fraction answered with 503")
+    ap.add_argument("--rate", default="0/1", help="per-token budget N/SECONDS (0 = unlimited)")
+    ap.add_argument("--retry-after", type=int, default=1)
+    args = ap.parse_args()
+
+    limit, window = args.rate.split("/")
+    srv = MockLichess(args.port, args.latency_ms, args.jitter_ms, args.error_rate,
+                      int(limit), float(window), args.retry_after)
+    print(f"🧪 Mock Lichess listening on {srv.url}  (export LICHESS_URL={srv.url})")
+    try:
+        srv.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+"""
+Stream every game of finished Swisses into a compact, append-only file.
+
+``/api/swiss/{id}/games`` is read as PGN, line by line, straight off the
+socket.  Only the header tags we need are kept (players, ratings, result,
+ECO, time control, termination) and the movetext is never stored — its
+plies are counted on the fly — so memory stays constant whatever the size
+of the event.  Each game becomes one tab-separated line in a gzip file that
+is only ever appended to.  An event is first written to a temporary file as
+one complete gzip member; once it is finished the member is appended to the
+log and fsync'd, and only then is the event listed, with the log's new size,
+in ``<file>.done``.  A run killed at any point therefore leaves at most an
+unlisted tail, which the next run cuts off before appending, and the event
+is exported again.
+
+    event  game  white  black  white_elo  black_elo  result  eco  clock  termination  plies
+
+Per-event statistics (decisive / draw share, flag rate, average length in
+moves) are printed at the end.  There is no berserk rate: berserk exists only
+in arenas, and Swiss games never carry it.
+
+    python pgn_export.py chess-blasters-2 --days 7 --out qualifiers.tsv.gz
+    python pgn_export.py --ids abcd1234 efgh5678
+"""
+
+import argparse
+import gzip
+import logging
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional, Set
+
+import lichess_client as lc
+
+QUALIFIER = "Cash Tournament Qualifier"
+DEFAULT_OUT = os.environ.get("PGN_EXPORT", ".state/games.tsv.gz")
+WORKERS = int(os.environ.get("PGN_WORKERS", "4"))
+FIELDS = ("White", "Black", "WhiteElo", "BlackElo", "Result", "ECO", "TimeControl",
+          "Termination")
+_TAG = re.compile(r'^\[(\w+) "(.*)"\]$')
+_NOT_A_MOVE = re.compile(r"^(\d+\.+|1-0|0-1|1/2-1/2|\*|\{.*|.*\}|\$\d+)$")
+
+
+@dataclass
+class EventStats:
+    event: str
+    games: int = 0
+    decisive: int = 0
+    draws: int = 0
+    flagged: int = 0
+    plies: int = 0
+
+    def add(self, tags: Dict[str, str], plies: int):
+        self.games += 1
+        self.plies += plies
+        result = tags.get("Result")
+        self.decisive += result in ("1-0", "0-1")
+        self.draws += result == "1/2-1/2"
+        self.flagged += tags.get("Termination") == "Time forfeit"
+
+    def row(self) -> str:
+        g = max(self.games, 1)
+        return (f"{self.event:<10}{self.games:>7}{self.decisive / g:>10.0%}{self.draws / g:>7.0%}"
+                f"{self.flagged / g:>7.0%}{self.plies / g / 2:>9.1f}")
+
+
+def iter_pgn_games(lines: Iterator[str]) -> Iterator[tuple]:
+    """Yield ``(tags, plies)`` per game from PGN text lines, holding one game's tags."""
+    tags: Dict[str, str] = {}
+    plies = 0
+    in_moves = False
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        if line[0] == "[":
+            if in_moves:  # a header after movetext starts the next game
+                yield tags, plies
+                tags, plies, in_moves = {}, 0, False
+            m = _TAG.match(line)
+            if m and (m.group(1) in FIELDS or m.group(1) == "Site"):
+                tags[m.group(1)] = m.group(2)
+        else:
+            in_moves = True
+            plies += sum(1 for tok in line.split() if not _NOT_A_MOVE.match(tok))
+    if tags:
+        yield tags, plies
+
+
+def stream_games(swiss_id: str, token: Optional[str] = None) -> Iterator[tuple]:
+    with lc.request("GET", f"swiss/{swiss_id}/games", token, accept="application/x-chess-pgn",
+                    params={"clocks": "false", "evals": "false", "opening": "false"},
+                    stream=True, timeout=120) as res:
+        res.raise_for_status()
+        res.encoding = "utf-8"
+        yield from iter_pgn_games(res.iter_lines(chunk_size=1 << 16, decode_unicode=True))
+
+
+class GameLog:
+    """Append-only gzip TSV of games plus a ``.done`` list of completed events.
+
+    ``.done`` lines are ``event<TAB>size of the log after it``; the last size
+    is where the log is cut back to on open.  Lines without a size (older
+    runs, or a lost ``.done``) are recovered by reading the log's gzip members.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.dir = os.path.dirname(os.path.abspath(path))
+        os.makedirs(self.dir, exist_ok=True)
+        self.done: Set[str] = set()
+        sized: Dict[str, int] = {}
+        unsized: Set[str] = set()
+        end = 0
+        listed = os.path.exists(path + ".done")
+        if listed:
+            with open(path + ".done", encoding="utf-8") as f:
+                for line in f:
+                    if not line.endswith("\n"):
+                        break  # torn last line: that event did not finish
+                    event, _, size = line.rstrip("\n").partition("\t")
+                    if not event:
+                        continue
+                    self.done.add(event)
+                    if size.isdigit():
+                        end = sized[event] = int(size)
+                        unsized.discard(event)
+                    else:
+                        unsized.add(event)
+        self._prefix = f".{os.path.basename(path)}.part-"
+        self._repair(end, sized, unsized, listed)
+        self._lock = threading.Lock()
+        self._parts: Dict[str, tuple] = {}
+
+    def _repair(self, end: int, sized: Dict[str, int], unsized: Set[str], listed: bool):
+        """Cut off whatever a killed run appended after the last finished event."""
+        size = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+        if unsized or (size and not listed):
+            end = self._recover(end, sized, unsized, listed)
+        if size > end:
+            logging.warning("%s: dropping %d byte(s) of unfinished output", self.path, size - end)
+            with open(self.path, "r+b") as f:
+                f.truncate(end)
+                os.fsync(f.fileno())
+        elif size < end:
+            logging.warning("%s is shorter than %s.done records", self.path, self.path)
+        for name in os.listdir(self.dir):  # temp parts of a killed run
+            if name.startswith(self._prefix):
+                os.remove(os.path.join(self.dir, name))
+
+    def _recover(self, end: int, sized: Dict[str, int], unsized: Set[str],
+                 listed: bool) -> int:
+        """Where the finished events end, from the log's complete gzip members.
+
+        An unsized event counts as finished if its games are in a complete
+        member (without ``.done`` at all, every event found is); the others
+        are dropped from ``done`` so they are exported again.  ``.done`` is
+        rewritten with sizes, so this runs once.
+        """
+        sizes: Dict[str, int] = {}
+        for member_end, events in self._members():
+            found = events & unsized if listed else events
+            if found or member_end <= end:
+                end = max(end, member_end)
+                sizes.update(dict.fromkeys(found, member_end))
+        lost = unsized - sizes.keys()
+        if lost:
+            logging.warning("%s: %d finished event(s) not found in the log, exporting them again",
+                            self.path, len(lost))
+        self.done = (self.done - lost) | sizes.keys()
+        known = {event: at for event, at in sized.items() if event in self.done}
+        known.update(sizes)
+        tmp = self.path + ".done.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            for event, at in sorted(known.items(), key=lambda kv: kv[1]):
+                f.write(f"{event}\t{at}\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path + ".done")
+        return end
+
+    def _members(self) -> Iterator[tuple]:
+        """``(end offset, events)`` of each complete gzip member of the log, in order."""
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "rb") as f:
+            d, events, tail, base = zlib.decompressobj(31), set(), b"", 0
+            while True:
+                chunk = f.read(1 << 20)
+                if not chunk:
+                    return  # a torn last member has no end
+                while chunk:
+                    try:
+                        lines = (tail + d.decompress(chunk)).split(b"\n")
+                    except zlib.error:
+                        return
+                    tail = lines.pop()
+                    events.update(line.split(b"\t", 1)[0].decode(errors="replace")
+                                  for line in lines if line)
+                    if not d.eof:
+                        base += len(chunk)
+                        break
+                    member_end = base + len(chunk) - len(d.unused_data)
+                    yield member_end, events
+                    chunk, base = d.unused_data, member_end
+                    d, events, tail = zlib.decompressobj(31), set(), b""
+
+    def write(self, event: str, tags: Dict[str, str], plies: int):
+        game = tags.get("Site", "").rsplit("/", 1)[-1]
+        line = "\t".join([event, game] + [tags.get(f, "").replace("\t", " ") for f in FIELDS]
+                         + [str(plies)])
+        self._part(event)[1].write(line + "\n")
+
+    def _part(self, event: str) -> tuple:
+        """(temp path, gzip writer) of an event; each event has a single writer thread."""
+        part = self._parts.get(event)
+        if part is None:
+            fd, tmp = tempfile.mkstemp(prefix=self._prefix, dir=self.dir)
+            os.close(fd)
+            part = (tmp, gzip.open(tmp, "wt", encoding="utf-8"))
+            with self._lock:
+                self._parts[event] = part
+        return part
+
+    def finish(self, event: str):
+        tmp, out = self._part(event)
+        out.close()  # a complete gzip member
+        with self._lock:
+            with open(tmp, "rb") as src, open(self.path, "ab") as dst:
+                shutil.copyfileobj(src, dst)
+                dst.flush()
+                os.fsync(dst.fileno())
+                end = dst.tell()
+            with open(self.path + ".done", "a", encoding="utf-8") as f:
+                f.write(f"{event}\t{end}\n")
+                f.flush()
+                os.fsync(f.fileno())
+            self.done.add(event)
+            del self._parts[event]
+        os.remove(tmp)
+
+    def close(self):
+        """Drop the parts of events that did not finish."""
+        with self._lock:
+            parts, self._parts = list(self._parts.values()), {}
+        for tmp, out in parts:
+            out.close()
+            os.remove(tmp)
+
+
+def export_event(log: GameLog, swiss_id: str, token: Optional[str] = None) -> EventStats:
+    stats = EventStats(swiss_id)
+    for tags, plies in stream_games(swiss_id, token):
+        log.write(swiss_id, tags, plies)
+        stats.add(tags, plies)
+    log.finish(swiss_id)
+    return stats
+
+
+def recent_finished(team_id: str, days: float, token: Optional[str] = None,
+                    name: Optional[str] = QUALIFIER) -> List[str]:
+    cutoff = int((time.time() - days * 86400) * 1000)
+    ids = []
+    for s in lc.iter_team_swiss(team_id, token, status="finished"):
+        if s.starts_ms < cutoff:
+            break  # newest first: everything after this is older
+        if name is None or s.name == name:
+            ids.append(s.id)
+    return ids
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Stream Swiss games to a compact TSV and summarise.")
+    ap.add_argument("team", nargs="?")
+    ap.add_argument("--ids", nargs="+", help="export these Swiss ids instead of a team's")
+    ap.add_argument("--days", type=float, default=1.0, help="finished in the last N days")
+    ap.add_argument("--all-names", action="store_true", help="not only qualifiers")
+    ap.add_argument("--out", default=DEFAULT_OUT)
+    ap.add_argument("--workers", type=int, default=WORKERS)
+    args = ap.parse_args(argv)
+    if not args.ids and not args.team:
+        ap.error("give a team or --ids")
+
+    token = lc.clean_token(os.environ.get("LICHESS_KEY")) or None
+    ids = args.ids or recent_finished(args.team, args.days, token,
+                                      None if args.all_names else QUALIFIER)
+    log = GameLog(args.out)
+    todo = [i for i in ids if i not in log.done]
+    print(f"📦 {len(todo)} event(s) to export ({len(ids) - len(todo)} already in {args.out})")
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, args.workers)) as pool:
+            stats = list(pool.map(lambda i: export_event(log, i, token), todo))
+    finally:
+        log.close()
+
+    if stats:
+        print(f"\n{'event':<10}{'games':>7}{'decisive':>10}{'draw':>7}{'flag':>7}{'moves':>9}")
+        for s in stats:
+            print(s.row())
+        total = EventStats("total")
+        for s in stats:
+            for f in ("games", "decisive", "draws", "flagged", "plies"):
+                setattr(total, f, getattr(total, f) + getattr(s, f))
+        print(total.row())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Cross-process token-bucket rate governor for the Lichess API.
+
+Every request first takes one token from its OAuth token's bucket and one
+from a global bucket.  Bucket state lives in a small JSON file guarded by an
+exclusive ``flock``, so all scripts running on the same machine (overlapping
+workflows, the bots, a manual run) share one budget.  Rates adapt AIMD-style:
+a 429 blocks the bucket for ``Retry-After`` and halves its rate, and each
+success adds a little back up to the configured ceiling.  Whether a bucket
+is below its ceiling is read from the shared file on every acquire, so any
+process using the token ramps it back, not only the one that got the 429.
+
+Environment
+-----------
+LICHESS_RATE_TOKEN    per-token "rate/burst", default "2/5"   (requests per s / bucket size)
+LICHESS_RATE_GLOBAL   machine-wide "rate/burst", default "10/20"
+LICHESS_RATE_STATE    state file, default $TMPDIR/lichess-rate.json
+LICHESS_RATE_DISABLE  set to 1 to turn the governor off
+"""
+
+import contextlib
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to a per-process lock only
+    fcntl = None
+
+GLOBAL = "*"
+MIN_RATE = 0.05         # never slow a bucket below one request per 20 s
+INCREASE_STEP = 0.05    # additive increase per successful request (req/s)
+STALE_SEC = 3600        # forget buckets idle for an hour
+
+
+def _parse(spec: str, default: Tuple[float, float]) -> Tuple[float, float]:
+    try:
+        rate, burst = spec.split("/")
+        return float(rate), float(burst)
+    except (AttributeError, ValueError):
+        return default
+
+
+def bucket_key(token: Optional[str]) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()[:16] if token else "anon"
+
+
+class Governor:
+    def __init__(self, path: str, token_limit: Tuple[float, float] = (2.0, 5.0),
+                 global_limit: Tuple[float, float] = (10.0, 20.0)):
+        self.path = path
+        self.limits = {"token": token_limit, "global": global_limit}
+        self._thread_lock = threading.Lock()
+        # keys seen below their ceiling in the shared state at the last acquire;
+        # successes on them ramp the shared rate back up
+        self._degraded = set()
+
+    @contextlib.contextmanager
+    def _state(self):
+        """Yield the shared state dict under an exclusive cross-process lock."""
+        with self._thread_lock, open(self.path, "a+", encoding="utf-8") as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                f.seek(0)
+                try:
+                    state = json.loads(f.read() or "{}")
+                except json.JSONDecodeError:
+                    state = {}
+                yield state
+                f.seek(0)
+                f.truncate()
+                f.write(json.dumps(state))
+                f.flush()
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _bucket(self, state: Dict, key: str, now: float) -> Dict:
+        kind = "global" if key == GLOBAL else "token"
+        ceiling, burst = self.limits[kind]
+        b = state.setdefault(key, {"tokens": burst, "ts": now, "rate": ceiling,
+                                   "blocked_until": 0.0})
+        b["tokens"] = min(burst, b["tokens"] + (now - b["ts"]) * b["rate"])
+        b["ts"] = now
+        return b
+
+    def acquire(self, token: Optional[str]) -> float:
+        """Block until both buckets allow one request; return seconds waited."""
+        key = bucket_key(token)
+        waited = 0.0
+        while True:
+            with self._state() as state:
+                now = time.time()
+                buckets = [self._bucket(state, key, now), self._bucket(state, GLOBAL, now)]
+                if buckets[0]["rate"] < self.limits["token"][0]:
+                    self._degraded.add(key)
+                else:
+                    self._degraded.discard(key)
+                wait = max(max(b["blocked_until"] - now,
+                               (1 - b["tokens"]) / b["rate"]) for b in buckets)
+                if wait <= 0:
+                    for b in buckets:
+                        b["tokens"] -= 1
+                    for k in [k for k, b in state.items() if now - b["ts"] > STALE_SEC]:
+                        del state[k]
+                    return waited
+            time.sleep(wait)
+            waited += wait
+
+    def available(self, token: Optional[str]) -> float:
+        """Requests ``token`` could send right now (0 while it is blocked)."""
+        key = bucket_key(token)
+        with self._state() as state:
+            now = time.time()
+            b = self._bucket(state, key, now)
+            return 0.0 if b["blocked_until"] > now else b["tokens"]
+
+    def feedback(self, token: Optional[str], status: int, retry_after: float = 0.0):
+        """Adapt to a response: 429 blocks and halves the rate, success ramps it back."""
+        key = bucket_key(token)
+        if status != 429 and key not in self._degraded:
+            return  # nothing to adapt — skip the file round trip
+        with self._state() as state:
+            now = time.time()
+            b = self._bucket(state, key, now)
+            ceiling = self.limits["token"][0]
+            if status == 429:
+                b["blocked_until"] = max(b["blocked_until"], now + retry_after)
+                b["rate"] = max(MIN_RATE, b["rate"] / 2)
+                b["tokens"] = 0.0
+                self._degraded.add(key)
+                if token is None:
+                    g = self._bucket(state, GLOBAL, now)
+                    g["blocked_until"] = b["blocked_until"]
+            elif status < 400:
+                b["rate"] = min(ceiling, b["rate"] + INCREASE_STEP)
+                if b["rate"] >= ceiling:
+                    self._degraded.discard(key)
+
+
+_governor: Optional[Governor] = None
+_governor_lock = threading.Lock()
+
+
+def governor() -> Optional[Governor]:
+    """Process-wide governor configured from the environment (None if disabled)."""
+    global _governor
+    if os.environ.get("LICHESS_RATE_DISABLE") == "1":
+        return None
+    if _governor is None:
+        with _governor_lock:
+            if _governor is None:
+                path = os.environ.get("LICHESS_RATE_STATE",
+                                      os.path.join(tempfile.gettempdir(), "lichess-rate.json"))
+                _governor = Governor(
+                    path,
+                    _parse(os.environ.get("LICHESS_RATE_TOKEN"), (2.0, 5.0)),
+                    _parse(os.environ.get("LICHESS_RATE_GLOBAL"), (10.0, 20.0)),
+                )
+    return _governor
@@ -1,15 +1,12 @@
-import requests
 import os
 import sys
 
+import lichess_client as lc
+
 def send_private_message(token, username, message):
-    url = f"https://lichess.org/inbox/{username}"
-    headers = {
-        "Authorization": f"Bearer {token}",
-        "Content-Type": "application/x-www-form-urlencoded"
-    }
+    url = f"{lc.SITE_ROOT}/inbox/{username}"
     data = {"text": message}
-    response = requests.post(url, headers=headers, data=data)
+    response = lc.request("POST", url, token, data=data)
 
     if response.status_code == 200:
         print(f"✅ Message sent to {username}")
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Compile a tournament plan file into the exact list of Swisses to create.
+
+The plan is TOML (``schedule.toml``) or JSON with the same shape::
+
+    [defaults]                      # any key here can be overridden per entry
+    timezone = "Asia/Kolkata"
+    delay_days = 4                  # first day to create, counted from today
+    days = 1                        # consecutive days from there
+    rounds = 7
+    name = "Cash Tournament Qualifier"
+    description_file = "description.txt"
+
+    [[plan]]
+    teams = ["online-world-chess-lovers"]
+    weekdays = ["mon", "wed"]       # optional filter
+    slots = [{ time = "00:20", clock = "10+0" }, ...]
+
+Everything is validated up front and every start time is computed once from
+a single "today" per timezone, with explicit DST handling: a wall time that
+does not exist (spring forward) moves forward by the gap, an ambiguous one
+(fall back) uses its first occurrence.  The result is de-duplicated on the
+same key ``batch_create`` uses, so overlapping entries never create twice.
+
+    python schedule_plan.py schedule.toml [--days 7]   # print the compiled plan
+"""
+
+import argparse
+import datetime as dt
+import json
+import pathlib
+import re
+import sys
+from typing import Dict, List, Optional, Sequence
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from batch_create import CreateJob, job_key
+from duration import DurationModel, find_overlaps
+
+try:
+    import tomllib
+except ImportError:  # Python < 3.11
+    try:
+        import tomli as tomllib
+    except ImportError:
+        tomllib = None
+
+DEFAULT_PLAN = pathlib.Path(__file__).with_name("schedule.toml")
+WEEKDAYS = ("mon", "tue", "wed", "thu", "fri", "sat", "sun")
+DEFAULTS = {
+    "timezone": "UTC",
+    "delay_days": 0,
+    "days": 1,
+    "rounds": 7,
+    "variant": "standard",
+    "rated": True,
+    "name": "",
+    "description": "",
+    "description_file": None,
+    "play_your_games": True,
+    "weekdays": None,
+}
+_TIME = re.compile(r"^([01]?\d|2[0-3]):([0-5]\d)$")
+_CLOCK = re.compile(r"^(\d+(?:\.\d+)?)\+(\d+)$")
+
+
+class PlanError(ValueError):
+    """The plan file is malformed; the message names the offending field."""
+
+
+def load_plan(path) -> Dict:
+    path = pathlib.Path(path)
+    text = path.read_text(encoding="utf-8")
+    if path.suffix == ".json":
+        return json.loads(text)
+    if tomllib is None:
+        raise PlanError(f"{path}: reading TOML needs Python 3.11+ or the tomli package")
+    return tomllib.loads(text)
+
+
+def local_to_utc(day: dt.date, hh: int, mm: int, tz: ZoneInfo) -> dt.datetime:
+    """Wall-clock ``day hh:mm`` in ``tz`` as UTC, resolving DST gaps and folds."""
+    # fold=0 picks the first occurrence of an ambiguous time, and for a time
+    # inside a gap applies the pre-transition offset, which lands after the gap
+    return dt.datetime.combine(day, dt.time(hh, mm), tzinfo=tz).astimezone(dt.timezone.utc)
+
+
+def _clock(value, where: str):
+    m = _CLOCK.match(str(value).strip())
+    if not m:
+        raise PlanError(f"{where}.clock: expected 'minutes+increment', got {value!r}")
+    limit = round(float(m.group(1)) * 60)
+    inc = int(m.group(2))
+    if not 0 <= limit <= 10800 or not 0 <= inc <= 120 or limit + inc == 0:
+        raise PlanError(f"{where}.clock: {value!r} is outside Lichess limits")
+    return limit, inc
+
+
+def _settings(defaults: Dict, entry: Dict, where: str, base_dir: pathlib.Path) -> Dict:
+    s = {**DEFAULTS, **defaults, **{k: v for k, v in entry.items() if k not in ("teams", "slots")}}
+    unknown = set(s) - set(DEFAULTS)
+    if unknown:
+        raise PlanError(f"{where}: unknown key(s) {', '.join(sorted(unknown))}")
+    try:
+        s["tz"] = ZoneInfo(s["timezone"])
+    except (ZoneInfoNotFoundError, ValueError):
+        raise PlanError(f"{where}.timezone: unknown zone {s['timezone']!r}") from None
+    for key, low in (("delay_days", 0), ("days", 1), ("rounds", 3)):
+        if not isinstance(s[key], int) or s[key] < low:
+            raise PlanError(f"{where}.{key}: expected an integer ≥ {low}")
+    if s["rounds"] > 100:
+        raise PlanError(f"{where}.rounds: at most 100")
+    if s["weekdays"] is not None:
+        bad = [d for d in s["weekdays"] if str(d).lower()[:3] not in WEEKDAYS]
+        if bad:
+            raise PlanError(f"{where}.weekdays: unknown day(s) {bad}")
+        s["weekdays"] = {WEEKDAYS.index(str(d).lower()[:3]) for d in s["weekdays"]}
+    if s["description_file"] and not s["description"]:
+        try:
+            s["description"] = (base_dir / s["description_file"]).read_text(encoding="utf-8").strip()
+        except OSError as e:
+            raise PlanError(f"{where}.description_file: {e}") from None
+    return s
+
+
+def payload(name: str, limit: int, inc: int, start_utc: dt.datetime, s: Dict) -> Dict:
+    p = {
+        "name": name,
+        "clock.limit": limit,
+        "clock.increment": inc,
+        "startsAt": start_utc.strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "nbRounds": s["rounds"],
+        "variant": s["variant"],
+        "rated": "true" if s["rated"] else "false",
+        "description": s["description"],
+    }
+    if s["play_your_games"]:
+        p["conditions.playYourGames"] = "true"
+    return p
+
+
+def compile_plan(plan: Dict, *, teams: Optional[Sequence[str]] = None,
+                 days: Optional[int] = None, base_dir: pathlib.Path = pathlib.Path("."),
+                 now: Optional[dt.datetime] = None) -> List[CreateJob]:
+    """Validate ``plan`` and expand it into de-duplicated CreateJobs, soonest first.
+
+    ``teams`` / ``days`` override every entry (command-line overrides).
+    """
+    now = now or dt.datetime.now(dt.timezone.utc)
+    defaults = plan.get("defaults", {})
+    entries = plan.get("plan")
+    if not isinstance(entries, list) or not entries:
+        raise PlanError("plan: at least one [[plan]] entry is required")
+
+    today: Dict[str, dt.date] = {}  # one "today" per timezone for the whole run
+    jobs: Dict[tuple, CreateJob] = {}
+    for i, entry in enumerate(entries):
+        where = f"plan[{i}]"
+        s = _settings(defaults, entry, where, base_dir)
+        if days is not None:
+            s["days"] = days
+        entry_teams = list(teams or entry.get("teams") or [])
+        if not entry_teams or not all(isinstance(t, str) and t for t in entry_teams):
+            raise PlanError(f"{where}.teams: expected a non-empty list of team slugs")
+        slots = entry.get("slots")
+        if not isinstance(slots, list) or not slots:
+            raise PlanError(f"{where}.slots: expected a non-empty list")
+
+        parsed = []
+        for j, slot in enumerate(slots):
+            at = f"{where}.slots[{j}]"
+            m = _TIME.match(str(slot.get("time", "")))
+            if not m:
+                raise PlanError(f"{at}.time: expected HH:MM, got {slot.get('time')!r}")
+            name = slot.get("name", s["name"])
+            if not name or len(name) > 30:
+                raise PlanError(f"{at}.name: 1–30 characters required, got {name!r}")
+            parsed.append((int(m.group(1)), int(m.group(2)), name, *_clock(slot.get("clock"), at)))
+
+        first = today.setdefault(s["timezone"], now.astimezone(s["tz"]).date())
+        for d in range(s["delay_days"], s["delay_days"] + s["days"]):
+            day = first + dt.timedelta(days=d)
+            if s["weekdays"] is not None and day.weekday() not in s["weekdays"]:
+                continue
+            for hh, mm, name, limit, inc in parsed:
+                start = local_to_utc(day, hh, mm, s["tz"])
+                for team in entry_teams:
+                    job = CreateJob(team, payload(name, limit, inc, start, s))
+                    jobs.setdefault(job_key(job), job)
+    return sorted(jobs.values(), key=lambda j: (j.payload["startsAt"], j.team))
+
+
+def compile_file(path=DEFAULT_PLAN, **overrides) -> List[CreateJob]:
+    path = pathlib.Path(path)
+    return compile_plan(load_plan(path), base_dir=path.parent, **overrides)
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Validate a plan file and print its Swisses.")
+    ap.add_argument("plan", nargs="?", default=str(DEFAULT_PLAN))
+    ap.add_argument("--team", action="append", dest="teams")
+    ap.add_argument("--days", type=int)
+    args = ap.parse_args()
+    try:
+        jobs = compile_file(args.plan, teams=args.teams, days=args.days)
+    except (PlanError, OSError, ValueError) as e:
+        sys.exit(f"❌ {e}")
+    for job in jobs:
+        print(f"{job.team:<28} {job.label}")
+    print(f"\n{len(jobs)} tournament(s)")
+
+    for a, b in find_overlaps(jobs, DurationModel.load()):
+        print(f"⚠️ {a.team}: {a.label} is expected to run into {b.label}")
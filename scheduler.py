@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Deadline scheduler for time-critical join / withdraw actions.
+
+Actions sit in a min-heap keyed by their deadline (epoch seconds).  A single
+dispatcher thread sleeps until the earliest deadline, then hands the action
+to a worker pool, so hundreds of pending actions — including several due in
+the same second — fire concurrently and on time.  An optional ``guard`` is
+evaluated right before firing (e.g. to re-check the live Swiss list) and may
+veto the action.  Every firing is recorded with how late it actually ran.
+"""
+
+import heapq
+import itertools
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, List, Optional, Sequence
+
+DEFAULT_WORKERS = 8
+
+
+@dataclass(order=True)
+class Job:
+    deadline: float
+    seq: int
+    name: str = field(compare=False)
+    action: Callable[[], Any] = field(compare=False, repr=False)
+    guard: Optional[Callable[[], bool]] = field(default=None, compare=False, repr=False)
+    cancelled: bool = field(default=False, compare=False)
+
+
+@dataclass(frozen=True)
+class Firing:
+    """What happened to one job: ``lateness`` is start time minus deadline (s)."""
+    name: str
+    deadline: float
+    fired_at: float
+    skipped: bool = False
+    result: Any = None
+    error: Optional[str] = None
+
+    @property
+    def lateness(self) -> float:
+        return self.fired_at - self.deadline
+
+
+class DeadlineScheduler:
+    """Fire callables at absolute deadlines measured on ``clock``."""
+
+    def __init__(self, workers: int = DEFAULT_WORKERS,
+                 clock: Callable[[], float] = time.time):
+        self.clock = clock
+        self.firings: List[Firing] = []
+        self._heap: List[Job] = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="deadline")
+        self._inflight = 0
+        self._stopped = False
+        self._thread = threading.Thread(target=self._dispatch, name="deadline-dispatch",
+                                        daemon=True)
+        self._thread.start()
+
+    # ───────── public API ───────── #
+
+    def schedule(self, deadline: float, name: str, action: Callable[[], Any],
+                 guard: Optional[Callable[[], bool]] = None) -> Job:
+        job = Job(deadline, next(self._seq), name, action, guard)
+        with self._cond:
+            heapq.heappush(self._heap, job)
+            self._cond.notify_all()
+        return job
+
+    def cancel(self, job: Job):
+        with self._cond:
+            job.cancelled = True
+            self._cond.notify_all()
+
+    def pending(self) -> int:
+        with self._cond:
+            return sum(not j.cancelled for j in self._heap) + self._inflight
+
+    def join(self, timeout: Optional[float] = None) -> bool:
+        """Block until every scheduled job has fired (or ``timeout`` elapsed)."""
+        end = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._heap or self._inflight:
+                remaining = None if end is None else end - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def shutdown(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        self._thread.join()
+        self._pool.shutdown(wait=True)
+
+    # ───────── internals ───────── #
+
+    def _dispatch(self):
+        with self._cond:
+            while not self._stopped:
+                while self._heap and self._heap[0].cancelled:
+                    heapq.heappop(self._heap)
+                    self._cond.notify_all()
+                if not self._heap:
+                    self._cond.wait()
+                    continue
+                delay = self._heap[0].deadline - self.clock()
+                if delay > 0:
+                    # re-evaluate at least every 30 s in case the clock is adjusted
+                    self._cond.wait(min(delay, 30.0))
+                    continue
+                job = heapq.heappop(self._heap)
+                self._inflight += 1
+                self._pool.submit(self._fire, job)
+
+    def _fire(self, job: Job):
+        skipped, result, error, fired_at = False, None, None, None
+        try:
+            if job.guard is not None and not job.guard():
+                skipped = True
+            else:
+                fired_at = self.clock()
+                result = job.action()
+        except Exception as e:  # a failing action must not kill the worker
+            error = f"{type(e).__name__}: {e}"
+            logging.exception("Scheduled job %s failed", job.name)
+        if fired_at is None:
+            fired_at = self.clock()
+        firing = Firing(job.name, job.deadline, fired_at, skipped, result, error)
+        with self._cond:
+            self.firings.append(firing)
+            self._inflight -= 1
+            self._cond.notify_all()
+
+
+def arm(sched: DeadlineScheduler, deadline: float, name: str, action: Callable[[], Any],
+        ladder: Sequence[float] = (0.0,), guard: Optional[Callable[[], bool]] = None,
+        succeeded: Callable[[Any], bool] = bool) -> Job:
+    """Arm a one-shot action with a retry ladder.
+
+    ``ladder`` holds offsets (s) from ``deadline``; the first rung fires the
+    action and each later rung fires only if the previous attempt's result
+    did not satisfy ``succeeded``.
+    """
+    rungs = sorted(ladder)
+
+    def attempt(i: int) -> Callable[[], Any]:
+        def run():
+            result = action()
+            if not succeeded(result) and i + 1 < len(rungs):
+                sched.schedule(deadline + rungs[i + 1], f"{name}#retry{i + 1}",
+                               attempt(i + 1), guard)
+            return result
+        return run
+
+    return sched.schedule(deadline + rungs[0], name, attempt(0), guard)
+
+
+def lateness_report(firings: List[Firing], slo_ms: Optional[float] = None) -> str:
+    """One-line summary: how many fired, skipped, mean / max lateness and SLO hits."""
+    fired = [f for f in firings if not f.skipped]
+    if not fired:
+        return f"0 fired, {len(firings)} skipped"
+    late_ms = sorted(abs(f.lateness) * 1000 for f in fired)
+    mean = sum(late_ms) / len(late_ms)
+    line = (f"{len(fired)} fired, {len(firings) - len(fired)} skipped, "
+            f"lateness mean {mean:.0f} ms / max {late_ms[-1]:.0f} ms")
+    if slo_ms is not None:
+        within = sum(ms <= slo_ms for ms in late_ms)
+        line += f", {within}/{len(late_ms)} within {slo_ms:.0f} ms SLO"
+    return line
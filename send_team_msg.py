@@ -4,42 +4,46 @@ Broadcast “Hi guys” to the Lichess team `testingsboy`.
 Requires a secret LICHESS_KEY holding a token with team:write scope.
 """
 
-import os, sys, textwrap, requests
+import os, sys, textwrap
 
-token = os.getenv("LICHESS_KEY", "").strip('"').strip("'")
-if not token:
-    sys.exit("❌  LICHESS_KEY is missing!")
+import lichess_client as lc
+from token_registry import TokenRegistry
 
 TEAM_ID = "testingsboy"
 MESSAGE = "Hi guys"
 
-# ── sanity-check the token ────────────────────────────────────────────
-acct = requests.get(
-    "https://lichess.org/api/account",
-    headers={"Authorization": f"Bearer {token}"},
-    timeout=10,
-)
-print("Account check HTTP:", acct.status_code)
-if acct.status_code != 200:
-    sys.exit("❌  Token invalid or lacks team:write")
-
-# ── send the team-wide PM ─────────────────────────────────────────────
-url = f"https://lichess.org/team/{TEAM_ID}/pm-all"          # ← no /api/
-headers = {
-    "Authorization": f"Bearer {token}",
-    "Content-Type": "application/x-www-form-urlencoded",
-}
-
-resp = requests.post(url, headers=headers, data={"message": MESSAGE}, timeout=10)
-
-# ── report result ─────────────────────────────────────────────────────
-if resp.status_code in (200, 204):
-    print("✅  Team message sent successfully.")
-else:
-    print(textwrap.dedent(f"""
-        ❌  Failed to send message.
-        HTTP {resp.status_code}
-        First 500 bytes:
-        {resp.text[:500]}
-    """))
-    resp.raise_for_status()
+
+def send_team_message(token, team_id=TEAM_ID, message=MESSAGE):
+    # ── sanity-check the token (cached identity, scopes checked once) ────
+    identity = TokenRegistry().resolve([token], required_scopes=["team:write"]).get(token)
+    if identity is None:
+        sys.exit("❌  Token invalid or lacks team:write")
+    print("Account check OK:", identity.username)
+
+    # ── send the team-wide PM ─────────────────────────────────────────────
+    url = f"{lc.SITE_ROOT}/team/{team_id}/pm-all"          # ← no /api/
+
+    resp = lc.request("POST", url, token, data={"message": message}, timeout=10)
+
+    # ── report result ─────────────────────────────────────────────────────
+    if resp.status_code in (200, 204):
+        print("✅  Team message sent successfully.")
+    else:
+        print(textwrap.dedent(f"""
+            ❌  Failed to send message.
+            HTTP {resp.status_code}
+            First 500 bytes:
+            {resp.text[:500]}
+        """))
+        resp.raise_for_status()
+
+
+def main(team_id=TEAM_ID, message=MESSAGE):
+    token = lc.clean_token(os.getenv("LICHESS_KEY"))
+    if not token:
+        sys.exit("❌  LICHESS_KEY is missing!")
+    send_team_message(token, team_id, message)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Small embedded state store (SQLite) so one-shot Actions runs are incremental.
+
+It remembers which Swisses this repo created, every join / withdraw outcome
+per account, and the last-seen team list, so a run only sends the requests
+that are still needed.  Accounts are keyed by a hash of their token — the
+token itself is never written to disk.
+
+The database lives at ``$STATE_DB`` (default ``.state/lichess.db``), which the
+workflows keep between runs with ``actions/cache``.  It can also be moved as
+plain JSON:
+
+    python state_store.py export state.json
+    python state_store.py import state.json
+"""
+
+import hashlib
+import json
+import os
+import pathlib
+import sqlite3
+import sys
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import lichess_client as lc
+
+DEFAULT_PATH = os.environ.get("STATE_DB", ".state/lichess.db")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS created (
+    team TEXT, starts_at TEXT, clock_limit INTEGER, clock_increment INTEGER, name TEXT,
+    swiss_id TEXT, url TEXT, created_at REAL,
+    PRIMARY KEY (team, starts_at, clock_limit, clock_increment, name)
+);
+CREATE TABLE IF NOT EXISTS actions (
+    account TEXT, swiss_id TEXT, action TEXT,
+    outcome TEXT, status_code INTEGER, at REAL,
+    PRIMARY KEY (account, swiss_id, action)
+);
+CREATE TABLE IF NOT EXISTS snapshots (
+    team TEXT PRIMARY KEY, taken_at REAL, payload TEXT
+);
+"""
+_TABLES = ("created", "actions", "snapshots")
+
+
+def account_key(token: str) -> str:
+    """Stable, non-reversible id for a token."""
+    return hashlib.sha256(token.encode()).hexdigest()[:16]
+
+
+class StateStore:
+    """Thread-safe wrapper around one SQLite file."""
+
+    def __init__(self, path: str = DEFAULT_PATH):
+        self.path = path
+        if path != ":memory:":
+            pathlib.Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.executescript(_SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        with self._lock:
+            self._db.commit()
+            self._db.close()
+
+    def _exec(self, sql: str, args: Tuple = ()) -> List[Tuple]:
+        with self._lock, self._db:
+            return self._db.execute(sql, args).fetchall()
+
+    # ───────── created tournaments ───────── #
+
+    def record_created(self, key: Tuple, swiss_id: str, url: str = ""):
+        """``key`` is batch_create.job_key(): (team, startsAt, limit, increment, name)."""
+        self._exec("INSERT OR REPLACE INTO created VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                   (*key, swiss_id, url, time.time()))
+
+    def created_keys(self) -> Set[Tuple]:
+        return set(self._exec("SELECT team, starts_at, clock_limit, clock_increment, name "
+                              "FROM created"))
+
+    # ───────── join / withdraw outcomes ───────── #
+
+    def record_action(self, token: str, action: str, result: lc.Result):
+        self._exec("INSERT OR REPLACE INTO actions VALUES (?, ?, ?, ?, ?, ?)",
+                   (account_key(token), result.target, action, result.outcome,
+                    result.status_code, time.time()))
+
+    def done(self, token: str, action: str) -> Set[str]:
+        """Swiss ids on which ``action`` already succeeded (or was a no-op) for this token."""
+        rows = self._exec("SELECT swiss_id FROM actions WHERE account = ? AND action = ? "
+                          "AND outcome IN (?, ?)",
+                          (account_key(token), action, lc.OK, lc.ALREADY))
+        return {r[0] for r in rows}
+
+    # ───────── list snapshots ───────── #
+
+    def save_snapshot(self, team: str, swisses: Iterable[lc.Swiss]) -> Set[str]:
+        """Store the list and return ids that were not in the previous snapshot."""
+        ids = {s.id: s.starts_ms for s in swisses}
+        previous = self.last_snapshot(team)
+        self._exec("INSERT OR REPLACE INTO snapshots VALUES (?, ?, ?)",
+                   (team, time.time(), json.dumps(ids)))
+        return set(ids) - set(previous)
+
+    def last_snapshot(self, team: str) -> Dict[str, int]:
+        rows = self._exec("SELECT payload FROM snapshots WHERE team = ?", (team,))
+        return json.loads(rows[0][0]) if rows else {}
+
+    # ───────── housekeeping ───────── #
+
+    def prune(self, older_than_days: float = 30):
+        cutoff = time.time() - older_than_days * 86400
+        self._exec("DELETE FROM actions WHERE at < ?", (cutoff,))
+        self._exec("DELETE FROM created WHERE created_at < ?", (cutoff,))
+
+    def export_json(self) -> Dict[str, List[List]]:
+        return {t: [list(r) for r in self._exec(f"SELECT * FROM {t}")] for t in _TABLES}
+
+    def import_json(self, data: Dict[str, List[List]]):
+        for table in _TABLES:
+            for row in data.get(table, []):
+                marks = ", ".join("?" * len(row))
+                self._exec(f"INSERT OR REPLACE INTO {table} VALUES ({marks})", tuple(row))
+
+
+def open_store(path: Optional[str] = None) -> StateStore:
+    return StateStore(path or DEFAULT_PATH)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3 or sys.argv[1] not in ("export", "import"):
+        sys.exit("Usage: python state_store.py export|import <file.json>")
+    cmd, file = sys.argv[1:]
+    with open_store() as store:
+        if cmd == "export":
+            pathlib.Path(file).write_text(json.dumps(store.export_json()), encoding="utf-8")
+        else:
+            store.import_json(json.loads(pathlib.Path(file).read_text(encoding="utf-8")))
+    print(f"✅ {cmd}ed {DEFAULT_PATH} {'→' if cmd == 'export' else '←'} {file}")
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+Local index of a team's members, synced from ``/api/team/{id}/users``.
+
+The members stream is ordered by join date, newest first, so a sync only
+reads until it reaches members already known (``joinedTeamAt`` at or below
+the stored watermark) and then closes the connection.  Leaving the team does
+not show up in that stream, so every ``ROSTER_FULL_HOURS`` (default 24) the
+whole list is read again and replaces the local copy; callers that learn of
+a departure themselves (a kick, a 404) call ``discard()``.
+
+Members are kept in SQLite at ``$ROSTER_DB`` (default ``.state/roster.db``,
+next to the state store so the workflows' cache keeps it) and loaded into a
+dict on open, so membership, join-date and count queries never touch the
+network or the disk:
+
+    python team_roster.py sync chess-blasters-2 [--full]
+    python team_roster.py check chess-blasters-2 alice bob
+    python team_roster.py count chess-blasters-2 [--days 7]
+"""
+
+import argparse
+import bisect
+import os
+import pathlib
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import lichess_client as lc
+
+DEFAULT_PATH = os.environ.get("ROSTER_DB", ".state/roster.db")
+FULL_EVERY = float(os.environ.get("ROSTER_FULL_HOURS", "24")) * 3600
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS members (
+    team TEXT, id TEXT, name TEXT, joined_at INTEGER,
+    PRIMARY KEY (team, id)
+);
+CREATE INDEX IF NOT EXISTS members_joined ON members (team, joined_at);
+CREATE TABLE IF NOT EXISTS syncs (
+    team TEXT PRIMARY KEY, full_at REAL, synced_at REAL
+);
+"""
+
+
+@dataclass
+class SyncStats:
+    full: bool
+    read: int = 0
+    added: int = 0
+    removed: int = 0
+    seconds: float = 0.0
+
+    def __str__(self) -> str:
+        kind = "full" if self.full else "incremental"
+        return (f"{kind} sync: read {self.read}, +{self.added} −{self.removed} "
+                f"in {self.seconds:.2f}s")
+
+
+def iter_members(team_id: str, token: Optional[str] = None) -> Iterator[Tuple[str, str, int]]:
+    """Yield ``(id, name, joined_ms)`` from the members stream, newest first."""
+    with lc.request("GET", f"team/{team_id}/users", token, accept="application/x-ndjson",
+                    stream=True, timeout=60) as res:
+        res.raise_for_status()
+        for obj in lc.iter_ndjson(res):
+            if "id" in obj:
+                yield (obj["id"].lower(), obj.get("name", obj["id"]),
+                       lc.parse_starts_at(obj.get("joinedTeamAt")) or 0)
+
+
+class Roster:
+    """One team's members: SQLite on disk, a dict in memory."""
+
+    def __init__(self, team: str, path: str = DEFAULT_PATH):
+        self.team, self.path = team, path
+        if path != ":memory:":
+            pathlib.Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.executescript(_SCHEMA)
+        self._joined: Dict[str, int] = dict(self._db.execute(
+            "SELECT id, joined_at FROM members WHERE team = ?", (team,)))
+        row = self._db.execute("SELECT full_at, synced_at FROM syncs WHERE team = ?",
+                               (team,)).fetchone()
+        self.full_at, self.synced_at = row or (0.0, 0.0)
+        self._sorted: Optional[List[int]] = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        with self._lock:
+            self._db.commit()
+            self._db.close()
+
+    # ───────── queries ───────── #
+
+    def __contains__(self, username: str) -> bool:
+        return username.lower() in self._joined
+
+    def __len__(self) -> int:
+        return len(self._joined)
+
+    def is_member(self, username: str) -> bool:
+        return username.lower() in self._joined
+
+    def joined_at(self, username: str) -> Optional[int]:
+        """Epoch ms the user joined, or None if not a member."""
+        return self._joined.get(username.lower())
+
+    def count(self, joined_after: Optional[int] = None) -> int:
+        """Members, or only those who joined after ``joined_after`` (epoch ms)."""
+        if joined_after is None:
+            return len(self._joined)
+        if self._sorted is None:
+            self._sorted = sorted(self._joined.values())
+        return len(self._sorted) - bisect.bisect_right(self._sorted, joined_after)
+
+    @property
+    def watermark(self) -> int:
+        return max(self._joined.values(), default=0)
+
+    # ───────── updates ───────── #
+
+    def discard(self, username: str):
+        """Forget a member we know has left (kicked, or a 404 from the API)."""
+        key = username.lower()
+        with self._lock, self._db:
+            if self._joined.pop(key, None) is not None:
+                self._sorted = None
+                self._db.execute("DELETE FROM members WHERE team = ? AND id = ?",
+                                 (self.team, key))
+
+    def sync(self, token: Optional[str] = None, full: Optional[bool] = None) -> SyncStats:
+        """Bring the index up to date; ``full`` defaults to "if the last full sync is stale"."""
+        t0 = time.perf_counter()
+        if full is None:
+            full = time.time() - self.full_at >= FULL_EVERY
+        stats = SyncStats(full)
+        if full:
+            rows = list(iter_members(self.team, token))
+            stats.read = len(rows)
+            fresh = {r[0]: r[2] for r in rows}
+            stats.added = len(fresh.keys() - self._joined.keys())
+            stats.removed = len(self._joined.keys() - fresh.keys())
+            self._store(rows, replace=True)
+            self._joined = fresh
+        else:
+            rows = list(self._newer_than(iter_members(self.team, token), self.watermark))
+            stats.read = len(rows)
+            stats.added = sum(r[0] not in self._joined for r in rows)
+            self._store(rows, replace=False)
+            self._joined.update((r[0], r[2]) for r in rows)
+        self._sorted = None
+        stats.seconds = time.perf_counter() - t0
+        return stats
+
+    @staticmethod
+    def _newer_than(rows: Iterable[Tuple[str, str, int]], watermark: int):
+        for row in rows:
+            # ties at the watermark are re-read: two members can join in the same ms
+            if row[2] < watermark:
+                return  # closing the generator closes the stream
+            yield row
+
+    def _store(self, rows: List[Tuple[str, str, int]], replace: bool):
+        now = time.time()
+        with self._lock, self._db:
+            if replace:
+                self._db.execute("DELETE FROM members WHERE team = ?", (self.team,))
+                self.full_at = now
+            self._db.executemany("INSERT OR REPLACE INTO members VALUES (?, ?, ?, ?)",
+                                 ((self.team, *r) for r in rows))
+            self.synced_at = now
+            self._db.execute("INSERT OR REPLACE INTO syncs VALUES (?, ?, ?)",
+                             (self.team, self.full_at, self.synced_at))
+
+
+def open_roster(team: str, path: Optional[str] = None) -> Roster:
+    return Roster(team, path or DEFAULT_PATH)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Sync and query the local team roster index.")
+    ap.add_argument("action", choices=["sync", "check", "count"])
+    ap.add_argument("team")
+    ap.add_argument("names", nargs="*", help="usernames to look up (check)")
+    ap.add_argument("--full", action="store_true", help="re-read the whole member list")
+    ap.add_argument("--days", type=float, help="count only members who joined in the last N days")
+    ap.add_argument("--db", default=DEFAULT_PATH)
+    args = ap.parse_args(argv)
+
+    token = lc.clean_token(os.environ.get("LICHESS_KEY") or os.environ.get("BR")) or None
+    with open_roster(args.team, args.db) as roster:
+        if args.action == "sync":
+            print(f"👥 {roster.sync(token, True if args.full else None)}; "
+                  f"{len(roster)} members in {args.team}")
+        elif args.action == "check":
+            for name in args.names:
+                at = roster.joined_at(name)
+                print(f"{name}\t" + (f"member since {lc.epoch_ms_to_iso(at)}" if at is not None
+                                     else "not a member"))
+        else:
+            since = (int((time.time() - args.days * 86400) * 1000)
+                     if args.days is not None else None)
+            print(roster.count(since))
+
+
+if __name__ == "__main__":
+    main()
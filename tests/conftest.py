@@ -0,0 +1,5 @@
+import pathlib
+import sys
+
+# the scripts are flat top-level modules; make them importable from tests/
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
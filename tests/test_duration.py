@@ -0,0 +1,57 @@
+import math
+
+import pytest
+
+from duration import DAY_SEC, DurationModel, pack_day
+
+MODEL = DurationModel(usage=0.6, gap=30, slack=300)
+GRID = 300
+
+
+def occupied(clock, rounds=7):
+    return math.ceil(MODEL.budget(*clock, rounds) / GRID) * GRID
+
+
+def assert_no_overlap(plan, first_start):
+    # the plan repeats daily, so the last event must end before the next day's first
+    spans = [((start - first_start) % DAY_SEC, occupied((limit, inc)))
+             for start, limit, inc in plan]
+    spans.sort()
+    for (a, length), (b, _) in zip(spans, spans[1:]):
+        assert a + length <= b
+    last, length = spans[-1]
+    assert last + length <= DAY_SEC
+
+
+def test_pack_day_fills_the_day_without_overlap():
+    clocks = [(180, 2), (300, 3), (600, 0)]
+    plan = pack_day(clocks, 7, MODEL, first_start=20 * 60, grid=GRID)
+    assert_no_overlap(plan, 20 * 60)
+    assert all(start % GRID == (20 * 60) % GRID for start, _, _ in plan)
+    counts = {c: sum((limit, inc) == c for _, limit, inc in plan) for c in clocks}
+    assert all(n >= 1 for n in counts.values())
+    # no further event of any clock would still fit
+    used = sum(occupied((limit, inc)) for _, limit, inc in plan)
+    assert used + min(occupied(c) for c in clocks) > DAY_SEC
+
+
+def test_pack_day_prefers_the_shortest_clock():
+    plan = pack_day([(60, 0), (600, 5)], 7, MODEL, grid=GRID)
+    short = sum(limit == 60 for _, limit, _ in plan)
+    assert short > len(plan) - short
+
+
+def test_pack_day_respects_maximum_and_spreads_equal_clocks():
+    plan = pack_day([(180, 2), (300, 0)], 7, MODEL, grid=GRID, maximum=3)
+    assert len(plan) == 6
+    clocks = [(limit, inc) for _, limit, inc in plan]
+    assert all(a != b for a, b in zip(clocks, clocks[1:]))
+
+
+def test_pack_day_rejects_a_minimum_that_needs_more_than_a_day():
+    with pytest.raises(ValueError, match="more than a day"):
+        pack_day([(3600, 30)], 11, MODEL, minimum=20)
+
+
+def test_pack_day_of_nothing_is_empty():
+    assert pack_day([], 7, MODEL) == []
@@ -0,0 +1,118 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+import lichess_client as lc  # noqa: E402
+import leaderboard  # noqa: E402
+from leaderboard import ResultsStore  # noqa: E402
+
+HOUR = 3_600_000
+
+
+def swiss(n):
+    return lc.Swiss(f"ev{n}", leaderboard.QUALIFIER, n * 24 * HOUR, "finished")
+
+
+def row(rank, username, points, tiebreak, performance=None):
+    r = {"rank": rank, "username": username, "points": points, "tieBreak": tiebreak,
+         "rating": 1500}
+    if performance is not None:
+        r["performance"] = performance
+    return r
+
+
+RESULTS = {
+    "ev1": [row(1, "alice", 6.0, 20.5, 1900), row(2, "bob", 5.0, 18.0, 1750),
+            row(3, "carol", 4.5, 17.0)],
+    "ev2": [row(1, "Bob", 5.5, 19.0, 1800), row(2, "alice", 4.5, 16.0, 1700),
+            row(3, "dave", 4.5, 16.0, 1650)],          # dave plays only here
+    "ev3": [row(1, "carol", 6.5, 21.0), row(2, "erin", 4.0, 12.0),
+            row(3, "bob", 0.0, 0.0)],
+}
+EVENTS = [swiss(1), swiss(2), swiss(3)]
+
+
+@pytest.fixture
+def fake_api(monkeypatch):
+    calls = []
+
+    def finished(team_id, token=None, max=None, name=leaderboard.QUALIFIER, since_ms=None):
+        calls.append(since_ms)
+        return [s for s in reversed(EVENTS) if since_ms is None or s.starts_ms >= since_ms]
+
+    monkeypatch.setattr(leaderboard, "finished_qualifiers", finished)
+    monkeypatch.setattr(leaderboard, "iter_results", lambda swiss_id, token=None:
+                        iter(RESULTS[swiss_id]))
+    return calls
+
+
+def as_table(board):
+    return [(p.lower(), round(float(pt), 3), round(float(tb), 3), int(ev), int(w), int(b),
+             None if np.isnan(pf) else round(float(pf), 3))
+            for p, pt, tb, ev, w, b, pf in zip(board.players, board.points, board.tiebreak,
+                                               board.events, board.wins, board.best_rank,
+                                               board.performance)]
+
+
+def full_rebuild():
+    store = ResultsStore()
+    for s in EVENTS:
+        store.add_event(s, RESULTS[s.id])
+    store.rebuild_totals()
+    return store
+
+
+def test_incremental_refresh_matches_full_rebuild(fake_api, tmp_path):
+    path = str(tmp_path / "q.npz")
+    store = ResultsStore()
+    store.ingest([EVENTS[0]], workers=1)
+    store.save(path)
+
+    store = ResultsStore.load(path)
+    assert leaderboard.refresh(store, "team", lookback=0) == 2
+    assert fake_api == [EVENTS[0].starts_ms]       # started from the watermark
+    store.save(path)
+    store = ResultsStore.load(path)
+    assert leaderboard.refresh(store, "team", lookback=0) == 0  # nothing new
+
+    assert as_table(store.leaderboard()) == as_table(full_rebuild().leaderboard())
+
+
+
+def test_standings_ties_and_single_event_players():
+    # bob and alice tie on points and are ordered by tiebreak; "Bob" is the same
+    # player as "bob"; dave and erin played a single event each
+    assert as_table(full_rebuild().leaderboard()) == [
+        ("carol", 11.0, 38.0, 2, 1, 1, None),
+        ("bob", 10.5, 37.0, 3, 1, 1, 1775.0),
+        ("alice", 10.5, 36.5, 2, 1, 1, 1800.0),
+        ("dave", 4.5, 16.0, 1, 0, 3, 1650.0),
+        ("erin", 4.0, 12.0, 1, 0, 2, None),
+    ]
+
+
+def test_add_event_stores_interned_columns():
+    store = ResultsStore()
+    store.add_event(EVENTS[0], RESULTS["ev1"])
+    store.add_event(EVENTS[1], RESULTS["ev2"] + [{"rank": 4, "points": 1.0}])  # no username
+    store.add_event(EVENTS[0], RESULTS["ev1"])                                 # already stored
+
+    assert store.rows == 6
+    assert store.events == ["ev1", "ev2"]
+    assert store.players == ["alice", "bob", "carol", "dave"]  # "Bob" is bob
+    cols = store.columns
+    assert {name: cols[name].dtype for name in cols} == {
+        name: np.dtype(dtype) for name, dtype in leaderboard.COLUMNS.items()}
+    assert cols["event"].tolist() == [0, 0, 0, 1, 1, 1]
+    assert cols["player"].tolist() == [0, 1, 2, 1, 0, 3]
+    assert cols["rank"].tolist() == [1, 2, 3, 1, 2, 3]
+    assert cols["points"].tolist() == [6.0, 5.0, 4.5, 5.5, 4.5, 4.5]
+    assert cols["performance"].tolist() == [1900, 1750, 0, 1800, 1700, 1650]
+
+
+def test_incremental_totals_match_rebuild():
+    store = ResultsStore()
+    for s in EVENTS:
+        store.add_event(s, RESULTS[s.id])
+        store.leaderboard()  # totals merged one event at a time
+    assert as_table(store.leaderboard()) == as_table(full_rebuild().leaderboard())
@@ -0,0 +1,65 @@
+import datetime as dt
+
+import pytest
+
+from schedule_plan import PlanError, compile_plan
+
+NY = "America/New_York"
+
+
+def plan(*times, **defaults):
+    return {"defaults": {"timezone": NY, "name": "Qualifier", **defaults},
+            "plan": [{"teams": ["t"], "slots": [{"time": t, "clock": "3+2"} for t in times]}]}
+
+
+def starts(jobs):
+    return [j.payload["startsAt"] for j in jobs]
+
+
+def at(y, m, d, h=12):
+    return dt.datetime(y, m, d, h, tzinfo=dt.timezone.utc)
+
+
+def test_ordinary_day_uses_local_offset():
+    jobs = compile_plan(plan("09:10"), now=at(2026, 1, 15))
+    assert starts(jobs) == ["2026-01-15T14:10:00Z"]
+
+
+def test_spring_forward_gap_moves_past_the_gap():
+    # 2026-03-08: clocks jump 02:00 EST → 03:00 EDT; 02:30 does not exist
+    jobs = compile_plan(plan("01:30", "02:30", "04:00"), now=at(2026, 3, 8))
+    assert starts(jobs) == ["2026-03-08T06:30:00Z",   # 01:30 EST
+                            "2026-03-08T07:30:00Z",   # 02:30 → 03:30 EDT
+                            "2026-03-08T08:00:00Z"]   # 04:00 EDT
+
+
+def test_spring_forward_gap_slot_deduplicates_with_its_image():
+    # 02:30 lands on 03:30 EDT, so both slots are the same Swiss
+    jobs = compile_plan(plan("02:30", "03:30"), now=at(2026, 3, 8))
+    assert starts(jobs) == ["2026-03-08T07:30:00Z"]
+
+
+def test_fall_back_ambiguous_time_uses_first_occurrence():
+    # 2026-11-01: clocks fall back 02:00 EDT → 01:00 EST; 01:30 happens twice
+    jobs = compile_plan(plan("00:30", "01:30", "02:30"), now=at(2026, 11, 1))
+    assert starts(jobs) == ["2026-11-01T04:30:00Z",   # 00:30 EDT
+                            "2026-11-01T05:30:00Z",   # first 01:30, still EDT
+                            "2026-11-01T07:30:00Z"]   # 02:30 EST
+
+
+def test_days_span_a_transition_keep_wall_time():
+    jobs = compile_plan(plan("09:10", days=3), now=at(2026, 3, 7))
+    assert starts(jobs) == ["2026-03-07T14:10:00Z",
+                            "2026-03-08T13:10:00Z",
+                            "2026-03-09T13:10:00Z"]
+
+
+def test_today_is_taken_in_the_plan_timezone():
+    # 02:00 UTC on the 8th is still the 7th in New York
+    jobs = compile_plan(plan("09:10"), now=at(2026, 3, 8, 2))
+    assert starts(jobs) == ["2026-03-07T14:10:00Z"]
+
+
+def test_invalid_time_is_reported_with_its_field():
+    with pytest.raises(PlanError, match=r"plan\[0\]\.slots\[0\]\.time"):
+        compile_plan(plan("24:00"), now=at(2026, 1, 15))
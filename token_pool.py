@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+One place to discover tokens and to spread read traffic across them.
+
+Sources (any subset, in order):
+
+* named variables — ``LICHESS_KEY``, ``LICHESS_KEYS``, ``T``, ``L``, ``BR``, ``TOR`` …
+* names ending in ``#`` — ``TOKEN#`` matches TOKEN, TOKEN1, TOKEN2, … but not
+  TOKEN_FILE
+* prefixes ending in ``*`` match every variable starting with them, settings
+  included, so ``#`` is usually what you want
+
+A value may hold several tokens separated by commas or whitespace; quotes are
+stripped and duplicates dropped.
+
+``TokenPool`` tracks per-token health — requests, failures, an exponentially
+weighted error rate that also fades with wall-clock time (half-life
+``ERROR_HALF_LIFE``), so a token sidelined by a burst of errors comes back
+without having to be used, and a cool-down after 429s — and ``pool.read(fn)`` sends
+read-only calls (like the team Swiss list) through the healthiest token with
+the most rate budget left, instead of always through ``tokens[0]``.
+"""
+
+import itertools
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Optional, TypeVar
+
+import requests
+
+import lichess_client as lc
+import rate_governor
+from state_store import account_key
+
+ALL_SOURCES = ("LICHESS_KEY", "LICHESS_KEYS", "T", "L", "BR", "TOR", "L_TOKEN", "T_TOKEN", "TOKEN#")
+EWMA_ALPHA = 0.2
+UNHEALTHY_ERROR_RATE = 0.5
+ERROR_HALF_LIFE = 300.0  # seconds for an idle token's error rate to halve
+DEFAULT_COOLDOWN = 60.0
+
+R = TypeVar("R")
+
+
+def _numbered(base: str, name: str) -> bool:
+    """``name`` is ``base`` or ``base`` followed by digits only."""
+    return name.startswith(base) and (name == base or name[len(base):].isdigit())
+
+
+def load_tokens(*sources: str, environ=None) -> List[str]:
+    """Collect tokens from the given env names / ``PREFIX*`` patterns."""
+    environ = os.environ if environ is None else environ
+    found = []
+    for src in sources or ALL_SOURCES:
+        if src.endswith("*"):
+            values = [v for k, v in sorted(environ.items()) if k.startswith(src[:-1])]
+        elif src.endswith("#"):
+            values = [v for k, v in sorted(environ.items()) if _numbered(src[:-1], k)]
+        else:
+            values = [environ.get(src, "")]
+        for value in values:
+            found.extend(lc.clean_token(p) for p in re.split(r"[,\s]+", value or ""))
+    return list(dict.fromkeys(t for t in found if t))
+
+
+@dataclass
+class TokenHealth:
+    requests: int = 0
+    failures: int = 0
+    rate_limited: int = 0
+    error_rate: float = 0.0          # EWMA of failures, as of ``updated_at``
+    cooldown_until: float = 0.0
+    inflight: int = 0
+    updated_at: float = 0.0
+
+    def current_error_rate(self, now: Optional[float] = None) -> float:
+        """``error_rate`` decayed for the time since the last outcome."""
+        now = time.time() if now is None else now
+        return self.error_rate * 0.5 ** (max(0.0, now - self.updated_at) / ERROR_HALF_LIFE)
+
+    @property
+    def healthy(self) -> bool:
+        now = time.time()
+        return now >= self.cooldown_until and self.current_error_rate(now) < UNHEALTHY_ERROR_RATE
+
+
+class TokenPool:
+    def __init__(self, tokens: Iterable[str]):
+        self.tokens = list(dict.fromkeys(tokens))
+        self.health: Dict[str, TokenHealth] = {t: TokenHealth() for t in self.tokens}
+        self._lock = threading.Lock()
+        self._rr = itertools.count()
+
+    @classmethod
+    def from_env(cls, *sources: str) -> "TokenPool":
+        return cls(load_tokens(*sources))
+
+    def __len__(self) -> int:
+        return len(self.tokens)
+
+    def __iter__(self):
+        return iter(self.tokens)
+
+    # ───────── selection ───────── #
+
+    def pick(self) -> Optional[str]:
+        """Healthiest token with the most governor budget; round-robin on ties."""
+        if not self.tokens:
+            return None
+        gov = rate_governor.governor()
+        with self._lock:
+            start = next(self._rr)
+            order = self.tokens[start % len(self.tokens):] + self.tokens[:start % len(self.tokens)]
+            healthy = [t for t in order if self.health[t].healthy] or order
+        budget = {t: gov.available(t) if gov is not None else 0.0 for t in healthy}
+        with self._lock:
+            best = max(healthy, key=lambda t: (budget[t] - self.health[t].inflight,
+                                               -self.health[t].current_error_rate()))
+            self.health[best].inflight += 1
+        return best
+
+    def record(self, token: str, status: Optional[int], retry_after: float = DEFAULT_COOLDOWN):
+        """Feed one outcome back; ``status`` None means no response at all."""
+        with self._lock:
+            h = self.health.setdefault(token, TokenHealth())
+            h.requests += 1
+            h.inflight = max(0, h.inflight - 1)
+            failed = status is None or status == 429 or status >= 500 or status == 401
+            h.failures += failed
+            now = time.time()
+            h.error_rate = (1 - EWMA_ALPHA) * h.current_error_rate(now) + EWMA_ALPHA * failed
+            h.updated_at = now
+            if status == 429:
+                h.rate_limited += 1
+                h.cooldown_until = time.time() + retry_after
+            elif status == 401:
+                h.cooldown_until = float("inf")  # revoked; never pick again
+
+    def release(self, token: str):
+        """Give back a picked slot without recording an outcome."""
+        with self._lock:
+            h = self.health.get(token)
+            if h is not None:
+                h.inflight = max(0, h.inflight - 1)
+
+    def read(self, fn: Callable[[Optional[str]], R], attempts: int = 2) -> R:
+        """Run a read-only call on the best token, failing over once on errors."""
+        last_exc: Optional[Exception] = None
+        for _ in range(max(1, attempts)):
+            token = self.pick()
+            recorded = False
+            try:
+                result = fn(token)
+                if token is not None:
+                    self.record(token, 200)
+                    recorded = True
+                return result
+            except requests.HTTPError as e:
+                resp = e.response
+                if token is not None:
+                    self.record(token, resp.status_code if resp is not None else None,
+                                lc.retry_after(resp) if resp is not None else DEFAULT_COOLDOWN)
+                    recorded = True
+                last_exc = e
+            except requests.RequestException as e:
+                if token is not None:
+                    self.record(token, None)
+                    recorded = True
+                last_exc = e
+            finally:
+                # anything else (a parse error in fn …) propagates, but frees the slot
+                if token is not None and not recorded:
+                    self.release(token)
+        raise last_exc
+
+    def summary(self) -> str:
+        with self._lock:
+            return "  ".join(f"{account_key(t)[:8]}: {h.requests} req, {h.failures} fail, "
+                             f"{h.rate_limited}×429{'' if h.healthy else ' (cooling)'}"
+                             for t, h in self.health.items())
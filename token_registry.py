@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Disk-backed cache of who each token belongs to.
+
+``TokenRegistry.resolve()`` returns the Lichess username and OAuth scopes for
+many tokens at once.  Fresh cache entries are answered from disk without any
+request; unknown tokens are resolved concurrently (``/api/account``) and their
+scopes checked with a single batched ``/api/token/test`` call.  Entries older
+than the TTL are still served immediately and refreshed in the background,
+so a bot with dozens of accounts reaches its main loop without waiting.
+
+Entries are keyed by a hash of the token; the token itself is never stored.
+"""
+
+import json
+import logging
+import os
+import pathlib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import requests
+
+import lichess_client as lc
+from state_store import account_key
+
+DEFAULT_PATH = os.environ.get("LICHESS_TOKEN_CACHE", ".state/identities.json")
+DEFAULT_TTL = float(os.environ.get("LICHESS_TOKEN_CACHE_TTL", str(24 * 3600)))
+RETRY_TTL = 300.0  # an entry whose scopes could not be checked is retried this soon
+
+
+@dataclass(frozen=True)
+class Identity:
+    username: str
+    scopes: tuple = ()
+    checked_at: float = 0.0
+
+    def has_scopes(self, required: Iterable[str]) -> bool:
+        return set(required) <= set(self.scopes)
+
+
+def fetch_username(token: str) -> Tuple[Optional[str], bool]:
+    """``(username, definite)``: a 401/403 is a definite "invalid token", while a
+    network error or 5xx says nothing about the token."""
+    try:
+        r = lc.request("GET", "account", token, timeout=10)
+    except requests.RequestException as e:
+        logging.warning("[%s] account fetch failed: %s", account_key(token)[:8], e)
+        return None, False
+    if r.status_code == 200:
+        return r.json().get("username"), True
+    logging.warning("[%s] account fetch failed (%d): %s", account_key(token)[:8], r.status_code,
+                    r.text)
+    return None, r.status_code in (401, 403)
+
+
+def test_tokens(tokens: Sequence[str]) -> Dict[str, Optional[Dict]]:
+    """Batched ``POST /api/token/test``: token → {userId, scopes, expires} or None."""
+    if not tokens:
+        return {}
+    r = lc.request("POST", "token/test", data=",".join(tokens), timeout=10)
+    r.raise_for_status()
+    return r.json()
+
+
+class TokenRegistry:
+    def __init__(self, path: str = DEFAULT_PATH, ttl: float = DEFAULT_TTL, workers: int = 8):
+        self.path = pathlib.Path(path)
+        self.ttl = ttl
+        self.workers = workers
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Identity] = {}
+        self._refreshing: Optional[threading.Thread] = None
+        try:
+            raw = json.loads(self.path.read_text(encoding="utf-8"))
+            self._entries = {k: Identity(v["username"], tuple(v["scopes"]), v["checked_at"])
+                             for k, v in raw.items()}
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+
+    # ───────── public API ───────── #
+
+    def resolve(self, tokens: Iterable[str],
+                required_scopes: Sequence[str] = ()) -> Dict[str, Identity]:
+        """token → Identity for every token that is valid (and has the scopes)."""
+        tokens = list(dict.fromkeys(tokens))
+        now = time.time()
+        with self._lock:
+            cached = {t: self._entries.get(account_key(t)) for t in tokens}
+        missing = [t for t, ident in cached.items() if ident is None]
+        stale = [t for t, ident in cached.items()
+                 if ident is not None and now - ident.checked_at > self.ttl]
+
+        if missing:
+            cached.update(self._lookup(missing))
+            self._save()
+        if stale:
+            self.refresh_in_background(stale)
+
+        out = {}
+        for t, ident in cached.items():
+            if ident is None:
+                continue
+            if required_scopes and ident.scopes and not ident.has_scopes(required_scopes):
+                logging.warning("[%s] token lacks scope(s) %s", ident.username,
+                                ", ".join(sorted(set(required_scopes) - set(ident.scopes))))
+                continue
+            out[t] = ident
+        return out
+
+    def refresh_in_background(self, tokens: List[str]) -> threading.Thread:
+        """Re-resolve ``tokens`` on a daemon thread; callers keep the cached values."""
+        def run():
+            self._lookup(tokens)
+            self._save()
+
+        thread = threading.Thread(target=run, name="token-refresh", daemon=True)
+        thread.start()
+        self._refreshing = thread
+        return thread
+
+    # ───────── internals ───────── #
+
+    def _lookup(self, tokens: List[str]) -> Dict[str, Optional[Identity]]:
+        """Resolve ``tokens``; on errors the previous entry is kept as it was.
+
+        Only a definite rejection removes an entry.  When the scopes could not
+        be checked the entry is stored with whatever scopes were known before
+        (none means "unknown" to ``resolve``) and a back-dated ``checked_at``,
+        so it goes stale and is retried after ``RETRY_TTL`` instead of the TTL.
+        """
+        try:
+            scopes: Optional[Dict] = test_tokens(tokens)
+        except (requests.RequestException, ValueError) as e:
+            logging.warning("token scope check failed: %s", e)
+            scopes = None
+
+        with ThreadPoolExecutor(max_workers=min(self.workers, len(tokens))) as pool:
+            names = dict(zip(tokens, pool.map(fetch_username, tokens)))
+
+        now = time.time()
+        found: Dict[str, Optional[Identity]] = {}
+        with self._lock:
+            for t in tokens:
+                key = account_key(t)
+                previous = self._entries.get(key)
+                name, definite = names[t]
+                if name is None:
+                    if definite:
+                        self._entries.pop(key, None)
+                    found[t] = None if definite else previous
+                    continue
+                info = scopes.get(t) if scopes is not None else None
+                if info:
+                    ident = Identity(name, tuple(filter(None, (info.get("scopes") or "").split(","))),
+                                     now)
+                else:
+                    ident = Identity(name, previous.scopes if previous else (),
+                                     now - self.ttl + min(RETRY_TTL, self.ttl))
+                self._entries[key] = found[t] = ident
+        return found
+
+    def _save(self):
+        with self._lock:
+            data = {k: asdict(v) for k, v in self._entries.items()}
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp.write_text(json.dumps(data), encoding="utf-8")
+        os.replace(tmp, self.path)
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Always-on Swiss auto-withdraw bot shared by jb.py and jo.py.
+
+Each cycle fetches the team's upcoming list once (through a TTL cache that
+revalidates with ETag / If-Modified-Since).  Every newly seen tournament gets
+one armed timer per account at exactly ``WITHDRAW_BEFORE_SEC`` before its
+start, measured on the lichess.org clock (see clock_sync.py), with a retry
+ladder for attempts that fail.  Each firing logs its achieved accuracy.
+"""
+
+import os
+import time
+import logging
+
+import lichess_client as lc
+import metrics
+from clock_sync import ServerClock
+from scheduler import DeadlineScheduler, arm, lateness_report
+from token_pool import TokenPool, load_tokens
+from token_registry import TokenRegistry
+
+TOKEN_NAMES = ["LICHESS_KEY", "LICHESS_KEYS", "T", "L"]
+POLL_SEC = 15
+LIST_TTL_SEC = 10
+RESYNC_SEC = 600
+WITHDRAW_BEFORE_SEC = float(os.environ.get("WITHDRAW_BEFORE_SEC", "180"))
+# seconds after the first attempt at which a failed withdraw is retried
+RETRY_LADDER = [0.0] + [float(x) for x in os.environ.get("WITHDRAW_RETRY_LADDER", "30,60").split(",") if x]
+SLO_MS = float(os.environ.get("WITHDRAW_SLO_MS", "1000"))
+
+
+# ────────────────── HELPERS ──────────────────
+def withdraw(token, swiss_id, username):
+    res = lc.withdraw(token, swiss_id)
+    if res.outcome == lc.OK:
+        print(f"✅ [{username}] Withdraw OK {swiss_id}")
+    elif res.outcome == lc.ALREADY:
+        print(f"ℹ️ [{username}] Already not joined {swiss_id}")
+    elif res.outcome == lc.ERROR:
+        print(f"❌ [{username}] Withdraw error {swiss_id}: {res.text}")
+    else:
+        print(f"⚠️ [{username}] Withdraw failed {swiss_id} ({res.status_code}): {res.text}")
+    return res
+
+def arm_withdrawals(sched, cache, swiss, usernames):
+    """Arm one laddered withdraw timer per account for this tournament."""
+    deadline = swiss.starts_ms / 1000 - WITHDRAW_BEFORE_SEC
+
+    def still_on():
+        current = cache.peek(swiss.id)
+        return current is not None and current.starts_ms == swiss.starts_ms
+
+    for token, uname in usernames.items():
+        arm(sched, deadline, f"{uname}:{swiss.id}",
+            lambda t=token, u=uname: withdraw(t, swiss.id, u),
+            ladder=RETRY_LADDER, guard=still_on, succeeded=lambda r: r.ok)
+    print(f"⏰ Armed {len(usernames)} withdraw(s) for {swiss.id} at "
+          f"{lc.epoch_ms_to_iso(int(deadline * 1000))} (server time)")
+
+def report_firings(sched, seen):
+    new = sched.firings[seen:]
+    for f in new:
+        if not f.skipped:
+            print(f"🎯 {f.name} fired {f.lateness * 1000:+.0f} ms from target")
+    if new:
+        print(f"📊 {lateness_report(sched.firings, SLO_MS)}")
+    return seen + len(new)
+
+
+# ────────────────── MAIN ──────────────────
+def main(default_team):
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    metrics.setup()
+    team_id = os.environ.get("TEAM_ID", default_team)
+    tokens = load_tokens(*TOKEN_NAMES)
+    if not tokens:
+        raise SystemExit(f"❌ No tokens found! Please export {', '.join(TOKEN_NAMES)}")
+
+    print("──────────────────────────────")
+    print("🚀 Running Swiss auto-withdraw bot (always active)\n")
+
+    # Load usernames for all tokens (cached on disk, refreshed in the background)
+    identities = TokenRegistry().resolve(tokens, required_scopes=["tournament:write"])
+    usernames = {t: ident.username for t, ident in identities.items()}
+
+    if not usernames:
+        raise SystemExit("❌ No valid usernames fetched from tokens.")
+
+    print("Loaded accounts:")
+    for name in usernames.values():
+        print("  -", name)
+
+    print("\nBot active. Monitoring upcoming Swiss tournaments...\n")
+
+    clock = ServerClock()
+    clock.sync()
+    synced_at = time.monotonic()
+    sched = DeadlineScheduler(workers=max(4, 2 * len(usernames)), clock=clock.now)
+
+    # one list fetch per cycle, shared by every account and spread across their budgets
+    pool = TokenPool(usernames)
+    cache = lc.SwissListCache(team_id, ttl=LIST_TTL_SEC, pool=pool)
+    armed = set()
+    seen = 0
+    while True:
+        try:
+            swisses = cache.get()
+        except Exception as e:
+            print(f"❌ Failed to fetch Swiss list: {e}")
+            swisses = []
+
+        now = clock.now()
+        for s in swisses:
+            key = (s.id, s.starts_ms)
+            # past the first rung but not the last? arming fires it right away
+            last_rung = s.starts_ms / 1000 - WITHDRAW_BEFORE_SEC + RETRY_LADDER[-1]
+            if key not in armed and last_rung > now:
+                arm_withdrawals(sched, cache, s, usernames)
+                armed.add(key)
+        armed = {k for k in armed if k[1] / 1000 > clock.now()}
+
+        seen = report_firings(sched, seen)
+        if time.monotonic() - synced_at > RESYNC_SEC:
+            print(f"🩺 {pool.summary()}")
+            clock.sync()
+            synced_at = time.monotonic()
+
+        # active continuous checking
+        time.sleep(POLL_SEC)